@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def vel_cache_dir(tmp_path_factory):
+    """ Keep caches written by the tests, e.g. of parsed configuration files, out of the home directory """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        cache_dir = tmp_path_factory.mktemp('vel_cache')
+        monkeypatch.setenv('VEL_CACHE_DIR', str(cache_dir))
+        yield cache_dir
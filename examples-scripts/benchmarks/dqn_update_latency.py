@@ -0,0 +1,119 @@
+import argparse
+import time
+import types
+
+import gym
+import numpy as np
+import torch
+import torch.optim as optim
+
+from vel.rl.algo.dqn import DeepQLearning
+from vel.rl.api import Transitions
+from vel.rl.models.backbone.mlp import MLPFactory
+from vel.rl.models.backbone.nature_cnn import NatureCnnFactory
+from vel.rl.models.q_model import QModelFactory
+
+
+class BenchmarkBatchInfo(dict):
+    """ Minimal stand-in for BatchInfo, with attributes the algorithm reads """
+    def __init__(self, optimizer, aggregate_batch_number):
+        super().__init__()
+        self.optimizer = optimizer
+        self.aggregate_batch_number = aggregate_batch_number
+
+
+def backbone_setup(name):
+    """ Backbone factory and a function generating a batch of observations """
+    if name == 'nature_cnn':
+        factory = NatureCnnFactory(input_width=84, input_height=84, input_channels=4)
+
+        def observations(batch_size):
+            return np.random.randint(0, 255, size=(batch_size, 84, 84, 4), dtype=np.uint8)
+    else:
+        factory = MLPFactory(input_length=32, hidden_layers=[64, 64])
+
+        def observations(batch_size):
+            return np.random.randn(batch_size, 32).astype(np.float32)
+
+    return factory, observations
+
+
+def random_transitions(observations, batch_size, num_actions, device):
+    """ Batch of random transitions, as sampled from the replay buffer """
+    return Transitions(
+        size=batch_size,
+        environment_information=None,
+        transition_tensors={
+            'observations': torch.from_numpy(observations(batch_size)).to(device),
+            'observations_next': torch.from_numpy(observations(batch_size)).to(device),
+            'dones': torch.zeros(batch_size, dtype=torch.float32, device=device),
+            'rewards': torch.randn(batch_size, device=device),
+            'actions': torch.randint(num_actions, (batch_size,), dtype=torch.long, device=device),
+            'weights': torch.ones(batch_size, device=device)
+        }
+    )
+
+
+def measure_update_latency(backbone, batch_size, fused_evaluation, device, iterations=50, warmup=5):
+    """ Average time of a single double DQN optimizer step in milliseconds """
+    action_space = gym.spaces.Discrete(4)
+    backbone_factory, observations = backbone_setup(backbone)
+    model_factory = QModelFactory(backbone=backbone_factory)
+
+    model = model_factory.instantiate(action_space=action_space).to(device)
+    model.reset_weights()
+    model.train()
+
+    algo = DeepQLearning(
+        model_factory=model_factory,
+        double_dqn=True,
+        target_update_frequency=10_000,
+        max_grad_norm=0.5,
+        fused_evaluation=fused_evaluation
+    )
+
+    algo.initialize(
+        types.SimpleNamespace(discount_factor=0.99), model=model,
+        environment=types.SimpleNamespace(action_space=action_space), device=device
+    )
+
+    batch_info = BenchmarkBatchInfo(optimizer=optim.RMSprop(model.parameters(), lr=2.5e-4), aggregate_batch_number=1)
+
+    rollouts = [random_transitions(observations, batch_size, action_space.n, device) for _ in range(8)]
+
+    for i in range(warmup):
+        algo.optimizer_step(batch_info, device, model, rollouts[i % len(rollouts)])
+
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+    start = time.perf_counter()
+
+    for i in range(iterations):
+        algo.optimizer_step(batch_info, device, model, rollouts[i % len(rollouts)])
+
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-update latency of double DQN')
+    parser.add_argument('--device', default='cpu', help='Device to run benchmark on')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 128, 512])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+
+    for backbone in ['nature_cnn', 'mlp']:
+        for batch_size in args.batch_sizes:
+            regular = measure_update_latency(backbone, batch_size, False, device, args.iterations)
+            fused = measure_update_latency(backbone, batch_size, True, device, args.iterations)
+
+            print(f"{backbone:>12} batch {batch_size:>4}: regular {regular:8.2f}ms fused {fused:8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+import vel.sources.img_dir_source as img_dir_source
+
+from vel.augmentations.center_crop import CenterCrop
+from vel.augmentations.normalize import Normalize
+from vel.augmentations.scale_min_size import ScaleMinSize
+from vel.augmentations.to_array import ToArray
+from vel.augmentations.to_tensor import ToTensor
+
+
+def generate_image_dir(path, images_per_class, size):
+    """ Generate a small random image directory in the layout expected by img_dir_source """
+    for split in ['train', 'valid']:
+        for class_name in ['a', 'b']:
+            class_dir = os.path.join(path, split, class_name)
+            pathlib.Path(class_dir).mkdir(parents=True, exist_ok=True)
+
+            for i in range(images_per_class):
+                image = np.random.randint(0, 255, size=(size, size, 3), dtype=np.uint8)
+                Image.fromarray(image).save(os.path.join(class_dir, f'{i}.jpg'))
+
+
+def measure_epochs(path, epochs, num_workers, batch_size, persistent_workers, prefetch_factor):
+    """ Time to the first batch and total time of every epoch, in seconds """
+    source = img_dir_source.create(
+        model_config=None,
+        path=path,
+        num_workers=num_workers,
+        batch_size=batch_size,
+        augmentations=[
+            ToArray(), ScaleMinSize(size=64), CenterCrop(size=64),
+            Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]), ToTensor()
+        ],
+        persistent_workers=persistent_workers,
+        prefetch_factor=prefetch_factor
+    )
+
+    results = []
+
+    for _ in range(epochs):
+        start = time.perf_counter()
+        first_batch = None
+
+        for _ in source.train_loader():
+            if first_batch is None:
+                first_batch = time.perf_counter() - start
+
+        results.append((first_batch, time.perf_counter() - start))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Epoch boundary cost of data loader workers')
+    parser.add_argument('--path', default=None, help='Image directory, random images are generated if not given')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--num-workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--prefetch-factor', type=int, default=4)
+    parser.add_argument('--images-per-class', type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.path
+
+        if path is None:
+            path = temp_dir
+            generate_image_dir(path, args.images_per_class, size=96)
+
+        path = os.path.abspath(path)
+
+        for persistent_workers in [False, True]:
+            prefetch_factor = args.prefetch_factor if persistent_workers else None
+
+            results = measure_epochs(
+                path, args.epochs, args.num_workers, args.batch_size, persistent_workers, prefetch_factor
+            )
+
+            print(f"persistent_workers={persistent_workers} prefetch_factor={prefetch_factor}")
+
+            for epoch_idx, (first_batch, total) in enumerate(results, 1):
+                print(f"  epoch {epoch_idx}: first batch {first_batch * 1000:8.1f} ms, epoch {total * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
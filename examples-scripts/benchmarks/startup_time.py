@@ -0,0 +1,66 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['torch', 'pandas', 'torchvision', 'pymongo', 'visdom', 'matplotlib', 'cv2', 'gym']
+
+SCENARIOS = {
+    'import': "import vel\n",
+    'import-api': "import vel.api\n",
+    'config': (
+        "import sys\n"
+        "from vel.api import ModelConfig\n"
+        "ModelConfig.from_file(sys.argv[1], 0, device='cpu')\n"
+    ),
+    'model': (
+        "import sys\n"
+        "from vel.api import ModelConfig\n"
+        "ModelConfig.from_file(sys.argv[1], 0, device='cpu').provide('model').instantiate()\n"
+    ),
+}
+
+REPORT = (
+    "import sys, time\n"
+    "print(time.perf_counter() - START)\n"
+    "print(','.join(m for m in {modules!r} if m in sys.modules))\n"
+)
+
+
+def measure(scenario, config, repeats):
+    """ Run the scenario in fresh interpreters, return wall times and heavy modules it imported """
+    script = "import time\nSTART = time.perf_counter()\n" + SCENARIOS[scenario] + REPORT.format(modules=HEAVY_MODULES)
+
+    times = []
+    modules = ''
+
+    for _ in range(repeats):
+        output = subprocess.check_output([sys.executable, '-c', script, config], universal_newlines=True)
+        elapsed, modules = output.splitlines()[-2:]
+        times.append(float(elapsed))
+
+    return times, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time it takes to import vel and load a configuration')
+    parser.add_argument(
+        '--config', default=os.path.join('examples-configs', 'classification', 'mnist', 'mnist_cnn_01.yaml')
+    )
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), default=None)
+    args = parser.parse_args()
+
+    for scenario in args.scenario or list(SCENARIOS):
+        times, modules = measure(scenario, os.path.abspath(args.config), args.repeats)
+
+        print(
+            f"{scenario:12} median {statistics.median(times) * 1000:8.1f} ms, "
+            f"min {min(times) * 1000:8.1f} ms, heavy modules: {modules or '-'}"
+        )
+
+
+if __name__ == '__main__':
+    main()
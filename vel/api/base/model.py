@@ -68,6 +68,13 @@ class Model(nn.Module):
         """ Call proper initializers for the weights """
         pass
 
+    def feature_split(self):
+        """
+        Return a (backbone, head) pair of modules such that model output is head(backbone(x)),
+        while the backbone is frozen, or None if model does not support that.
+        """
+        return None
+
     @property
     def is_recurrent(self) -> bool:
         """ If the network is recurrent and needs to be fed state as well as the observations """
@@ -132,6 +139,14 @@ class SupervisedModel(Model):
         y_pred = self(x_data)
         return y_pred, self.loss_value(x_data, y_true, y_pred)
 
+    def loss_state(self, x_data, y_true, state=None):
+        """
+        Forward propagate network starting from the state at the end of the previous batch.
+        Return output, value of loss function and the new state. Requires model to implement forward_state.
+        """
+        y_pred, new_state = self.forward_state(x_data, state)
+        return y_pred, self.loss_value(x_data, y_true, y_pred), new_state
+
     def loss_value(self, x_data, y_true, y_pred):
         """ Calculate a value of loss function """
         raise NotImplementedError
@@ -1,5 +1,32 @@
+import importlib
+import random
+
+import numpy as np
+import torch
 import torch.utils.data as data
 
+import vel.util.distributed as distributed
+
+
+def seed_worker(worker_id):
+    """
+    Seed python and numpy random generators of a data loader worker.
+    PyTorch seeds every worker differently, but other generators would otherwise share the state of the parent process,
+    making random augmentations repeat across workers.
+    """
+    worker_seed = torch.initial_seed() % 2 ** 32
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
+
+
+def resolve_collate_fn(collate_fn):
+    """ Collate function can be supplied either directly or as a 'module.name' string in the configuration """
+    if collate_fn is None or callable(collate_fn):
+        return collate_fn
+
+    module_name, function_name = collate_fn.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
 
 class Source:
     """ Source of data for supervised learning algorithms """
@@ -30,10 +57,26 @@ class Source:
         """ Return number of iterations per epoch - validation """
         raise NotImplementedError
 
+    def set_epoch(self, epoch_idx):
+        """ Notify the source that a new training epoch begins """
+        pass
+
+    @property
+    def is_stateful(self) -> bool:
+        """ If consecutive batches continue the same sequences, so that model state can be carried between them """
+        return False
+
 
 class TrainingData(Source):
-    """ Most common source of data combining a basic datasource and sampler """
-    def __init__(self, train_source, val_source, num_workers, batch_size, augmentations=None):
+    """
+    Most common source of data combining a basic datasource and sampler.
+
+    In distributed training each process loads a separate shard of the data.
+    With augmentation_device set, batch augmentations run on that device after the batch is moved there.
+    """
+    def __init__(self, train_source, val_source, num_workers, batch_size, augmentations=None,
+                 batch_augmentations=False, pin_memory=False, persistent_workers=False, prefetch_factor=None,
+                 drop_last=False, seed_workers=True, collate_fn=None, augmentation_device=None):
         import vel.api.data as vel_data
 
         super().__init__()
@@ -45,19 +88,74 @@ class TrainingData(Source):
         self.batch_size = batch_size
 
         self.augmentations = augmentations
+        self.batch_augmentations = batch_augmentations
+        self.augmentation_device = augmentation_device
 
-        # Derived values
-        self.train_ds = vel_data.DataFlow(self.train_source, augmentations, tag='train')
-        self.val_ds = vel_data.DataFlow(self.val_source, augmentations, tag='val')
+        self.pin_memory = pin_memory
+        self.persistent_workers = persistent_workers
+        self.prefetch_factor = prefetch_factor
+        self.drop_last = drop_last
+        self.seed_workers = seed_workers
+        self.collate_fn = resolve_collate_fn(collate_fn)
 
-        self._train_loader = data.DataLoader(
-            self.train_ds, batch_size=batch_size, shuffle=True, num_workers=num_workers
+        # Derived values
+        self.train_ds = vel_data.DataFlow(
+            self.train_source, augmentations, tag='train', batch_augmentations=batch_augmentations
         )
-
-        self._val_loader = data.DataLoader(
-            self.val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers
+        self.val_ds = vel_data.DataFlow(
+            self.val_source, augmentations, tag='val', batch_augmentations=batch_augmentations
         )
 
+        if distributed.is_distributed():
+            self.train_sampler = data.distributed.DistributedSampler(self.train_ds, shuffle=True)
+            self.val_sampler = data.distributed.DistributedSampler(self.val_ds, shuffle=False)
+        else:
+            self.train_sampler = None
+            self.val_sampler = None
+
+        self._train_loader = self._wrap_loader(data.DataLoader(
+            self.train_ds, batch_size=batch_size, shuffle=(self.train_sampler is None), sampler=self.train_sampler,
+            num_workers=num_workers, drop_last=drop_last, **self._loader_kwargs()
+        ), self.train_ds)
+
+        self._val_loader = self._wrap_loader(data.DataLoader(
+            self.val_ds, batch_size=batch_size, shuffle=False, sampler=self.val_sampler, num_workers=num_workers,
+            **self._loader_kwargs()
+        ), self.val_ds)
+
+    def _loader_kwargs(self):
+        """ Data loader performance settings. Options related to workers only apply if there are any. """
+        kwargs = {'pin_memory': self.pin_memory}
+
+        if self.collate_fn is not None:
+            kwargs['collate_fn'] = self.collate_fn
+
+        if self.num_workers > 0:
+            if self.persistent_workers:
+                kwargs['persistent_workers'] = True
+
+            if self.prefetch_factor is not None:
+                kwargs['prefetch_factor'] = self.prefetch_factor
+
+            if self.seed_workers:
+                kwargs['worker_init_fn'] = seed_worker
+
+        return kwargs
+
+    def _wrap_loader(self, loader, dataflow):
+        """ Apply batch augmentations after collation if the dataflow has any """
+        import vel.api.data as vel_data
+
+        if dataflow.batch_transformations:
+            return vel_data.BatchAugmentedLoader(loader, dataflow, device=self.augmentation_device)
+        else:
+            return loader
+
+    def set_epoch(self, epoch_idx):
+        """ Distributed sampler needs to know the epoch to shuffle the shards differently each time """
+        if self.train_sampler is not None:
+            self.train_sampler.set_epoch(epoch_idx)
+
     def train_loader(self):
         """ PyTorch loader of training data """
         return self._train_loader
@@ -1,3 +1,3 @@
 from .augmentation import Augmentation
-from .dataflow import DataFlow
-from .image_ops import *
\ No newline at end of file
+from .dataflow import DataFlow, BatchAugmentedLoader
+from .image_ops import *
@@ -2,6 +2,16 @@
 
 class Augmentation:
     """ Base class for all data augmentations """
+
+    # Whether augmentation can be applied to a whole collated [B, C, H, W] tensor batch
+    supports_batch = False
+
+    # Whether augmentation only converts a sample into a tensor and commutes with batch augmentations
+    tensor_conversion = False
+
+    # Whether augmentation is deterministic and can be applied once to a decoded uint8 image and cached
+    cacheable = False
+
     def __init__(self, mode='x', tags=None):
         self.mode = mode
         self.tags = tags or ['train', 'val', 'test']
@@ -11,6 +21,10 @@ class Augmentation:
         print(self)
         raise NotImplementedError
 
+    def batch(self, x_batch):
+        """ Do the transformation on a whole batch of tensors, each sample with independent randomness """
+        raise NotImplementedError
+
     def denormalize(self, *args):
         """ Operation reverse to normalization """
         if len(args) == 1:
@@ -1,15 +1,57 @@
 import torch.utils.data as data
 
 
+def split_batch_transformations(transformations):
+    """
+    Split a chain of transformations into a per-sample part and a part that can run on collated batches.
+
+    Batch part starts at the first transformation supporting batches. Everything after it must either support
+    batches as well or be a plain tensor conversion, otherwise the chain cannot be reordered and the whole of it
+    stays per-sample.
+    """
+    first_batch_idx = next((i for i, t in enumerate(transformations) if t.supports_batch), None)
+
+    if first_batch_idx is None:
+        return transformations, []
+
+    head = transformations[:first_batch_idx]
+    tail = transformations[first_batch_idx:]
+
+    batch_transformations = [t for t in tail if t.supports_batch]
+    sample_tail = [t for t in tail if not t.supports_batch]
+
+    # Batch augmentations operate on [B, C, H, W] tensors, so samples must be converted to tensors first
+    if len(sample_tail) != 1 or not sample_tail[0].tensor_conversion or sample_tail[0].mode != 'x':
+        return transformations, []
+
+    if any(t.mode != 'x' for t in batch_transformations):
+        return transformations, []
+
+    return head + sample_tail, batch_transformations
+
+
 class DataFlow(data.Dataset):
     """ A dataset wrapping underlying data source with transformations """
-    def __init__(self, dataset, transformations, tag):
+    def __init__(self, dataset, transformations, tag, batch_augmentations=False):
         self.dataset = dataset
 
+        # Transformations that the underlying dataset has already applied, e.g. before caching the data
+        applied_transformations = getattr(dataset, 'applied_transformations', [])
+
         if transformations is None:
             self.transformations = []
         else:
-            self.transformations = [t for t in transformations if tag in t.tags]
+            self.transformations = [
+                t for t in transformations
+                if tag in t.tags and not any(t is applied for applied in applied_transformations)
+            ]
+
+        if batch_augmentations:
+            self.sample_transformations, self.batch_transformations = split_batch_transformations(
+                self.transformations
+            )
+        else:
+            self.sample_transformations, self.batch_transformations = self.transformations, []
 
         self.tag = tag
 
@@ -19,7 +61,7 @@ class DataFlow(data.Dataset):
     def __getitem__(self, index):
         raw_x, raw_y = self.dataset[index]
 
-        for t in self.transformations:
+        for t in self.sample_transformations:
             if t.mode == 'x':
                 raw_x = t(raw_x)
             elif t.mode == 'y':
@@ -31,6 +73,22 @@ class DataFlow(data.Dataset):
 
         return raw_x, raw_y
 
+    def get_augmented(self, index):
+        """ Return sample with all the transformations applied, including the batch ones """
+        x, y = self[index]
+
+        if self.batch_transformations:
+            x = self.augment_batch(x.unsqueeze(0))[0]
+
+        return x, y
+
+    def augment_batch(self, x_batch):
+        """ Apply batch transformations to a collated batch of inputs """
+        for t in self.batch_transformations:
+            x_batch = t.batch(x_batch)
+
+        return x_batch
+
     def denormalize(self, datum, mode='x'):
         for t in self.transformations[::-1]:
             if t.mode == mode:
@@ -40,3 +98,30 @@ class DataFlow(data.Dataset):
 
     def __len__(self):
         return len(self.dataset)
+
+
+class BatchAugmentedLoader:
+    """
+    Data loader wrapper applying batch transformations of a DataFlow to each collated batch.
+
+    If device is given, batches are moved there before being augmented, so that the augmentations run on the GPU.
+    """
+    def __init__(self, loader, dataflow: DataFlow, device=None):
+        self.loader = loader
+        self.dataflow = dataflow
+        self.device = device
+
+    @property
+    def dataset(self):
+        return self.loader.dataset
+
+    def __iter__(self):
+        for x_batch, y_batch in self.loader:
+            if self.device is not None:
+                x_batch = x_batch.to(self.device, non_blocking=True)
+                y_batch = y_batch.to(self.device, non_blocking=True)
+
+            yield self.dataflow.augment_batch(x_batch), y_batch
+
+    def __len__(self):
+        return len(self.loader)
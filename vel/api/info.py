@@ -1,10 +1,11 @@
 import collections.abc as abc
 import numpy as np
-import pandas as pd
 import typing
 
 import torch
 
+import vel.util.distributed as distributed
+
 from vel.exceptions import VelException
 
 
@@ -23,6 +24,7 @@ class TrainingHistory:
 
     def frame(self):
         """ Return history dataframe """
+        import pandas as pd
         return pd.DataFrame(self.data).set_index('epoch_idx')
 
 
@@ -130,7 +132,8 @@ class EpochResultAccumulator:
         return self.metrics_by_name[metric_name].value()
 
     def freeze_results(self, name=None):
-        new_results = self.value()
+        # In distributed training each process calculated the metrics on its own shard of the data
+        new_results = distributed.all_reduce_mean(self.value())
 
         if name is None:
             for key, value in new_results.items():
@@ -167,6 +170,9 @@ class EpochInfo(abc.MutableMapping):
         self.optimizer = optimizer
         self.batches_per_epoch = batches_per_epoch
 
+        # Number of batches gradients are accumulated over before each optimizer step, set by the learner
+        self.accumulation_steps = 1
+
         self.global_epoch_idx = global_epoch_idx
 
         if local_epoch_idx is None:
@@ -289,6 +295,15 @@ class BatchInfo(abc.MutableMapping):
     def aggregate_batch_number(self):
         return self.batch_number + self.epoch_info.batches_per_epoch * (self.epoch_info.global_epoch_idx - 1)
 
+    @property
+    def optimizer_step_number(self):
+        """ Number of optimizer step within the epoch this batch contributes to """
+        return self.batch_number // self.epoch_info.accumulation_steps
+
+    @property
+    def optimizer_steps_per_epoch(self):
+        return -(-self.epoch_info.batches_per_epoch // self.epoch_info.accumulation_steps)
+
     @property
     def epoch_number(self):
         return self.epoch_info.global_epoch_idx
@@ -1,17 +1,66 @@
+import contextlib
 import sys
 import torch
 import tqdm
 import typing
 
+import vel.util.distributed as distributed
+
+from vel.util.tensor_util import detach_state
+
 from .info import BatchInfo, EpochInfo, TrainingInfo
 
 
+class ModelLoss(torch.nn.Module):
+    """ Module evaluating loss of the model, so that it can be wrapped in DistributedDataParallel """
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, data, target, state=None, stateful=False):
+        if stateful:
+            return self.model.loss_state(data, target, state)
+        else:
+            return self.model.loss(data, target)
+
+
 class Learner:
-    """ Manages training process of a single model """
-    def __init__(self, device: torch.device, model, max_grad_norm: typing.Optional[float]=None):
+    """
+    Manages training process of a single model.
+
+    With accumulation_steps larger than one, gradients are accumulated over that many batches
+    before each optimizer step. In distributed training gradients are averaged across processes
+    by DistributedDataParallel, once per accumulation window.
+
+    For stateful sources, model state is carried from one batch to the next, detached from the graph of
+    the previous batch (truncated backpropagation through time).
+    """
+    def __init__(self, device: torch.device, model, max_grad_norm: typing.Optional[float]=None,
+                 accumulation_steps: int=1):
         self.device = device
         self.model = model.to(device)
         self.max_grad_norm = max_grad_norm
+        self.accumulation_steps = accumulation_steps
+
+        self._loss = ModelLoss(self.model)
+        self._parallel_loss = None
+        self._parallel_trainable = None
+
+    def model_loss(self):
+        """ Module calculating model output and loss, synchronizing gradients in distributed training """
+        if not distributed.is_distributed():
+            return self._loss
+
+        # DistributedDataParallel only synchronizes parameters that were trainable when it was constructed,
+        # so it is rebuilt whenever a phase freezes or unfreezes a part of the model
+        trainable = tuple(p.requires_grad for p in self.model.parameters())
+
+        if self._parallel_loss is None or trainable != self._parallel_trainable:
+            device_ids = [self.device] if self.device.type == 'cuda' else None
+            self._parallel_loss = torch.nn.parallel.DistributedDataParallel(self._loss, device_ids=device_ids)
+            self._parallel_trainable = trainable
+
+        return self._parallel_loss
 
     def metrics(self):
         """ Return metrics for given learner/model """
@@ -42,7 +91,11 @@ class Learner:
         epoch_info.on_epoch_begin()
 
         lr = epoch_info.optimizer.param_groups[-1]['lr']
-        print("|-------- Epoch {:06} Lr={:.6f} ----------|".format(epoch_info.global_epoch_idx, lr))
+
+        if distributed.is_main_process():
+            print("|-------- Epoch {:06} Lr={:.6f} ----------|".format(epoch_info.global_epoch_idx, lr))
+
+        source.set_epoch(epoch_info.global_epoch_idx)
 
         self.train_epoch(epoch_info, source)
         epoch_info.result_accumulator.freeze_results('train')
@@ -56,38 +109,108 @@ class Learner:
         """ Run a single training epoch """
         self.train()
 
+        epoch_info.accumulation_steps = self.accumulation_steps
+
         if interactive:
-            iterator = tqdm.tqdm(source.train_loader(), desc="Training", unit="iter", file=sys.stdout)
+            iterator = tqdm.tqdm(
+                source.train_loader(), desc="Training", unit="iter", file=sys.stdout,
+                disable=not distributed.is_main_process()
+            )
         else:
             iterator = source.train_loader()
 
+        # Every epoch starts from the initial model state
+        state = None
+
         for batch_idx, (data, target) in enumerate(iterator):
             batch_info = BatchInfo(epoch_info, batch_idx)
 
+            if source.is_stateful:
+                batch_info['state'] = state
+
             batch_info.on_batch_begin()
             self.train_batch(batch_info, data, target)
             batch_info.on_batch_end()
 
+            if source.is_stateful:
+                state = batch_info['state']
+
             iterator.set_postfix(loss=epoch_info.result_accumulator.intermediate_value('loss'))
 
-    def validation_epoch(self, epoch_info, source: 'vel.api.base.Source'):
-        """ Run a single evaluation epoch """
+    def validation_epoch(self, epoch_info, source: 'vel.api.base.Source', tta=None):
+        """
+        Run a single evaluation epoch.
+        With test time augmentation, metrics are calculated on model outputs reduced over augmented views of samples.
+        """
         self.eval()
 
-        iterator = tqdm.tqdm(source.val_loader(), desc="Validation", unit="iter", file=sys.stdout)
+        loader = source.val_loader() if tta is None else tta.loader(source)
+
+        iterator = tqdm.tqdm(
+            loader, desc="Validation", unit="iter", file=sys.stdout,
+            disable=not distributed.is_main_process()
+        )
+
+        stateful = source.is_stateful and tta is None
+        state = None
 
         with torch.no_grad():
             for batch_idx, (data, target) in enumerate(iterator):
                 batch_info = BatchInfo(epoch_info, batch_idx)
 
+                if stateful:
+                    batch_info['state'] = state
+
                 batch_info.on_validation_batch_begin()
-                self.feed_batch(batch_info, data, target)
+
+                precision = batch_info.get('precision')
+
+                if precision is None:
+                    self.feed_validation_batch(batch_info, data, target, tta)
+                else:
+                    with precision.autocast():
+                        self.feed_validation_batch(batch_info, data, target, tta)
+
                 batch_info.on_validation_batch_end()
 
+                if stateful:
+                    state = batch_info['state']
+
+    def feed_validation_batch(self, batch_info, data, target, tta=None):
+        """ Run single batch of validation data, possibly consisting of augmented views of each sample """
+        if tta is None:
+            return self.feed_batch(batch_info, data, target)
+
+        data, target = data.to(self.device), target.to(self.device)
+
+        # All views go through the model in a single forward pass
+        batch_size, views = data.shape[:2]
+        output = self.model(data.flatten(0, 1))
+        output = tta.reduce(output.view(batch_size, views, *output.shape[1:]))
+
+        # First view of each sample is not augmented
+        data = data[:, 0]
+        loss = self.model.loss_value(data, target, output)
+
+        batch_info['data'] = data
+        batch_info['target'] = target
+        batch_info['output'] = output
+        batch_info['loss'] = loss
+
+        return loss
+
     def feed_batch(self, batch_info, data, target):
         """ Run single batch of data """
         data, target = data.to(self.device), target.to(self.device)
-        output, loss = self.model.loss(data, target)
+
+        if 'state' in batch_info:
+            state = batch_info['state']
+            output, loss, state = self.model_loss()(data, target, state=state, stateful=True)
+
+            # Gradients don't propagate back to previous batches
+            batch_info['state'] = detach_state(state)
+        else:
+            output, loss = self.model_loss()(data, target)
 
         # Store extra batch information for calculation of the statistics
         batch_info['data'] = data
@@ -99,14 +222,54 @@ class Learner:
 
     def train_batch(self, batch_info, data, target):
         """ Train single batch of data """
-        batch_info.optimizer.zero_grad()
-        loss = self.feed_batch(batch_info, data, target)
-        loss.backward()
+        # Mixed precision settings, if enabled by a callback
+        precision = batch_info.get('precision')
+
+        window_start = batch_info.batch_number - batch_info.batch_number % self.accumulation_steps
+        # Last accumulation window of the epoch may be shorter
+        window_size = max(1, min(self.accumulation_steps, batch_info.batches_per_epoch - window_start))
+
+        if batch_info.batch_number == window_start:
+            batch_info.optimizer.zero_grad()
+
+        last_in_window = batch_info.batch_number == window_start + window_size - 1
+
+        if last_in_window or not distributed.is_distributed():
+            sync_context = contextlib.nullcontext()
+        else:
+            # Gradients are synchronized across processes only once, on the last batch of the window
+            sync_context = self.model_loss().no_sync()
+
+        with sync_context:
+            if precision is None:
+                loss = self.feed_batch(batch_info, data, target)
+            else:
+                with precision.autocast():
+                    loss = self.feed_batch(batch_info, data, target)
+
+            # Gradient is averaged over the accumulation window
+            scaled_loss = loss / window_size if window_size > 1 else loss
+
+            if precision is None:
+                scaled_loss.backward()
+            else:
+                precision.backward(scaled_loss)
+
+        if not last_in_window:
+            # Keep accumulating gradients
+            return
 
         if self.max_grad_norm is not None:
+            if precision is not None:
+                precision.unscale_(batch_info.optimizer)
+
             batch_info['grad_norm'] = torch.nn.utils.clip_grad_norm_(
                 filter(lambda p: p.requires_grad, self.model.parameters()),
                 max_norm=self.max_grad_norm
             )
 
-        batch_info.optimizer.step()
+        if precision is None:
+            batch_info.optimizer.step()
+        else:
+            precision.step(batch_info.optimizer)
+
@@ -3,6 +3,7 @@ import os.path
 import torch
 
 from vel.exceptions import VelInitializationException
+from vel.internals.config_cache import ConfigCache
 from vel.internals.parser import Parser
 from vel.internals.provider import Provider
 
@@ -31,15 +32,29 @@ class ModelConfig:
                 return ModelConfig.find_project_directory(up_path)
 
     @classmethod
-    def from_file(cls, filename: str, run_number: int, continue_training=False, seed: int=None, device: str='cuda', params=None):
-        """ Create model config from file """
-        with open(filename, 'r') as fp:
-            model_config_contents = Parser.parse(fp)
-
+    def from_file(cls, filename: str, run_number: int, continue_training=False, seed: int=None, device: str='cuda',
+                  params=None, cache: bool=True):
+        """
+        Create model config from file.
+        Parsed contents are cached, keyed by the contents of the config and project files.
+        """
         project_config_path = ModelConfig.find_project_directory(os.path.dirname(os.path.abspath(filename)))
 
-        with open(os.path.join(project_config_path, cls.PROJECT_FILE_NAME), 'r') as fp:
-            project_config_contents = Parser.parse(fp)
+        with open(filename, 'rb') as fp:
+            model_config_data = fp.read()
+
+        with open(os.path.join(project_config_path, cls.PROJECT_FILE_NAME), 'rb') as fp:
+            project_config_data = fp.read()
+
+        def parse():
+            return Parser.parse(model_config_data), Parser.parse(project_config_data)
+
+        if cache:
+            model_config_contents, project_config_contents = ConfigCache().get_or_compute(
+                [model_config_data, project_config_data], parse
+            )
+        else:
+            model_config_contents, project_config_contents = parse()
 
         aggregate_dictionary = {
             **project_config_contents,
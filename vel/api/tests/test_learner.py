@@ -0,0 +1,137 @@
+import nose.tools as t
+import numpy.testing as nt
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+
+from vel.api import Learner, TrainingInfo, EpochInfo, BatchInfo
+from vel.api.base import SupervisedModel, Source
+from vel.models.rnn.multilayer_sequence_gru import MultilayerSequenceGRU
+
+
+class LinearModel(SupervisedModel):
+    """ Simple linear regression model """
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.model = nn.Linear(4, 1)
+
+    def forward(self, x):
+        return self.model(x)
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return F.mse_loss(y_pred, y_true)
+
+
+def get_data():
+    torch.manual_seed(1)
+    x = torch.randn(64, 4)
+    y = x @ torch.tensor([[1.0], [-2.0], [0.5], [3.0]])
+    return x, y
+
+
+def train(learner, batches, batches_per_epoch):
+    """ Train on supplied batches within a single epoch, return optimizer steps taken """
+    optimizer = optim.SGD(learner.model.parameters(), lr=0.1)
+    training_info = TrainingInfo(metrics=[], callbacks=[])
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=batches_per_epoch, optimizer=optimizer)
+    epoch_info.accumulation_steps = learner.accumulation_steps
+
+    steps = []
+
+    for batch_idx, (x, y) in enumerate(batches):
+        batch_info = BatchInfo(epoch_info, batch_idx)
+        weight_before = learner.model.model.weight.detach().clone()
+        learner.train_batch(batch_info, x, y)
+        steps.append(not torch.equal(weight_before, learner.model.model.weight))
+
+    return steps
+
+
+def test_gradient_accumulation_matches_full_batch():
+    x, y = get_data()
+
+    full_learner = Learner(torch.device('cpu'), LinearModel())
+    train(full_learner, [(x, y)], batches_per_epoch=1)
+
+    accumulating_learner = Learner(torch.device('cpu'), LinearModel(), accumulation_steps=4)
+    steps = train(accumulating_learner, [(x[i:i+16], y[i:i+16]) for i in range(0, 64, 16)], batches_per_epoch=4)
+
+    t.assert_equal(steps, [False, False, False, True])
+
+    nt.assert_allclose(
+        accumulating_learner.model.model.weight.detach().numpy(),
+        full_learner.model.model.weight.detach().numpy(),
+        rtol=1e-5
+    )
+
+
+def test_gradient_accumulation_last_window():
+    """ Last, shorter window of the epoch still performs an optimizer step """
+    x, y = get_data()
+
+    learner = Learner(torch.device('cpu'), LinearModel(), accumulation_steps=4)
+    steps = train(learner, [(x[i:i+16], y[i:i+16]) for i in range(0, 64, 16)] * 2, batches_per_epoch=6)
+
+    t.assert_equal(steps[:6], [False, False, False, True, False, True])
+
+
+def test_optimizer_step_number():
+    training_info = TrainingInfo(metrics=[], callbacks=[])
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=10)
+    epoch_info.accumulation_steps = 4
+
+    t.assert_equal([BatchInfo(epoch_info, i).optimizer_step_number for i in range(10)], [0] * 4 + [1] * 4 + [2] * 2)
+    t.assert_equal(BatchInfo(epoch_info, 0).optimizer_steps_per_epoch, 3)
+
+
+class StatefulSource(Source):
+    """ Source of contiguous stripes of a sequence """
+    def __init__(self, batches):
+        super().__init__()
+        self.batches = batches
+
+    def train_loader(self):
+        return self.batches
+
+    def train_iterations_per_epoch(self):
+        return len(self.batches)
+
+    @property
+    def is_stateful(self):
+        return True
+
+
+def test_stateful_training_carries_state():
+    model = MultilayerSequenceGRU(alphabet_size=5, hidden_layers=[6], output_dim=5)
+    learner = Learner(torch.device('cpu'), model)
+
+    states = []
+    loss_state = model.loss_state
+
+    def recording_loss_state(x_data, y_true, state=None):
+        states.append(state)
+        return loss_state(x_data, y_true, state)
+
+    model.loss_state = recording_loss_state
+
+    sequence = torch.randint(1, 5, (2, 13))
+    source = StatefulSource([
+        (sequence[:, i:i+4].contiguous(), sequence[:, i+1:i+5].contiguous()) for i in range(0, 12, 4)
+    ])
+
+    optimizer = optim.SGD(model.parameters(), lr=0.1)
+    training_info = TrainingInfo(metrics=model.metrics(), callbacks=[])
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=3, optimizer=optimizer)
+
+    learner.train_epoch(epoch_info, source)
+
+    # Epoch starts from the initial state, later batches continue from the detached state of previous ones
+    t.assert_equal(len(states), 3)
+    t.assert_is_none(states[0])
+
+    # Single layer state of shape [layers, batch, hidden]
+    t.assert_equal(len(states[1]), 1)
+    t.assert_equal(tuple(states[1][0].shape), (1, 2, 6))
+    t.assert_false(states[1][0].requires_grad)
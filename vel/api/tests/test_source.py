@@ -0,0 +1,67 @@
+import random
+
+import nose.tools as t
+import numpy as np
+import torch
+import torch.utils.data as data
+
+from vel.api.base import TrainingData
+from vel.api.base.source import seed_worker
+
+
+class RandomDataset(data.Dataset):
+    """ Dataset returning draws from the python and numpy random generators of the process loading it """
+    def __getitem__(self, index):
+        return torch.tensor([random.random(), np.random.rand()]), index
+
+    def __len__(self):
+        return 8
+
+
+def make_training_data(**kwargs):
+    return TrainingData(RandomDataset(), RandomDataset(), batch_size=2, **kwargs)
+
+
+def test_loader_kwargs_without_workers():
+    source = make_training_data(num_workers=0, persistent_workers=True, prefetch_factor=4, pin_memory=True)
+    loader = source.train_loader()
+
+    # Worker related options do not apply to loading in the main process
+    t.assert_false(loader.persistent_workers)
+    t.assert_is_none(loader.worker_init_fn)
+    t.assert_true(loader.pin_memory)
+
+
+def test_loader_kwargs_with_workers():
+    source = make_training_data(num_workers=2, persistent_workers=True, prefetch_factor=4, drop_last=True)
+
+    for loader in [source.train_loader(), source.val_loader()]:
+        t.assert_equal(loader.num_workers, 2)
+        t.assert_true(loader.persistent_workers)
+        t.assert_equal(loader.prefetch_factor, 4)
+        t.assert_is(loader.worker_init_fn, seed_worker)
+
+    t.assert_true(source.train_loader().drop_last)
+    t.assert_false(source.val_loader().drop_last)
+
+
+def test_loader_kwargs_unseeded_workers():
+    source = make_training_data(num_workers=2, seed_workers=False)
+    t.assert_is_none(source.train_loader().worker_init_fn)
+
+
+def test_seed_worker():
+    torch.manual_seed(123)
+    seed_worker(0)
+
+    t.assert_equal(np.random.rand(), np.random.RandomState(123).rand())
+    t.assert_equal(random.random(), random.Random(123).random())
+
+
+def test_seeded_workers_draw_different_values():
+    source = make_training_data(num_workers=2)
+    values = torch.cat([x for x, _ in source.val_loader()])
+
+    # Forked workers must not repeat random draws of each other
+    t.assert_equal(len(set(values[:, 0].tolist())), len(values))
+    t.assert_equal(len(set(values[:, 1].tolist())), len(values))
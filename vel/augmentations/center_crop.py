@@ -17,6 +17,8 @@ class CenterCrop(data.Augmentation):
         tfm_y : TfmType
             type of y transformation.
     """
+    cacheable = True
+
     def __init__(self, size, mode='x', tags=None):
         super().__init__(mode, tags)
 
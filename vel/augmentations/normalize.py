@@ -1,10 +1,12 @@
 import numpy as np
+import torch
 
 import vel.api.data as data
 
 
 class Normalize(data.Augmentation):
     """ Normalize input mean and standard deviation """
+    supports_batch = True
 
     def __init__(self, mean, std, mode='x', tags=None):
         super().__init__(mode, tags)
@@ -14,6 +16,11 @@ class Normalize(data.Augmentation):
     def __call__(self, x_data):
         return (x_data - self.mean) / self.std
 
+    def batch(self, x_batch):
+        mean = torch.as_tensor(self.mean, device=x_batch.device).view(1, -1, 1, 1)
+        std = torch.as_tensor(self.std, device=x_batch.device).view(1, -1, 1, 1)
+        return (x_batch - mean) / std
+
     def denormalize(self, x_data):
         """ Operation reverse to normalization """
         return x_data * self.std + self.mean
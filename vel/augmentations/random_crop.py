@@ -6,6 +6,9 @@ https://github.com/pytorch/vision/blob/master/torchvision/transforms/transforms.
 import numbers
 import random
 
+import torch
+import torch.nn.functional as F
+
 import vel.api.data as data
 
 
@@ -23,6 +26,7 @@ class RandomCrop(data.Augmentation):
         pad_if_needed (boolean): It will pad the image if smaller than the
             desired size to avoid raising an exception.
     """
+    supports_batch = True
 
     def __init__(self, size, padding=0, padding_mode='constant', pad_if_needed=False, mode='x', tags=None):
         super().__init__(mode, tags)
@@ -81,6 +85,42 @@ class RandomCrop(data.Augmentation):
 
         return data.crop(img, j, i, w, h)
 
+    def batch(self, x_batch):
+        """
+        Crop each image of a [B, C, H, W] batch at its own random location.
+
+        Crops are gathered with a single advanced indexing operation over the padded batch.
+        Reflect padding of tensors does not repeat the edge pixel, unlike the per-sample version.
+        """
+        th, tw = self.size
+
+        pad_h = pad_w = self.padding
+
+        if self.pad_if_needed:
+            pad_h = max(pad_h, (1 + th - x_batch.size(2)) // 2)
+            pad_w = max(pad_w, (1 + tw - x_batch.size(3)) // 2)
+
+        if pad_h > 0 or pad_w > 0:
+            x_batch = F.pad(x_batch, (pad_w, pad_w, pad_h, pad_h), mode=self.padding_mode)
+
+        batch_size, channels, h, w = x_batch.shape
+
+        if h == th and w == tw:
+            return x_batch
+
+        device = x_batch.device
+
+        i = torch.randint(0, h - th + 1, (batch_size,), device=device)
+        j = torch.randint(0, w - tw + 1, (batch_size,), device=device)
+
+        rows = (i.view(-1, 1) + torch.arange(th, device=device).view(1, -1)).view(batch_size, 1, th, 1)
+        cols = (j.view(-1, 1) + torch.arange(tw, device=device).view(1, -1)).view(batch_size, 1, 1, tw)
+
+        batch_idx = torch.arange(batch_size, device=device).view(-1, 1, 1, 1)
+        channel_idx = torch.arange(channels, device=device).view(1, -1, 1, 1)
+
+        return x_batch[batch_idx, channel_idx, rows, cols]
+
     def __repr__(self):
         return self.__class__.__name__ + '(size={0}, padding={1})'.format(self.size, self.padding)
 
@@ -1,11 +1,13 @@
 import random
 import numpy as np
+import torch
 
 import vel.api.data as data
 
 
 class RandomHorizontalFlip(data.Augmentation):
     """ Apply a horizontal flip randomly to input images """
+    supports_batch = True
 
     def __init__(self, p=0.5, mode='x', tags=None):
         super().__init__(mode, tags)
@@ -23,9 +25,14 @@ class RandomHorizontalFlip(data.Augmentation):
             return np.fliplr(img).copy()
         return img
 
+    def batch(self, x_batch):
+        """ Flip a random subset of the [B, C, H, W] batch """
+        flip_mask = torch.rand(x_batch.size(0), device=x_batch.device) < self.p
+        return torch.where(flip_mask.view(-1, 1, 1, 1), x_batch.flip(3), x_batch)
+
     def __repr__(self):
         return self.__class__.__name__ + '(p={})'.format(self.p)
 
 
-def create(p=0.5):
-    return RandomHorizontalFlip(p)
\ No newline at end of file
+def create(p=0.5, mode='x', tags=None):
+    return RandomHorizontalFlip(p, mode=mode, tags=tags)
@@ -1,10 +1,12 @@
 import random
+import torch
 
 import vel.api.data as data
 
 
 class RandomLighting(data.Augmentation):
-    """ Apply a horizontal flip randomly to input images """
+    """ Randomly adjust balance and contrast of input images """
+    supports_batch = True
 
     def __init__(self, b, c, mode='x', tags=None):
         super().__init__(mode, tags)
@@ -17,8 +19,24 @@ class RandomLighting(data.Augmentation):
         rand_c = -1/(rand_c-1) if rand_c<0 else rand_c+1
         return data.lighting(img, rand_b, rand_c)
 
+    def batch(self, x_batch):
+        """ Adjust lighting of each image in the [B, C, H, W] batch independently """
+        batch_size = x_batch.size(0)
+
+        rand_b = (torch.rand(batch_size, device=x_batch.device) * 2 - 1) * self.b
+        rand_c = (torch.rand(batch_size, device=x_batch.device) * 2 - 1) * self.c
+        rand_c = torch.where(rand_c < 0, -1 / (rand_c - 1), rand_c + 1)
+
+        mu = x_batch.reshape(batch_size, -1).mean(dim=1)
+
+        rand_b = rand_b.view(-1, 1, 1, 1)
+        rand_c = rand_c.view(-1, 1, 1, 1)
+        mu = mu.view(-1, 1, 1, 1)
+
+        return ((x_batch - mu) * rand_c + mu + rand_b).clamp(0.0, 1.0)
+
     def __repr__(self):
-        return self.__class__.__name__ + '(p={})'.format(self.p)
+        return self.__class__.__name__ + '(b={}, c={})'.format(self.b, self.c)
 
 
 def create(b, c, mode='x', tags=None):
@@ -3,13 +3,19 @@ Code based on:
 https://github.com/fastai/fastai/blob/master/fastai/transforms.py
 """
 import cv2
+import math
 import random
 
+import torch
+import torch.nn.functional as F
+
 import vel.api.data as data
 
 
 class RandomRotate(data.Augmentation):
     """ Rotate image randomly by an angle between (-deg, +deg) """
+    supports_batch = True
+
     def __init__(self, deg, p=0.75, mode='x', tags=None):
         super().__init__(mode, tags)
         self.deg = deg
@@ -23,6 +29,27 @@ class RandomRotate(data.Augmentation):
             # No, don't do it
             return x_data
 
+    def batch(self, x_batch):
+        """ Rotate each image of a [B, C, H, W] batch with probability p by its own random angle """
+        batch_size = x_batch.size(0)
+        device = x_batch.device
+
+        angles = (torch.rand(batch_size, device=device) * 2 - 1) * math.radians(self.deg)
+        angles = torch.where(torch.rand(batch_size, device=device) < self.p, angles, torch.zeros_like(angles))
+
+        # Grid coordinates are normalized to [-1, 1] along each axis, so rotation has to account for aspect ratio
+        height, width = x_batch.shape[2:]
+        cos, sin = torch.cos(angles), torch.sin(angles)
+        zeros = torch.zeros_like(angles)
+
+        theta = torch.stack([
+            torch.stack([cos, -sin * height / width, zeros], dim=1),
+            torch.stack([sin * width / height, cos, zeros], dim=1)
+        ], dim=1).to(x_batch.dtype)
+
+        grid = F.affine_grid(theta, x_batch.shape, align_corners=False)
+        return F.grid_sample(x_batch, grid, padding_mode='reflection', align_corners=False)
+
 
 def create(deg, p=0.75, mode='x', tags=None):
     return RandomRotate(deg, p, mode, tags)
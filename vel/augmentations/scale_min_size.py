@@ -9,6 +9,8 @@ import vel.api.data as data
 
 class ScaleMinSize(data.Augmentation):
     """ Scales the image so that the smallest axis is of 'size'. """
+    cacheable = True
+
     def __init__(self, size, mode='x', tags=None):
         super().__init__(mode, tags)
         self.size = size
@@ -0,0 +1,126 @@
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+import torch
+
+import vel.api.data as data
+
+from vel.augmentations.normalize import Normalize
+from vel.augmentations.random_crop import RandomCrop
+from vel.augmentations.random_horizontal_flip import RandomHorizontalFlip
+from vel.augmentations.random_lighting import RandomLighting
+from vel.augmentations.to_array import ToArray
+from vel.augmentations.to_tensor import ToTensor
+
+
+def get_batch():
+    """ Return a deterministic [4, 3, 6, 6] batch """
+    return torch.arange(4 * 3 * 6 * 6, dtype=torch.float32).view(4, 3, 6, 6) / (4 * 3 * 6 * 6)
+
+
+def test_split_batch_transformations():
+    crop = RandomCrop(size=(6, 6), padding=2)
+    flip = RandomHorizontalFlip()
+    normalize = Normalize(mean=[0.5, 0.5, 0.5], std=[0.2, 0.2, 0.2])
+    to_array = ToArray()
+    to_tensor = ToTensor()
+
+    sample, batch = data.dataflow.split_batch_transformations([to_array, crop, flip, normalize, to_tensor])
+
+    t.assert_equal(sample, [to_array, to_tensor])
+    t.assert_equal(batch, [crop, flip, normalize])
+
+
+def test_split_batch_transformations_fallback():
+    crop = RandomCrop(size=(6, 6), padding=2)
+    to_array = ToArray()
+
+    # No tensor conversion at the end - samples would not collate into [B, C, H, W]
+    sample, batch = data.dataflow.split_batch_transformations([to_array, crop])
+
+    t.assert_equal(sample, [to_array, crop])
+    t.assert_equal(batch, [])
+
+
+def test_batch_crop():
+    x_batch = get_batch()
+    crop = RandomCrop(size=(4, 4), padding=0)
+
+    result = crop.batch(x_batch)
+
+    t.assert_equal(tuple(result.shape), (4, 3, 4, 4))
+
+    # Each crop has to be a contiguous window of its own image
+    for idx in range(4):
+        image = x_batch[idx].numpy()
+        crop_image = result[idx].numpy()
+
+        found = any(
+            np.array_equal(image[:, i:i+4, j:j+4], crop_image) for i in range(3) for j in range(3)
+        )
+
+        t.assert_true(found)
+
+
+def test_batch_crop_padding():
+    x_batch = get_batch()
+    crop = RandomCrop(size=(6, 6), padding=2, padding_mode='constant')
+
+    result = crop.batch(x_batch)
+
+    t.assert_equal(tuple(result.shape), (4, 3, 6, 6))
+
+
+def test_batch_flip():
+    x_batch = get_batch()
+
+    nt.assert_array_equal(RandomHorizontalFlip(p=1.0).batch(x_batch).numpy(), x_batch.flip(3).numpy())
+    nt.assert_array_equal(RandomHorizontalFlip(p=0.0).batch(x_batch).numpy(), x_batch.numpy())
+
+
+def test_batch_normalize_matches_sample():
+    x_batch = get_batch()
+    normalize = Normalize(mean=[0.1, 0.2, 0.3], std=[0.5, 0.6, 0.7])
+
+    result = normalize.batch(x_batch)
+
+    for idx in range(4):
+        sample_result = normalize(x_batch[idx].numpy().transpose(1, 2, 0)).transpose(2, 0, 1)
+        nt.assert_allclose(result[idx].numpy(), sample_result, rtol=1e-5)
+
+
+def test_batch_lighting_identity():
+    x_batch = get_batch()
+    nt.assert_allclose(RandomLighting(0.0, 0.0).batch(x_batch).numpy(), x_batch.numpy(), rtol=1e-6)
+
+
+def test_batch_augmented_loader_device():
+    import torch.utils.data
+
+    x_batch = get_batch()
+    samples = [(image.numpy().transpose(1, 2, 0), label) for label, image in enumerate(x_batch)]
+
+    dataflow = data.DataFlow(samples, [RandomHorizontalFlip(p=1.0), ToTensor()], tag='train', batch_augmentations=True)
+    t.assert_equal(len(dataflow.batch_transformations), 1)
+
+    loader = data.BatchAugmentedLoader(
+        torch.utils.data.DataLoader(dataflow, batch_size=2), dataflow, device=torch.device('cpu')
+    )
+
+    batches = list(loader)
+
+    t.assert_equal(len(batches), 2)
+
+    result, labels = batches[0]
+
+    t.assert_equal(result.device, torch.device('cpu'))
+    nt.assert_allclose(result.numpy(), x_batch[:2].flip(3).numpy())
+    nt.assert_array_equal(labels.numpy(), [0, 1])
+
+
+def test_batch_lighting_non_contiguous():
+    x_batch = get_batch().permute(0, 1, 3, 2)
+    t.assert_false(x_batch.is_contiguous())
+
+    result = RandomLighting(0.0, 0.0).batch(x_batch)
+    nt.assert_allclose(result.numpy(), x_batch.numpy(), rtol=1e-6)
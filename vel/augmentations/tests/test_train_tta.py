@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy as np
+import PIL.Image as Image
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+import vel.api.data as vel_data
+
+from vel.api import Learner, TrainingInfo, EpochInfo
+from vel.api.base import SupervisedModel, TrainingData
+from vel.augmentations.center_crop import CenterCrop
+from vel.augmentations.random_horizontal_flip import RandomHorizontalFlip
+from vel.augmentations.scale_min_size import ScaleMinSize
+from vel.augmentations.to_array import ToArray
+from vel.augmentations.to_tensor import ToTensor
+from vel.augmentations.tta.train_tta import TrainTTA
+from vel.metrics.loss_metric import Loss
+from vel.sources.img_dir_source import ImageDirSource, CachedImageDirSource, cacheable_prefix
+
+
+class CountingModel(SupervisedModel):
+    """ Linear classifier counting its forward passes """
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(3 * 4 * 4, 2)
+        self.forward_calls = 0
+
+    def forward(self, x):
+        self.forward_calls += 1
+        return F.log_softmax(self.linear(x.flatten(1)), dim=1)
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return F.nll_loss(y_pred, y_true)
+
+    def metrics(self):
+        return [Loss()]
+
+
+def get_source(batch_augmentations):
+    """ Source where training augmentation always flips the image """
+    images = np.random.RandomState(0).rand(10, 4, 4, 3).astype(np.float32)
+    dataset = [(images[i], i % 2) for i in range(10)]
+
+    return TrainingData(
+        dataset, dataset, num_workers=0, batch_size=4, batch_augmentations=batch_augmentations,
+        augmentations=[RandomHorizontalFlip(p=1.0, tags=['train']), ToTensor()]
+    )
+
+
+def test_tta_loader_views():
+    for batch_augmentations in [False, True]:
+        source = get_source(batch_augmentations)
+        x_batch, y_batch = next(iter(TrainTTA(n_augmentations=2).loader(source)))
+
+        t.assert_equal(tuple(x_batch.shape), (4, 3, 3, 4, 4))
+        t.assert_equal(tuple(y_batch.shape), (4,))
+
+        original = x_batch[:, 0]
+        t.assert_true(torch.equal(x_batch[:, 1], original.flip(3)))
+        t.assert_true(torch.equal(x_batch[:, 2], original.flip(3)))
+
+
+def test_tta_validation_single_forward():
+    source = get_source(batch_augmentations=False)
+    learner = Learner(torch.device('cpu'), CountingModel())
+
+    training_info = TrainingInfo(metrics=learner.metrics())
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=source.val_iterations_per_epoch())
+
+    learner.validation_epoch(epoch_info, source, tta=TrainTTA(n_augmentations=3))
+    epoch_info.result_accumulator.freeze_results('tta')
+
+    # One forward per batch regardless of the number of views
+    t.assert_equal(learner.model.forward_calls, source.val_iterations_per_epoch())
+    t.assert_true(np.isfinite(epoch_info.result_accumulator.result()['tta:loss']))
+
+
+def test_tta_views_from_uncached_images():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'valid')
+
+        for class_name in ['cats', 'dogs']:
+            os.makedirs(os.path.join(image_path, class_name))
+
+            for idx in range(2):
+                image = np.random.RandomState(idx).randint(0, 256, size=(6, 8, 3)).astype(np.uint8)
+                Image.fromarray(image).save(os.path.join(image_path, class_name, f'{idx}.png'))
+
+        augmentations = [
+            ToArray(),
+            ScaleMinSize(8, tags=['train']), CenterCrop(4, tags=['train']),
+            ScaleMinSize(4, tags=['val']), CenterCrop(4, tags=['val']),
+            ToTensor()
+        ]
+
+        image_folder = ImageDirSource(image_path)
+        cached = CachedImageDirSource(
+            image_folder, os.path.join(temp_dir, 'cache', 'valid'), cacheable_prefix(augmentations, 'val')
+        )
+
+        source = TrainingData(cached, cached, num_workers=0, batch_size=4, augmentations=augmentations)
+        x_batch, y_batch = next(iter(TrainTTA(n_augmentations=1).loader(source)))
+
+        val_flow = vel_data.DataFlow(cached, augmentations, tag='val')
+        train_flow = vel_data.DataFlow(image_folder, augmentations, tag='train')
+
+        for idx in range(4):
+            t.assert_true(torch.equal(x_batch[idx, 0], val_flow[idx][0]))
+            # Training augmentations start from the original image, not the cached center crop
+            t.assert_true(torch.equal(x_batch[idx, 1], train_flow[idx][0]))
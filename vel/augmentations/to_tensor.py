@@ -1,15 +1,16 @@
 import numpy as np
 
-import torchvision.transforms.functional as F
-
 import vel.api.data as data
 
 
 class ToTensor(data.Augmentation):
+    tensor_conversion = True
+
     def __init__(self, mode='x', tags=None):
         super().__init__(mode, tags)
 
     def __call__(self, datum):
+        import torchvision.transforms.functional as F
         return F.to_tensor(datum)
 
     def denormalize(self, datum):
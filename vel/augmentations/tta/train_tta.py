@@ -1,106 +1,93 @@
-# import torch
-# import torch.utils.data as tdata
-#
-# import vel.api.data as wdata
-#
-#
-# class TrainTTALoader:
-#     def __init__(self, n_augmentations, batch_size, data_source, augmentations, num_workers):
-#         self.n_augmentations = n_augmentations
-#         self.data_source = data_source
-#         self.augmentations = augmentations
-#
-#         self.val_ds = wdata.DataFlow(self.data_source, augmentations, tag='val')
-#         self.train_ds = wdata.DataFlow(self.data_source, augmentations, tag='train')
-#
-#         self.val_loader = tdata.DataLoader(
-#             self.val_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers
-#         )
-#
-#         self.train_loader = tdata.DataLoader(
-#             self.train_ds, batch_size=batch_size, shuffle=False, num_workers=num_workers
-#         )
-#
-#     def __len__(self):
-#         return (1 + self.n_augmentations) * len(self.val_loader)
-#
-#     def __iter__(self):
-#         iterlist = [iter(self.val_loader)]
-#
-#         for _ in range(self.n_augmentations):
-#             iterlist.append(iter(self.train_loader))
-#
-#         for _ in range(len(self.val_loader)):
-#             for iterator in iterlist:
-#                 yield next(iterator)
-#
-#
-# class TrainTTAAccumulator:
-#     def __init__(self, metric_accumulator, n_augmentations, data_source):
-#         self.metric_accumulator = metric_accumulator
-#
-#         self.source_elements = len(data_source)
-#         self.n_augmentations = n_augmentations
-#
-#         self.data = None
-#         self.target = None
-#
-#         self.accumulated_output = []
-#         self.accumulated_context = []
-#
-#         self.index = 0
-#
-#     # def calculate(self, data, target, output, context):
-#     def calculate(self, data_dict):
-#         """ Accumulate results """
-#         data = data_dict['data']
-#         target = data_dict['target']
-#         output = data_dict['output']
-#
-#         if self.index == 0:
-#             self.data = data
-#
-#         self.target = target
-#
-#         self.accumulated_output.append(output)
-#         self.accumulated_context.append(context)
-#
-#         self.index += 1
-#
-#         if self.index == (1 + self.n_augmentations):
-#             new_output = torch.mean(torch.stack(self.accumulated_output, dim=-1), dim=-1)
-#             new_context = {
-#                 k: torch.mean(torch.stack([c[k] for c in self.accumulated_context], dim=-1), dim=-1) for k in context.keys()
-#             }
-#
-#             self.metric_accumulator.calculate(self.data, self.target, new_output, new_context)
-#
-#             self.index = 0
-#             self.data = None
-#             self.target = None
-#             self.accumulated_output = []
-#             self.accumulated_context = []
-#
-#
-# class TrainTTA:
-#     """ Test time augmentation that generates additional samples according to the training set augmentations """
-#     def __init__(self, n_augmentations):
-#         self.n_augmentations = n_augmentations
-#
-#     def loader(self, data_source, augmentations, batch_size, num_workers):
-#         """ Return loader for the test-time-augmentation set """
-#         return TrainTTALoader(
-#             n_augmentations=self.n_augmentations,
-#             batch_size=batch_size,
-#             data_source=data_source,
-#             augmentations=augmentations,
-#             num_workers=num_workers
-#         )
-#
-#     def accumulator(self, metric_accumulator, val_source):
-#         """ Reset internal state """
-#         return TrainTTAAccumulator(metric_accumulator, self.n_augmentations, val_source)
-#
-#
-# def create(n_augmentations):
-#     return TrainTTA(n_augmentations)
+import torch
+import torch.utils.data as data
+
+import vel.api.data as vel_data
+
+from vel.api.base import TrainingData
+
+
+class TrainTTADataset(data.Dataset):
+    """
+    Validation samples together with their augmented views.
+    First view has the validation transformations applied, remaining ones are augmented as in training.
+    """
+    def __init__(self, val_flow: vel_data.DataFlow, train_flow: vel_data.DataFlow, n_augmentations):
+        self.val_flow = val_flow
+        self.train_flow = train_flow
+        self.n_augmentations = n_augmentations
+
+    def __getitem__(self, index):
+        x, y = self.val_flow[index]
+        views = [x] + [self.train_flow[index][0] for _ in range(self.n_augmentations)]
+        return torch.stack(views, dim=0), y
+
+    def __len__(self):
+        return len(self.val_flow)
+
+
+class TrainTTALoader:
+    """ Loader of validation batches of shape [batch, 1 + n_augmentations, ...] """
+    def __init__(self, loader, val_flow: vel_data.DataFlow, train_flow: vel_data.DataFlow):
+        self.loader = loader
+        self.val_flow = val_flow
+        self.train_flow = train_flow
+
+    def __iter__(self):
+        for x_batch, y_batch in self.loader:
+            if self.val_flow.batch_transformations or self.train_flow.batch_transformations:
+                x_batch = torch.cat([
+                    self.val_flow.augment_batch(x_batch[:, 0]).unsqueeze(1),
+                    self.train_flow.augment_batch(x_batch[:, 1:].flatten(0, 1)).view_as(x_batch[:, 1:])
+                ], dim=1)
+
+            yield x_batch, y_batch
+
+    def __len__(self):
+        return len(self.loader)
+
+
+class TrainTTA:
+    """
+    Test time augmentation that generates additional views of validation samples according to the training set
+    augmentations. All views of a batch are evaluated in a single forward pass and model outputs are reduced
+    over the views.
+
+    If the validation dataset caches images with validation transformations already applied, augmented views are
+    generated from the original, uncached images instead.
+    """
+    def __init__(self, n_augmentations, reduction='mean'):
+        if reduction not in ('mean', 'max'):
+            raise ValueError(f"Unknown reduction '{reduction}'")
+
+        self.n_augmentations = n_augmentations
+        self.reduction = reduction
+
+    def loader(self, source: TrainingData):
+        """ Return loader of the validation set with augmented views """
+        val_flow = vel_data.DataFlow(
+            source.val_source, source.augmentations, tag='val', batch_augmentations=source.batch_augmentations
+        )
+        train_flow = vel_data.DataFlow(
+            getattr(source.val_source, 'uncached_dataset', source.val_source), source.augmentations, tag='train',
+            batch_augmentations=source.batch_augmentations
+        )
+
+        loader = data.DataLoader(
+            TrainTTADataset(val_flow, train_flow, self.n_augmentations),
+            batch_size=source.batch_size, shuffle=False, num_workers=source.num_workers,
+            pin_memory=source.pin_memory
+        )
+
+        return TrainTTALoader(loader, val_flow, train_flow)
+
+    def reduce(self, output):
+        """ Reduce model output of shape [batch, views, ...] over the views """
+        if self.reduction == 'mean':
+            return output.mean(dim=1)
+        else:
+            return output.max(dim=1)[0]
+
+
+def create(n_augmentations, reduction='mean'):
+    """ Vel creation function """
+    return TrainTTA(n_augmentations, reduction)
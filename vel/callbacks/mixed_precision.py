@@ -0,0 +1,79 @@
+import torch
+
+from vel.api import BatchInfo, TrainingInfo
+from vel.api.base import Callback
+
+
+PRECISION_DTYPES = {
+    'fp32': None,
+    'fp16': torch.float16,
+    'bf16': torch.bfloat16,
+}
+
+
+def create_grad_scaler(device_type, enabled):
+    """ Gradient scaler for given device, on older PyTorch versions only CUDA one is available """
+    if hasattr(torch, 'amp') and hasattr(torch.amp, 'GradScaler'):
+        return torch.amp.GradScaler(device_type, enabled=enabled)
+    else:
+        return torch.cuda.amp.GradScaler(enabled=enabled)
+
+
+class MixedPrecision(Callback):
+    """
+    Run forward pass and loss calculation under autocast in a lower precision.
+
+    Loss is scaled for float16, which has a narrow range. For bfloat16, which has the same range as float32,
+    loss scaling is unnecessary and the scaler is disabled. Learners find this object under the 'precision' key
+    of the batch info.
+    """
+    def __init__(self, precision: str, device: torch.device):
+        if precision not in PRECISION_DTYPES:
+            raise ValueError(f"Unknown precision '{precision}', choose one of {sorted(PRECISION_DTYPES.keys())}")
+
+        self.precision = precision
+        self.dtype = PRECISION_DTYPES[precision]
+        self.device_type = torch.device(device).type
+
+        self.scaler = create_grad_scaler(self.device_type, enabled=(self.dtype == torch.float16))
+
+    def autocast(self):
+        """ Context manager running the operations in lower precision """
+        return torch.autocast(self.device_type, dtype=self.dtype)
+
+    def backward(self, tensor, gradient=None, retain_graph=None):
+        """ Backpropagate through the tensor with loss scaling applied """
+        if gradient is None:
+            self.scaler.scale(tensor).backward(retain_graph=retain_graph)
+        else:
+            tensor.backward(gradient=self.scaler.scale(gradient), retain_graph=retain_graph)
+
+    def unscale_(self, optimizer):
+        """ Unscale the gradients in place, so that they can be clipped """
+        self.scaler.unscale_(optimizer)
+
+    def step(self, optimizer):
+        """ Perform optimizer step, skipped if gradients are not finite, and update the scale """
+        self.scaler.step(optimizer)
+        self.scaler.update()
+
+    def on_batch_begin(self, batch_info: BatchInfo):
+        batch_info['precision'] = self
+
+    def on_validation_batch_begin(self, batch_info: BatchInfo):
+        batch_info['precision'] = self
+
+    def write_state_dict(self, training_info: TrainingInfo, hidden_state_dict: dict):
+        hidden_state_dict['mixed_precision/scaler'] = self.scaler.state_dict()
+
+    def load_state_dict(self, training_info: TrainingInfo, hidden_state_dict: dict):
+        # Checkpoint may come from a training started in full precision
+        scaler_state = hidden_state_dict.get('mixed_precision/scaler')
+
+        if scaler_state:
+            self.scaler.load_state_dict(scaler_state)
+
+
+def create(precision, model_config):
+    """ Vel creation function """
+    return MixedPrecision(precision, torch.device(model_config.device))
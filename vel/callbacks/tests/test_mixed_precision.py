@@ -0,0 +1,108 @@
+import nose.tools as t
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+
+from vel.api import Learner, TrainingInfo, EpochInfo, BatchInfo
+from vel.api.base import SupervisedModel
+from vel.callbacks.mixed_precision import MixedPrecision
+from vel.rl.api.base import OptimizerAlgoBase
+
+
+class LinearModel(SupervisedModel):
+    """ Simple linear regression model """
+    def __init__(self):
+        super().__init__()
+        self.model = nn.Linear(4, 1)
+
+    def forward(self, x):
+        return self.model(x)
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return F.mse_loss(y_pred.float(), y_true)
+
+
+class LinearAlgo(OptimizerAlgoBase):
+    """ Simple regression 'algorithm' """
+    def calculate_gradient(self, batch_info, device, model, rollout):
+        x, y = rollout
+        y_pred = model(x)
+        loss = F.mse_loss(y_pred.float(), y)
+        self._backward(batch_info, loss)
+        return {'loss': loss.item(), 'dtype': y_pred.dtype}
+
+
+def get_data():
+    torch.manual_seed(0)
+    x = torch.randn(64, 4)
+    y = x @ torch.tensor([[1.0], [-2.0], [0.5], [3.0]])
+    return x, y
+
+
+def get_batch_info(model, precision, lr=0.05):
+    optimizer = optim.SGD(model.parameters(), lr=lr)
+    training_info = TrainingInfo(callbacks=[precision], metrics=[])
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=1, optimizer=optimizer)
+    return BatchInfo(epoch_info, 0)
+
+
+def test_learner_bf16_cpu():
+    """ Learner trains under bfloat16 autocast on CPU, with gradient clipping """
+    x, y = get_data()
+    learner = Learner(torch.device('cpu'), LinearModel(), max_grad_norm=10.0)
+    precision = MixedPrecision('bf16', torch.device('cpu'))
+
+    losses = []
+
+    for i in range(50):
+        batch_info = get_batch_info(learner.model, precision)
+        precision.on_batch_begin(batch_info)
+        learner.train_batch(batch_info, x, y)
+
+        losses.append(batch_info['loss'].item())
+
+        t.assert_equal(batch_info['output'].dtype, torch.bfloat16)
+
+    t.assert_less(losses[-1], losses[0] * 0.1)
+
+
+def test_algo_bf16_cpu():
+    """ RL algorithm step runs under bfloat16 autocast on CPU """
+    x, y = get_data()
+    model = LinearModel()
+    algo = LinearAlgo(max_grad_norm=10.0)
+    precision = MixedPrecision('bf16', torch.device('cpu'))
+
+    batch_info = get_batch_info(model, precision)
+    precision.on_batch_begin(batch_info)
+
+    first = algo.optimizer_step(batch_info, torch.device('cpu'), model, (x, y))
+
+    for i in range(50):
+        result = algo.optimizer_step(batch_info, torch.device('cpu'), model, (x, y))
+
+    t.assert_equal(result['dtype'], torch.bfloat16)
+    t.assert_less(result['loss'], first['loss'] * 0.1)
+
+
+def test_scaler_state_roundtrip():
+    """ Loss scaler state is stored in the hidden state of the checkpoint """
+    x, y = get_data()
+    learner = Learner(torch.device('cpu'), LinearModel())
+    precision = MixedPrecision('fp16', torch.device('cpu'))
+
+    batch_info = get_batch_info(learner.model, precision)
+    precision.on_batch_begin(batch_info)
+    learner.train_batch(batch_info, x, y)
+
+    hidden_state = {}
+    precision.write_state_dict(None, hidden_state)
+
+    restored = MixedPrecision('fp16', torch.device('cpu'))
+    restored.load_state_dict(None, hidden_state)
+
+    t.assert_equal(restored.scaler.get_scale(), precision.scaler.get_scale())
+
+    # Checkpoints of full precision training don't have scaler state
+    restored.load_state_dict(None, {})
@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
 from vel.api.base import Source
@@ -13,6 +12,8 @@ class AugmentationVisualizationCommand:
 
     def run(self):
         """ Run the visualization """
+        import matplotlib.pyplot as plt
+
         dataset = self.source.train_dataset()
         num_samples = len(dataset)
 
@@ -27,7 +28,7 @@ class AugmentationVisualizationCommand:
             ax[i, 0].set_title("Original image")
 
             for j in range(self.samples):
-                augmented_image, _ = dataset[selected_sample[i]]
+                augmented_image, _ = dataset.get_augmented(selected_sample[i])
                 augmented_image = dataset.denormalize(augmented_image)
                 ax[i, j+1].imshow(augmented_image)
 
@@ -2,7 +2,6 @@
 Learning rate finder.
 Loosely based on: https://github.com/fastai/fastai/blob/master/fastai/learner.py
 """
-import matplotlib.pyplot as plt
 import numpy as np
 import torch
 import tqdm
@@ -65,6 +64,8 @@ class LrFindCommand:
 
     def run(self):
         """ Run the command with supplied configuration """
+        import matplotlib.pyplot as plt
+
         device = torch.device(self.model_config.device)
         learner = Learner(device, self.model.instantiate())
 
@@ -5,13 +5,14 @@ import typing
 
 from vel.api import Learner, TrainingInfo, ModelConfig
 from vel.api.base import TrainPhase
+from vel.callbacks.mixed_precision import MixedPrecision
 
 
 class PhaseTrainCommand:
     """ Training  command - learn according to a set of phases """
 
     def __init__(self, model_config: ModelConfig, model_factory, source, storage, phases: typing.List[TrainPhase],
-                 callbacks=None, restart=True):
+                 callbacks=None, restart=True, precision='fp32', accumulation_steps=1):
         self.model_config = model_config
         self.model_factory = model_factory
         self.source = source
@@ -21,6 +22,8 @@ class PhaseTrainCommand:
         self.full_number_of_epochs = sum(p.number_of_epochs for p in phases)
         self.callbacks = callbacks if callbacks is not None else []
         self.restart = restart
+        self.precision = precision
+        self.accumulation_steps = accumulation_steps
 
     @staticmethod
     def _build_phase_ladder(phases):
@@ -51,7 +54,7 @@ class PhaseTrainCommand:
     def run(self):
         """ Run the command with supplied configuration """
         device = torch.device(self.model_config.device)
-        learner = Learner(device, self.model_factory.instantiate())
+        learner = Learner(device, self.model_factory.instantiate(), accumulation_steps=self.accumulation_steps)
 
         # All callbacks useful for learning
         callbacks = self.gather_callbacks()
@@ -110,6 +113,9 @@ class PhaseTrainCommand:
         """ Gather all the callbacks to be used in this training run """
         callbacks = []
 
+        if self.precision != 'fp32':
+            callbacks.append(MixedPrecision(self.precision, torch.device(self.model_config.device)))
+
         callbacks.extend(self.callbacks)
         callbacks.extend(self.storage.streaming_callbacks())
 
@@ -140,7 +146,8 @@ class PhaseTrainCommand:
         return training_info, hidden_state
 
 
-def create(model_config, model, source, storage, phases, callbacks=None, restart=True):
+def create(model_config, model, source, storage, phases, callbacks=None, restart=True, precision='fp32',
+           accumulation_steps=1):
     """ Vel creation function """
     return PhaseTrainCommand(
         model_config=model_config,
@@ -149,5 +156,7 @@ def create(model_config, model, source, storage, phases, callbacks=None, restart
         storage=storage,
         phases=phases,
         callbacks=callbacks,
-        restart=restart
+        restart=restart,
+        precision=precision,
+        accumulation_steps=accumulation_steps
     )
@@ -1,17 +1,44 @@
-import numpy as np
-import tqdm
+import time
+import typing
 
 import torch
 import torch.nn.functional as F
-import torch.distributions as dist
 
 from vel.api import TrainingInfo
 
 
+def filter_logits(logits, top_k: typing.Optional[int]=None, top_p: typing.Optional[float]=None):
+    """
+    Restrict sampling to the top_k most likely characters and/or to the smallest set of characters whose
+    cumulative probability exceeds top_p (nucleus sampling). Logits of excluded characters are set to -inf.
+    """
+    if top_k is not None and top_k < logits.size(-1):
+        kth_largest = torch.topk(logits, top_k, dim=-1)[0][..., -1:]
+        logits = logits.masked_fill(logits < kth_largest, float('-inf'))
+
+    if top_p is not None and top_p < 1.0:
+        sorted_logits, sorted_indices = torch.sort(logits, dim=-1, descending=True)
+        sorted_probs = F.softmax(sorted_logits, dim=-1)
+
+        # Exclude characters once the cumulative probability before them exceeds top_p, so the most likely stays
+        sorted_mask = (sorted_probs.cumsum(dim=-1) - sorted_probs) > top_p
+        mask = sorted_mask.scatter(-1, sorted_indices, sorted_mask)
+
+        logits = logits.masked_fill(mask, float('-inf'))
+
+    return logits
+
+
 class GenerateTextCommand:
-    """ Generate text using RNN model """
+    """
+    Generate text using RNN model.
 
-    def __init__(self, model_config, model_factory, source, storage, start_letter, length, temperature):
+    Samples a batch of independent sequences in parallel. Network state is primed on the whole prompt
+    in a single call, and then carried per layer from one character to the next.
+    """
+
+    def __init__(self, model_config, model_factory, source, storage, start_letter, length, temperature,
+                 batch_size=1, top_k=None, top_p=None):
         self.model_config = model_config
         self.model_factory = model_factory
         self.source = source
@@ -19,6 +46,9 @@ class GenerateTextCommand:
         self.start_letter = start_letter
         self.length = length
         self.temperature = temperature
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.top_p = top_p
 
     @torch.no_grad()
     def run(self):
@@ -36,38 +66,49 @@ class GenerateTextCommand:
 
         model.eval()
 
-        current_char = self.start_letter
-        current_char_encoded = self.source.encode_character(self.start_letter)
+        start_time = time.perf_counter()
+        generated = self.generate(model, device)
+        elapsed = time.perf_counter() - start_time
 
-        generated_text = [current_char]
+        for sample in generated.tolist():
+            # End of sequence marker
+            if 0 in sample:
+                sample = sample[:sample.index(0)]
 
-        state = model.initial_state(1).to(device)
+            text = self.start_letter + ''.join(self.source.decode_character(c) for c in sample)
 
-        char_tensor = torch.from_numpy(np.array([current_char_encoded])).view(1, 1).to(device)
+            print("============================ START GENERATED TEXT ================================================")
+            print(text)
+            print("============================ END GENERATED TEXT ================================================")
 
-        for _ in tqdm.trange(self.length):
-            prob_logits, state = model.forward_state(char_tensor, state)
+        print(f"Generated {generated.numel()} characters in {elapsed:.2f}s, {generated.numel() / elapsed:.1f} chars/s")
 
-            # Apply temperature to the logits
-            prob_logits = F.log_softmax(prob_logits.view(-1).div(self.temperature), dim=0)
+    def generate(self, model, device):
+        """ Sample a batch of sequences continuing the prompt, returns a tensor of encoded characters """
+        prompt = torch.tensor(
+            [self.source.encode_character(c) for c in self.start_letter], dtype=torch.long, device=device
+        )
 
-            distribution = dist.Categorical(logits=prob_logits)
+        output, layer_states = model.forward_layer_states(prompt.view(1, -1).repeat(self.batch_size, 1))
 
-            char_tensor = distribution.sample().view(1, 1)
-            current_char_encoded = char_tensor.item()
+        generated = torch.zeros(self.batch_size, self.length, dtype=torch.long, device=device)
 
-            if current_char_encoded == 0:
-                # End of sequence marker
-                break
+        for idx in range(self.length):
+            # Output is a log-softmax, applying temperature to it is equivalent to applying it to the logits
+            logits = filter_logits(output[:, -1] / self.temperature, self.top_k, self.top_p)
 
-            current_char = self.source.decode_character(current_char_encoded)
+            next_char = torch.multinomial(F.softmax(logits, dim=-1), num_samples=1)
+            generated[:, idx:idx+1] = next_char
 
-            generated_text.append(current_char)
+            output, layer_states = model.forward_layer_states(next_char, layer_states)
 
-        print("============================ START GENERATED TEXT ================================================")
-        print(''.join(generated_text))
-        print("============================ END GENERATED TEXT ================================================")
+        return generated.cpu()
 
 
-def create(model_config, model, source, storage, start_letter, length, temperature):
-    return GenerateTextCommand(model_config, model, source, storage, start_letter, length, temperature)
+def create(model_config, model, source, storage, start_letter, length, temperature, batch_size=1, top_k=None,
+           top_p=None):
+    """ Generate text, start_letter can be a longer prompt """
+    return GenerateTextCommand(
+        model_config, model, source, storage, start_letter, length, temperature,
+        batch_size=batch_size, top_k=top_k, top_p=top_p
+    )
@@ -0,0 +1,23 @@
+import nose.tools as t
+import torch
+
+from vel.commands.rnn.generate_text import filter_logits
+
+
+def test_filter_top_k():
+    logits = torch.tensor([[1.0, 4.0, 3.0, 2.0]])
+
+    filtered = filter_logits(logits, top_k=2)
+
+    t.assert_equal(torch.isfinite(filtered).tolist(), [[False, True, True, False]])
+
+
+def test_filter_top_p():
+    logits = torch.log(torch.tensor([[0.1, 0.5, 0.3, 0.1]]))
+
+    filtered = filter_logits(logits, top_p=0.7)
+    t.assert_equal(torch.isfinite(filtered).tolist(), [[False, True, True, False]])
+
+    # Most likely character is always kept
+    filtered = filter_logits(logits, top_p=0.1)
+    t.assert_equal(torch.isfinite(filtered).tolist(), [[False, True, False, False]])
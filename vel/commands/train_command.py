@@ -3,6 +3,7 @@ import typing
 
 from vel.api import Learner, ModelConfig, EpochInfo, TrainingInfo
 from vel.api.base import OptimizerFactory, SchedulerFactory, Callback, Source, Storage, ModelFactory
+from vel.callbacks.mixed_precision import MixedPrecision
 from vel.callbacks.time_tracker import TimeTracker
 
 
@@ -12,7 +13,7 @@ class SimpleTrainCommand:
     def __init__(self, epochs: int, model_config: ModelConfig, model_factory: ModelFactory,
                  optimizer_factory: OptimizerFactory, scheduler_factory: typing.Optional[SchedulerFactory],
                  source: Source, storage: Storage, callbacks: typing.Optional[typing.List[Callback]],
-                 max_grad_norm: typing.Optional[float]):
+                 max_grad_norm: typing.Optional[float], precision: str='fp32', accumulation_steps: int=1):
         self.epochs = epochs
         self.model_config = model_config
         self.model_factory = model_factory
@@ -24,11 +25,15 @@ class SimpleTrainCommand:
         self.storage = storage
         self.callbacks = callbacks if callbacks is not None else []
         self.max_grad_norm = max_grad_norm
+        self.precision = precision
+        self.accumulation_steps = accumulation_steps
 
     def run(self):
         """ Run the command with supplied configuration """
         device = torch.device(self.model_config.device)
-        learner = Learner(device, self.model_factory.instantiate(), self.max_grad_norm)
+        learner = Learner(
+            device, self.model_factory.instantiate(), self.max_grad_norm, accumulation_steps=self.accumulation_steps
+        )
         optimizer = self.optimizer_factory.instantiate(learner.model)
 
         # All callbacks used for learning
@@ -66,6 +71,9 @@ class SimpleTrainCommand:
         """ Gather all the callbacks to be used in this training run """
         callbacks = [TimeTracker()]
 
+        if self.precision != 'fp32':
+            callbacks.append(MixedPrecision(self.precision, torch.device(self.model_config.device)))
+
         if self.scheduler_factory is not None:
             callbacks.append(self.scheduler_factory.instantiate(optimizer))
 
@@ -98,7 +106,8 @@ class SimpleTrainCommand:
         return training_info
 
 
-def create(model_config, epochs, optimizer, model, source, storage, scheduler=None, callbacks=None, max_grad_norm=None):
+def create(model_config, epochs, optimizer, model, source, storage, scheduler=None, callbacks=None, max_grad_norm=None,
+           precision='fp32', accumulation_steps=1):
     """ Simply train the model """
     return SimpleTrainCommand(
         epochs=epochs,
@@ -109,5 +118,7 @@ def create(model_config, epochs, optimizer, model, source, storage, scheduler=No
         source=source,
         storage=storage,
         callbacks=callbacks,
-        max_grad_norm=max_grad_norm
+        max_grad_norm=max_grad_norm,
+        precision=precision,
+        accumulation_steps=accumulation_steps
     )
@@ -0,0 +1,64 @@
+import torch
+
+from vel.api import Learner, ModelConfig, EpochInfo, TrainingInfo
+from vel.api.base import ModelFactory, Source, Storage
+from vel.exceptions import VelException
+
+
+class TTAEvaluationCommand:
+    """ Evaluate last checkpoint of the model on the validation set, with and without test time augmentation """
+
+    def __init__(self, model_config: ModelConfig, model_factory: ModelFactory, source: Source, storage: Storage, tta):
+        self.model_config = model_config
+        self.model_factory = model_factory
+        self.source = source
+        self.storage = storage
+        self.tta = tta
+
+    def run(self):
+        """ Run the command with supplied configuration """
+        device = torch.device(self.model_config.device)
+        learner = Learner(device, self.model_factory.instantiate())
+
+        start_epoch = self.storage.last_epoch_idx()
+
+        if start_epoch == 0:
+            raise VelException("No checkpoint to evaluate, train the model first")
+
+        training_info = TrainingInfo(
+            start_epoch_idx=start_epoch,
+            run_name=self.model_config.run_name,
+            metrics=learner.metrics()
+        )
+
+        self.storage.resume(training_info, learner.model)
+
+        epoch_info = EpochInfo(
+            training_info=training_info,
+            global_epoch_idx=start_epoch,
+            batches_per_epoch=self.source.val_iterations_per_epoch()
+        )
+
+        learner.validation_epoch(epoch_info, self.source)
+        epoch_info.result_accumulator.freeze_results('val')
+
+        learner.validation_epoch(epoch_info, self.source, tta=self.tta)
+        epoch_info.result_accumulator.freeze_results('tta')
+
+        epoch_info.freeze_epoch_result()
+
+        for key, value in epoch_info.result.items():
+            print(f"{key}: {value}")
+
+        return epoch_info.result
+
+
+def create(model_config, model, source, storage, tta):
+    """ Evaluate the model using test time augmentation """
+    return TTAEvaluationCommand(
+        model_config=model_config,
+        model_factory=model,
+        source=source,
+        storage=storage,
+        tta=tta
+    )
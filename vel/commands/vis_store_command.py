@@ -1,7 +1,4 @@
-import visdom
-
-
-from vel.util.visdom import visdom_push_metrics, VisdomSettings
+from vel.util.visdom import connect_visdom, visdom_push_metrics, VisdomSettings
 
 
 class VisdomCommand:
@@ -9,12 +6,7 @@ class VisdomCommand:
     def __init__(self, model_config, storage, visdom_settings: VisdomSettings):
         self.model_config = model_config
         self.storage = storage
-        self.vis = visdom.Visdom(
-            server=visdom_settings.server,
-            endpoint=visdom_settings.endpoint,
-            port=visdom_settings.port,
-            env=self.model_config.run_name.replace('/', '_')
-        )
+        self.vis = connect_visdom(model_config, visdom_settings)
 
     def run(self):
         metrics = self.storage.get_metrics_frame().drop('run_name', axis=1)
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import pickle
+
+
+def cache_dir(*args) -> str:
+    """ Directory of vel caches, can be changed with the VEL_CACHE_DIR environment variable """
+    base = os.environ.get('VEL_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'vel'))
+    return os.path.join(base, *args)
+
+
+class ConfigCache:
+    """
+    Cache of parsed configuration files, keyed by a hash of the contents of all the files the configuration consists of.
+
+    Values are pickled parse trees, with all variables still unresolved - parameters and environment variables
+    are resolved on use as usual, so they can change between runs without invalidating the cache.
+    """
+    # Bump whenever the parse tree representation changes
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory: str=None):
+        self.directory = directory if directory is not None else cache_dir('configs')
+
+    def key(self, *contents: bytes) -> str:
+        """ Cache key for given file contents """
+        digest = hashlib.sha256(str(self.FORMAT_VERSION).encode('ascii'))
+
+        for data in contents:
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+
+        return digest.hexdigest()
+
+    def filename(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key):
+        """ Return cached value, or None if not in the cache """
+        try:
+            with open(self.filename(key), 'rb') as fp:
+                return pickle.load(fp)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def put(self, key, value):
+        """ Store value in the cache, silently skipping if the cache directory is not writable """
+        filename = self.filename(key)
+        temp_filename = f'{filename}.{os.getpid()}.tmp'
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            with open(temp_filename, 'wb') as fp:
+                pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_filename, filename)
+        except OSError:
+            pass
+
+    def get_or_compute(self, contents, compute):
+        """ Return cached value for the contents, calling compute and caching its result on a miss """
+        key = self.key(*contents)
+        value = self.get(key)
+
+        if value is None:
+            value = compute()
+            self.put(key, value)
+
+        return value
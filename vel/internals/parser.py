@@ -70,20 +70,24 @@ class Parser:
     """ Parse configuration values """
     IS_LOADED = False
 
+    # LibYAML based loader is much faster, if available
+    LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
     @classmethod
     def register(cls):
         """ Register variable handling in YAML """
         if not cls.IS_LOADED:
             cls.IS_LOADED = True
 
-            yaml.add_constructor('!param', Parameter.parameter_constructor, Loader=yaml.SafeLoader)
-            yaml.add_constructor('!env', EnvironmentVariable.parameter_constructor, Loader=yaml.SafeLoader)
+            for loader in {yaml.SafeLoader, cls.LOADER}:
+                yaml.add_constructor('!param', Parameter.parameter_constructor, Loader=loader)
+                yaml.add_constructor('!env', EnvironmentVariable.parameter_constructor, Loader=loader)
 
     @classmethod
     def parse(cls, stream):
         """ Parse the stream into a Python object """
         cls.register()
-        return yaml.safe_load(stream)
+        return yaml.load(stream, Loader=cls.LOADER)
 
     @classmethod
     def parse_equality(cls, equality_string):
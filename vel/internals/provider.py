@@ -1,9 +1,17 @@
+import functools
 import importlib
 import inspect
 
+from vel.exceptions import VelInitializationException
 from vel.internals.parser import Variable
 
 
+@functools.lru_cache(maxsize=None)
+def parameter_list(func) -> list:
+    """ Names of function parameters together with whether they are required, memoised per function """
+    return [(k, v.default == inspect.Parameter.empty) for k, v in inspect.signature(func).parameters.items()]
+
+
 class Provider:
     """ Dependency injection resolver for the configuration file """
     def __init__(self, environment, instances=None, parameters=None):
@@ -22,13 +30,10 @@ class Provider:
 
     def resolve_and_call(self, func, extra_env=None):
         """ Resolve function arguments and call them, possibily filling from the environment """
-        parameter_list = [
-            (k, v.default == inspect.Parameter.empty) for k, v in inspect.signature(func).parameters.items()
-        ]
         extra_env = extra_env if extra_env is not None else {}
         kwargs = {}
 
-        for parameter_name, is_required in parameter_list:
+        for parameter_name, is_required in parameter_list(func):
             if parameter_name in extra_env:
                 kwargs[parameter_name] = self.instantiate_from_data(extra_env[parameter_name])
                 continue
@@ -53,7 +58,7 @@ class Provider:
         """ Instantiate object from the supplied data, additional args may come from the environment """
         if isinstance(object_data, dict) and 'name' in object_data:
             name = object_data['name']
-            module = importlib.import_module(name)
+            module = self.import_module(name)
             return self.resolve_and_call(module.create, extra_env=object_data)
         elif isinstance(object_data, dict):
             return {k: self.instantiate_from_data(v) for k, v in object_data.items()}
@@ -64,6 +69,23 @@ class Provider:
         else:
             return object_data
 
+    @staticmethod
+    def import_module(name):
+        """ Import module given by name in the configuration, pointing out similarly named ones if it's not found """
+        try:
+            return importlib.import_module(name)
+        except ModuleNotFoundError as e:
+            # A missing dependency of an existing module is a different problem
+            if e.name is None or not name.startswith(e.name):
+                raise
+
+            from vel.internals.registry import registry
+
+            suggestions = registry().suggestions(name)
+            hint = " Did you mean: {}?".format(', '.join(suggestions)) if suggestions else ""
+
+            raise VelInitializationException(f"Module '{name}' referenced in the configuration not found.{hint}") from e
+
     def render_configuration(self, configuration=None):
         """ Render variables in configuration object but don't instantiate anything """
         if configuration is None:
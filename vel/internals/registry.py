@@ -0,0 +1,132 @@
+import ast
+import difflib
+import json
+import os
+import typing
+
+from vel.internals.config_cache import cache_dir
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_index_filename() -> str:
+    """ Location of the cached index """
+    return cache_dir('registry.json')
+
+
+def package_files(package_dir: str) -> typing.Iterator[str]:
+    """ All python source files of the package, skipping tests """
+    for directory, subdirectories, files in os.walk(package_dir):
+        subdirectories[:] = sorted(
+            d for d in subdirectories if d not in ('tests', 'test', '__pycache__') and not d.startswith('.')
+        )
+
+        for filename in sorted(files):
+            if filename.endswith('.py'):
+                yield os.path.join(directory, filename)
+
+
+def defines_create(filename: str) -> bool:
+    """ Check whether the module defines a top-level create function, without importing it """
+    with open(filename, 'rb') as fp:
+        tree = ast.parse(fp.read(), filename=filename)
+
+    return any(isinstance(node, ast.FunctionDef) and node.name == 'create' for node in tree.body)
+
+
+class Registry:
+    """
+    Index of vel modules that can be instantiated from a configuration file - those defining a create function.
+
+    Building the index parses source files without importing anything, and the index is cached in a file
+    that is rebuilt only when any of the package source files change.
+    """
+    def __init__(self, package_dir: str=PACKAGE_DIR, package_name: str='vel', index_filename: str=None):
+        self.package_dir = package_dir
+        self.package_name = package_name
+        self.index_filename = index_filename if index_filename is not None else default_index_filename()
+        self._modules = None
+
+    def _module_name(self, filename) -> str:
+        relative = os.path.relpath(filename, self.package_dir)[:-len('.py')].split(os.sep)
+
+        if relative[-1] == '__init__':
+            relative = relative[:-1]
+
+        return '.'.join([self.package_name] + relative)
+
+    def _fingerprint(self, files) -> list:
+        """ Cheap to calculate signature of the package sources, changing whenever any of them changes """
+        stats = [os.stat(f) for f in files]
+        return [len(files), max(s.st_mtime_ns for s in stats), sum(s.st_size for s in stats)]
+
+    def scan(self, files=None) -> dict:
+        """ Scan package sources for modules defining a create function """
+        files = list(package_files(self.package_dir)) if files is None else files
+
+        return {
+            self._module_name(filename): os.path.relpath(filename, self.package_dir)
+            for filename in files if defines_create(filename)
+        }
+
+    def modules(self) -> dict:
+        """ Mapping of instantiable module names to their source files, relative to the package directory """
+        if self._modules is None:
+            files = list(package_files(self.package_dir))
+            key = {'package_dir': self.package_dir, 'fingerprint': self._fingerprint(files)}
+
+            try:
+                with open(self.index_filename, 'rt') as fp:
+                    index = json.load(fp)
+
+                if index['key'] == key:
+                    self._modules = index['modules']
+                    return self._modules
+            except (OSError, ValueError, KeyError):
+                pass
+
+            self._modules = self.scan(files)
+
+            try:
+                os.makedirs(os.path.dirname(self.index_filename), exist_ok=True)
+
+                with open(self.index_filename + '.tmp', 'wt') as fp:
+                    json.dump({'key': key, 'modules': self._modules}, fp)
+
+                os.replace(self.index_filename + '.tmp', self.index_filename)
+            except OSError:
+                # Read-only environments just don't get the cache
+                pass
+
+        return self._modules
+
+    def __contains__(self, name):
+        return name in self.modules()
+
+    def suggestions(self, name, count=3) -> list:
+        """ Names of registered modules most similar to given one """
+        return difflib.get_close_matches(name, list(self.modules()), n=count)
+
+
+_registry = None
+
+
+def registry() -> Registry:
+    """ Registry of the vel package """
+    global _registry
+
+    if _registry is None:
+        _registry = Registry()
+
+    return _registry
+
+
+def main():
+    """ Print all modules that can be referred to by name in configuration files """
+    for name in sorted(registry().modules()):
+        print(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+import nose.tools as t
+
+from vel.api import ModelConfig
+from vel.internals.config_cache import ConfigCache
+
+
+MODEL_CONFIG = """
+name: cached_model
+
+value: !param value = 1
+
+commands:
+  train:
+    name: vel.internals.tests.fixture_a
+"""
+
+
+def write(filename, contents):
+    with open(filename, 'wt') as fp:
+        fp.write(contents)
+
+
+def test_config_cache_invalidation(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_dir = os.path.join(tmpdir, 'cache')
+        filename = os.path.join(tmpdir, 'model.yaml')
+
+        write(os.path.join(tmpdir, ModelConfig.PROJECT_FILE_NAME), "a: 1\n")
+        write(filename, MODEL_CONFIG)
+
+        monkeypatch.setenv('VEL_CACHE_DIR', cache_dir)
+
+        config = ModelConfig.from_file(filename, 1, device='cpu')
+
+        t.assert_equal(len(os.listdir(os.path.join(cache_dir, 'configs'))), 1)
+        t.assert_equal(config.provide('value'), 1)
+
+        # Parameters are resolved on use, changing them does not need a new cache entry
+        config = ModelConfig.from_file(filename, 1, device='cpu', params={'value': 5})
+
+        t.assert_equal(len(os.listdir(os.path.join(cache_dir, 'configs'))), 1)
+        t.assert_equal(config.provide('value'), 5)
+        t.assert_equal(config.render_configuration()['value'], 5)
+
+        # Changing any of the files is a cache miss
+        write(filename, MODEL_CONFIG.replace('value = 1', 'value = 2'))
+        t.assert_equal(ModelConfig.from_file(filename, 1, device='cpu').provide('value'), 2)
+
+        write(os.path.join(tmpdir, ModelConfig.PROJECT_FILE_NAME), "a: 3\n")
+        config = ModelConfig.from_file(filename, 1, device='cpu')
+
+        t.assert_equal(config.provide('a'), 3)
+        t.assert_in('train', ModelConfig.from_file(filename, 1, device='cpu').command_descriptors)
+        t.assert_equal(len(os.listdir(os.path.join(cache_dir, 'configs'))), 3)
+
+
+def test_cache_key():
+    cache = ConfigCache(directory='unused')
+
+    t.assert_equal(cache.key(b'ab', b'c'), cache.key(b'ab', b'c'))
+    t.assert_not_equal(cache.key(b'ab', b'c'), cache.key(b'a', b'bc'))
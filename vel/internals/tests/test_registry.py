@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import nose.tools as t
+
+import vel.exceptions as e
+import vel.internals.provider as v
+
+from vel.internals.registry import Registry
+
+
+def test_registry_index_is_cached():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index_filename = os.path.join(tmpdir, 'registry.json')
+
+        registry = Registry(index_filename=index_filename)
+
+        t.assert_in('vel.sources.classic.mnist', registry)
+        t.assert_in('vel.storage.backend.sqlite', registry)
+        t.assert_not_in('vel.api.info', registry)
+        t.assert_true(os.path.exists(index_filename))
+
+        cached = Registry(index_filename=index_filename)
+
+        def fail(files=None):
+            raise AssertionError("Index should have been read from the cache")
+
+        cached.scan = fail
+
+        t.assert_equal(cached.modules(), registry.modules())
+
+
+def test_unknown_module_suggestions():
+    provider = v.Provider({})
+
+    with t.assert_raises(e.VelInitializationException) as context:
+        provider.instantiate_from_data({'name': 'vel.sources.classic.mnsit'})
+
+    t.assert_in('vel.sources.classic.mnist', str(context.exception))
+
+
+def test_config_load_does_not_import_heavy_dependencies():
+    config_filename = os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', 'examples-configs', 'classification', 'mnist', 'mnist_cnn_01.yaml'
+    )
+
+    script = (
+        "import sys\n"
+        "from vel.api import ModelConfig\n"
+        "ModelConfig.from_file(sys.argv[1], 0, device='cpu')\n"
+        "print(','.join(m for m in ['pandas', 'torchvision', 'pymongo', 'visdom', 'matplotlib', 'cv2'] "
+        "if m in sys.modules))\n"
+    )
+
+    output = subprocess.check_output([sys.executable, '-c', script, config_filename], universal_newlines=True)
+
+    t.assert_equal(output.strip(), '')
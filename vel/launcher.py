@@ -2,11 +2,34 @@
 import argparse
 import datetime as dtm
 
+import vel.util.distributed as distributed
+
 from vel.api import ModelConfig
 from vel.util.random import set_seed
 from vel.internals.parser import Parser
 
 
+def run(args):
+    """ Run a command for parsed arguments, in each of the processes for distributed training """
+    model_config = ModelConfig.from_file(
+        args.config, args.run_number, continue_training=getattr(args, 'continue'),
+        device=distributed.process_device(args.device), seed=args.seed,
+        params={k: v for (k, v) in (Parser.parse_equality(eq) for eq in args.param)}
+    )
+
+    # Set seed already in the launcher. Processes get different seeds for different random augmentations,
+    # initial model weights are broadcast from the first process.
+    set_seed(model_config.seed + distributed.rank())
+
+    if distributed.is_main_process():
+        model_config.banner(args.command)
+
+    model_config.run_command(args.command, args.varargs)
+
+    if distributed.is_main_process():
+        model_config.quit_banner()
+
+
 def main():
     """ Paperboy entry point - parse the arguments and run a command """
     parser = argparse.ArgumentParser(description='Paperboy deep learning launcher')
@@ -24,20 +47,19 @@ def main():
     parser.add_argument(
         '--continue', action='store_true', default=False, help="Continue previously started learning process"
     )
-
-    args = parser.parse_args()
-
-    model_config = ModelConfig.from_file(
-        args.config, args.run_number, continue_training=getattr(args, 'continue'), device=args.device, seed=args.seed,
-        params={k: v for (k, v) in (Parser.parse_equality(eq) for eq in args.param)}
+    parser.add_argument(
+        '--nproc', type=int, default=1, help="Number of processes for distributed data-parallel training"
+    )
+    parser.add_argument(
+        '--dist-backend', default='gloo', help="Backend of distributed training, gloo works on CPU-only hosts"
     )
 
-    # Set seed already in the launcher
-    set_seed(model_config.seed)
+    args = parser.parse_args()
 
-    model_config.banner(args.command)
-    model_config.run_command(args.command, args.varargs)
-    model_config.quit_banner()
+    if args.nproc > 1:
+        distributed.spawn(args.nproc, run, args=(args,), backend=args.dist_backend)
+    else:
+        run(args)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,3 @@
-import torchvision.models.resnet as m
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -27,6 +26,7 @@ class Resnet34(SupervisedModel):
         self.group_cut_layers = (6, 10)
 
         # Load backbbone
+        import torchvision.models.resnet as m
         backbone = m.resnet34(pretrained=pretrained)
 
         # If fc layers is set, let's put custom head
@@ -77,6 +77,18 @@ class Resnet34(SupervisedModel):
         for idx, child in enumerate(self.model.children()):
             mu.unfreeze_layer(child)
 
+    def feature_split(self):
+        """ Frozen backbone ends with the parameterless pooling and flattening layers """
+        if not self.fc_layers:
+            return None
+
+        cut = self.head_layers + 2
+
+        if any(p.requires_grad for p in self.model[:cut].parameters()):
+            return None
+
+        return self.model[:cut], self.model[cut:]
+
     def get_layer_groups(self):
         """ Return layers grouped """
         g1 = list(self.model[:self.group_cut_layers[0]])
@@ -56,6 +56,24 @@ class MultilayerSequenceGRU(SupervisedModel):
 
         return self.output_activation(data)
 
+    def forward_layer_states(self, sequence, layer_states=None):
+        """
+        Forward propagate a batch of sequences through the network, starting from given per-layer states.
+        Network starts from zero state if none is given. Returns output and the list of final states of each layer.
+        """
+        if layer_states is None:
+            layer_states = [None] * len(self.gru_layers)
+
+        data = self.input_layer(sequence)
+
+        new_layer_states = []
+
+        for layer, layer_state in zip(self.gru_layers, layer_states):
+            data, new_layer_state = layer(data, layer_state)
+            new_layer_states.append(new_layer_state)
+
+        return self.output_activation(self.output_layer(data)), new_layer_states
+
     def forward_state(self, sequence, state=None):
         """ Forward propagate a single character through the network accounting for the state """
         if state is None:
@@ -70,10 +88,10 @@ class MultilayerSequenceGRU(SupervisedModel):
             current_state = state[:, :, :layer_length]
             state = state[:, :, layer_length:]
 
-            # Propagate through the LSTM state
-            data, new_h = layer(data, current_state)
+            # Propagate through the GRU state, layers expect the batch dimension second
+            data, new_h = layer(data, current_state.transpose(0, 1).contiguous())
 
-            state_outputs.append(new_h)
+            state_outputs.append(new_h.transpose(0, 1))
 
         output_data = self.output_activation(self.output_layer(data))
 
@@ -83,7 +101,15 @@ class MultilayerSequenceGRU(SupervisedModel):
 
     def initial_state(self, batch_size):
         """ Initial state of the network """
-        return torch.zeros(batch_size, 1, sum(self.hidden_layers))
+        return torch.zeros(batch_size, 1, sum(self.hidden_layers), device=self.output_layer.weight.device)
+
+    def loss_state(self, x_data, y_true, state=None):
+        """
+        Forward propagate network starting from the per-layer states at the end of the previous batch.
+        Return output, value of loss function and the new per-layer states.
+        """
+        y_pred, new_state = self.forward_layer_states(x_data, state)
+        return y_pred, self.loss_value(x_data, y_true, y_pred), new_state
 
     def loss_value(self, x_data, y_true, y_pred):
         """ Calculate a value of loss function """
@@ -56,6 +56,24 @@ class MultilayerSequenceLSTM(SupervisedModel):
 
         return self.output_activation(data)
 
+    def forward_layer_states(self, sequence, layer_states=None):
+        """
+        Forward propagate a batch of sequences through the network, starting from given per-layer states.
+        Network starts from zero state if none is given. Returns output and the list of final states of each layer.
+        """
+        if layer_states is None:
+            layer_states = [None] * len(self.lstm_layers)
+
+        data = self.input_layer(sequence)
+
+        new_layer_states = []
+
+        for layer, layer_state in zip(self.lstm_layers, layer_states):
+            data, new_layer_state = layer(data, layer_state)
+            new_layer_states.append(new_layer_state)
+
+        return self.output_activation(self.output_layer(data)), new_layer_states
+
     def forward_state(self, sequence, state=None):
         """ Forward propagate a single character through the network accounting for the state """
         if state is None:
@@ -70,15 +88,15 @@ class MultilayerSequenceLSTM(SupervisedModel):
             current_state = state[:, :, :layer_length * 2]
             state = state[:, :, 2 * layer_length:]
 
-            # Split into h and c state
-            current_h = current_state[:, :, :layer_length]
-            current_c = current_state[:, :, layer_length:]
+            # Split into h and c state, layers expect the batch dimension second
+            current_h = current_state[:, :, :layer_length].transpose(0, 1).contiguous()
+            current_c = current_state[:, :, layer_length:].transpose(0, 1).contiguous()
 
             # Propagate through the LSTM state
             data, (new_h, new_c) = layer(data, (current_h, current_c))
 
-            state_outputs.append(new_h)
-            state_outputs.append(new_c)
+            state_outputs.append(new_h.transpose(0, 1))
+            state_outputs.append(new_c.transpose(0, 1))
 
         output_data = self.output_activation(self.output_layer(data))
 
@@ -88,7 +106,15 @@ class MultilayerSequenceLSTM(SupervisedModel):
 
     def initial_state(self, batch_size):
         """ Initial state of the network """
-        return torch.zeros(batch_size, 1, 2 * sum(self.hidden_layers))
+        return torch.zeros(batch_size, 1, 2 * sum(self.hidden_layers), device=self.output_layer.weight.device)
+
+    def loss_state(self, x_data, y_true, state=None):
+        """
+        Forward propagate network starting from the per-layer states at the end of the previous batch.
+        Return output, value of loss function and the new per-layer states.
+        """
+        y_pred, new_state = self.forward_layer_states(x_data, state)
+        return y_pred, self.loss_value(x_data, y_true, y_pred), new_state
 
     def loss_value(self, x_data, y_true, y_pred):
         """ Calculate a value of loss function """
@@ -0,0 +1,68 @@
+import nose.tools as t
+import numpy.testing as nt
+import torch
+
+from vel.models.rnn.multilayer_sequence_gru import MultilayerSequenceGRU
+from vel.models.rnn.multilayer_sequence_lstm import MultilayerSequenceLSTM
+
+
+def check_states_consistent(model):
+    """ Stepping through a sequence with carried state matches a single pass over the whole sequence """
+    model.eval()
+
+    torch.manual_seed(0)
+    sequence = torch.randint(0, 10, (3, 7))
+
+    with torch.no_grad():
+        full_output = model(sequence)
+
+        state = model.initial_state(3)
+        layer_states = None
+
+        for idx in range(sequence.size(1)):
+            step_output, state = model.forward_state(sequence[:, idx:idx+1], state)
+            layer_output, layer_states = model.forward_layer_states(sequence[:, idx:idx+1], layer_states)
+
+            nt.assert_allclose(step_output[:, 0].numpy(), full_output[:, idx].numpy(), rtol=1e-5, atol=1e-5)
+            nt.assert_allclose(layer_output[:, 0].numpy(), full_output[:, idx].numpy(), rtol=1e-5, atol=1e-5)
+
+
+def test_lstm_state():
+    check_states_consistent(MultilayerSequenceLSTM(alphabet_size=10, hidden_layers=[8, 6], output_dim=10))
+
+
+def test_gru_state():
+    check_states_consistent(MultilayerSequenceGRU(alphabet_size=10, hidden_layers=[8, 6], output_dim=10))
+
+
+def check_loss_state_carried(model):
+    """ Loss over consecutive chunks with carried per-layer state matches the loss over the whole sequence """
+    model.eval()
+
+    torch.manual_seed(0)
+    sequence = torch.randint(0, 10, (3, 9))
+
+    with torch.no_grad():
+        full_output = model(sequence[:, :-1].contiguous())
+
+        state = None
+        chunk_outputs = []
+
+        for start in range(0, 8, 4):
+            x_data = sequence[:, start:start+4].contiguous()
+            y_true = sequence[:, start+1:start+5].contiguous()
+
+            output, loss, state = model.loss_state(x_data, y_true, state)
+            chunk_outputs.append(output)
+
+            t.assert_equal(len(state), 2)
+
+    nt.assert_allclose(torch.cat(chunk_outputs, dim=1).numpy(), full_output.numpy(), rtol=1e-5, atol=1e-5)
+
+
+def test_lstm_loss_state():
+    check_loss_state_carried(MultilayerSequenceLSTM(alphabet_size=10, hidden_layers=[8, 6], output_dim=10))
+
+
+def test_gru_loss_state():
+    check_loss_state_carried(MultilayerSequenceGRU(alphabet_size=10, hidden_layers=[8, 6], output_dim=10))
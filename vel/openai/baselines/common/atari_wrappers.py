@@ -2,8 +2,6 @@ import numpy as np
 from collections import deque
 import gym
 from gym import spaces
-import cv2
-cv2.ocl.setUseOpenCL(False)
 
 class NoopResetEnv(gym.Wrapper):
     def __init__(self, env, noop_max=30):
@@ -178,14 +176,18 @@ class WarpFrame(gym.ObservationWrapper):
     def __init__(self, env):
         """Warp frames to 84x84 as done in the Nature paper and later work."""
         gym.ObservationWrapper.__init__(self, env)
+        # OpenCV is only imported by environments that need it
+        import cv2
+        cv2.ocl.setUseOpenCL(False)
+        self.cv2 = cv2
         self.width = 84
         self.height = 84
         self.observation_space = spaces.Box(low=0, high=255,
                                             shape=(self.height, self.width, 1), dtype=np.uint8)
 
     def observation(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-        frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        frame = self.cv2.cvtColor(frame, self.cv2.COLOR_RGB2GRAY)
+        frame = self.cv2.resize(frame, (self.width, self.height), interpolation=self.cv2.INTER_AREA)
         return frame[:, :, None]
 
 class FrameStack(gym.Wrapper):
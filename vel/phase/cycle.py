@@ -4,6 +4,7 @@ import vel.api.base as base
 import vel.util.intepolate as interp
 
 from vel.api import BatchInfo, EpochInfo, TrainingInfo
+from vel.phase.feature_cache import FeatureCache
 
 
 class CycleCallback(base.Callback):
@@ -58,8 +59,11 @@ class CycleCallback(base.Callback):
         cycle_length = self.cycle_lengths[batch_info.local_epoch_number - 1]
         cycle_start = self.cycle_starts[batch_info.local_epoch_number - 1]
 
-        numerator = (batch_info.local_epoch_number - cycle_start - 1) * batch_info.batches_per_epoch + batch_info.batch_number
-        denominator = cycle_length * batch_info.batches_per_epoch
+        # Count optimizer steps rather than batches, which differ when gradients are accumulated
+        steps_per_epoch = batch_info.optimizer_steps_per_epoch
+
+        numerator = (batch_info.local_epoch_number - cycle_start - 1) * steps_per_epoch + batch_info.optimizer_step_number
+        denominator = cycle_length * steps_per_epoch
 
         interpolation_number = numerator / denominator
 
@@ -87,7 +91,7 @@ class CyclePhase(base.TrainPhase):
     """ Most generic phase of training """
 
     def __init__(self, optimizer_factory, max_lr, min_lr, cycles, cycle_len=1, cycle_mult=1, interpolate='linear',
-                 init_lr=0, init_iter=0, freeze=False):
+                 init_lr=0, init_iter=0, freeze=False, feature_cache: FeatureCache=None):
         self.max_lr = max_lr
         self.min_lr = min_lr
 
@@ -107,6 +111,7 @@ class CyclePhase(base.TrainPhase):
 
         self.optimizer_factory = optimizer_factory
         self.freeze = freeze
+        self.feature_cache = feature_cache
 
         self._optimizer_instance = None
         self._source = None
@@ -121,7 +126,11 @@ class CyclePhase(base.TrainPhase):
         """ Prepare the phase for learning """
         # To parameter groups handles properly filtering parameters that don't require gradient
         self._optimizer_instance = self.optimizer_factory.instantiate(model)
-        self._source = source
+
+        if self.feature_cache is not None:
+            self._source = self.feature_cache.set_up(model, source)
+        else:
+            self._source = source
 
         self.special_callback = CycleCallback(
             self._optimizer_instance,
@@ -146,11 +155,27 @@ class CyclePhase(base.TrainPhase):
 
     def execute_epoch(self, epoch_info, learner):
         """ Prepare the phase for learning """
+        if self.feature_cache is not None:
+            learner = self.feature_cache.learner(learner)
+
         learner.run_epoch(epoch_info, self._source)
 
+    def tear_down_phase(self, training_info, model):
+        """ Clean up after phase is done """
+        if self.feature_cache is not None:
+            self.feature_cache.tear_down()
 
-def create(optimizer, max_lr, min_lr, cycles, cycle_len=1, cycle_mult=1, interpolate='linear', init_lr=0, init_iter=0):
+
+def create(optimizer, max_lr, min_lr, cycles, cycle_len=1, cycle_mult=1, interpolate='linear', init_lr=0, init_iter=0,
+           cache_features=False, augmented_copies=1, model_config=None):
     """ Vel creation function """
+    if cache_features:
+        feature_cache = FeatureCache(
+            model_config.output_dir('features', model_config.run_name), augmented_copies=augmented_copies
+        )
+    else:
+        feature_cache = None
+
     return CyclePhase(
         max_lr=max_lr,
         min_lr=min_lr,
@@ -161,4 +186,5 @@ def create(optimizer, max_lr, min_lr, cycles, cycle_len=1, cycle_mult=1, interpo
         optimizer_factory=optimizer,
         init_lr=init_lr,
         init_iter=init_iter,
+        feature_cache=feature_cache
     )
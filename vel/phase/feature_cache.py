@@ -0,0 +1,197 @@
+import numpy as np
+import os
+import pathlib
+import shutil
+import sys
+import torch
+import tqdm
+
+import vel.util.distributed as distributed
+
+from vel.api import Learner
+from vel.api.base import Source, SupervisedModel
+
+
+class FeatureHeadModel(SupervisedModel):
+    """ Head of a model evaluated directly on cached backbone features """
+    def __init__(self, model, head):
+        super().__init__()
+        self.model = model
+        self.head = head
+
+    def forward(self, features):
+        return self.head(features)
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return self.model.loss_value(x_data, y_true, y_pred)
+
+    def metrics(self):
+        return self.model.metrics()
+
+
+class CachedFeatureLoader:
+    """ Loader of shuffled batches of cached features, going through one cached copy of the dataset per epoch """
+    def __init__(self, features, targets, batch_size, shuffle):
+        self.features = features
+        self.targets = targets
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+
+        self.epoch_idx = 0
+
+    def __iter__(self):
+        copy_idx = self.epoch_idx % self.features.shape[0]
+        self.epoch_idx += 1
+
+        features = self.features[copy_idx]
+        targets = self.targets[copy_idx]
+
+        if self.shuffle:
+            indexes = np.random.permutation(features.shape[0])
+        else:
+            indexes = np.arange(features.shape[0])
+
+        for start in range(0, len(indexes), self.batch_size):
+            # Sorted indexes read the memory map more sequentially, order within a batch doesn't matter
+            batch_indexes = np.sort(indexes[start:start + self.batch_size])
+            yield torch.from_numpy(features[batch_indexes]), torch.from_numpy(targets[batch_indexes])
+
+    def __len__(self):
+        """ Number of batches in this loader """
+        return (self.features.shape[1] + self.batch_size - 1) // self.batch_size
+
+
+class CachedFeatureSource(Source):
+    """
+    Source of backbone features calculated once for the whole dataset and stored in memory-mapped files.
+    Training features are calculated for a fixed number of augmented copies of the training set.
+    """
+    def __init__(self, source: Source, backbone, device, cache_dir, batch_size, augmented_copies=1):
+        super().__init__()
+
+        self.cache_dir = cache_dir
+        pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+
+        train_features, train_targets = self._calculate_features(
+            backbone, device, source.train_loader, 'train', augmented_copies, training=True
+        )
+        val_features, val_targets = self._calculate_features(
+            backbone, device, source.val_loader, 'val', 1, training=False
+        )
+
+        self._train_loader = CachedFeatureLoader(train_features, train_targets, batch_size, shuffle=True)
+        self._val_loader = CachedFeatureLoader(val_features, val_targets, batch_size, shuffle=False)
+
+    @torch.no_grad()
+    def _calculate_features(self, backbone, device, loader_fn, name, copies, training):
+        """ Run the backbone over the dataset 'copies' times and store the results """
+        backbone.train(training)
+
+        features = None
+        targets = None
+
+        for copy_idx in range(copies):
+            offset = 0
+            loader = loader_fn()
+            iterator = tqdm.tqdm(loader, desc=f"Caching {name} features", unit="iter", file=sys.stdout)
+
+            for data, target in iterator:
+                output = backbone(data.to(device)).cpu().numpy()
+
+                if features is None:
+                    # Number of samples is not known upfront, as loader may drop the last batch
+                    capacity = len(loader) * data.size(0)
+
+                    features = np.lib.format.open_memmap(
+                        os.path.join(self.cache_dir, f'{name}_features.npy'), mode='w+',
+                        dtype=np.float32, shape=(copies, capacity) + output.shape[1:]
+                    )
+                    targets = np.zeros((copies, capacity), dtype=target.numpy().dtype)
+
+                features[copy_idx, offset:offset + output.shape[0]] = output
+                targets[copy_idx, offset:offset + output.shape[0]] = target.numpy()
+
+                offset += output.shape[0]
+
+        features.flush()
+
+        return features[:, :offset], targets[:, :offset]
+
+    def train_loader(self):
+        """ PyTorch loader of training data """
+        return self._train_loader
+
+    def val_loader(self):
+        """ PyTorch loader of validation data """
+        return self._val_loader
+
+    def train_iterations_per_epoch(self):
+        """ Return number of iterations per epoch """
+        return len(self._train_loader)
+
+    def val_iterations_per_epoch(self):
+        """ Return number of iterations per epoch - validation """
+        return len(self._val_loader)
+
+    def clean(self):
+        """ Remove cached features from disk """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+class FeatureCache:
+    """
+    Trains head of the model on cached features of a frozen backbone within a training phase.
+
+    Frozen backbone is evaluated only once over the data at the start of the phase, for 'augmented_copies' passes over
+    the training set, and each epoch trains the head on the next cached copy. Training features are calculated with
+    the backbone in training mode, as in regular epochs, so batch normalization uses batch statistics - but its running
+    averages are updated once per cached copy rather than once per epoch.
+    """
+    def __init__(self, cache_dir, augmented_copies=1):
+        self.cache_dir = cache_dir
+        self.augmented_copies = augmented_copies
+
+        self.source = None
+        self.model = None
+        self._learner = None
+
+    def set_up(self, model, source):
+        """ Calculate the features, returns source of cached features """
+        split = model.feature_split()
+
+        if split is None:
+            raise ValueError(f"Model {model.__class__.__name__} does not have a frozen backbone to cache features of")
+
+        backbone, head = split
+        device = next(model.parameters()).device
+
+        if distributed.is_distributed():
+            # Processes of distributed training cache features of their own data shards
+            cache_dir = os.path.join(self.cache_dir, f'rank_{distributed.rank()}')
+        else:
+            cache_dir = self.cache_dir
+
+        self.model = FeatureHeadModel(model, head)
+        self.source = CachedFeatureSource(
+            source, backbone, device, cache_dir,
+            batch_size=source.batch_size,
+            augmented_copies=self.augmented_copies
+        )
+
+        return self.source
+
+    def learner(self, learner: Learner) -> Learner:
+        """ Learner training the model head only, created on the first epoch of the phase and reused afterwards """
+        if self._learner is None:
+            self._learner = Learner(learner.device, self.model, learner.max_grad_norm, learner.accumulation_steps)
+
+        return self._learner
+
+    def tear_down(self):
+        """ Clean up cached features """
+        if self.source is not None:
+            self.source.clean()
+
+        self.source = None
+        self.model = None
+        self._learner = None
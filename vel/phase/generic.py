@@ -2,15 +2,17 @@ import vel.api.base as base
 
 from vel.api import TrainingInfo, EpochInfo
 from vel.api.base import Source
+from vel.phase.feature_cache import FeatureCache
 
 
 class GenericPhase(base.TrainPhase):
     """ Most generic phase of training """
 
-    def __init__(self, lr, epochs, optimizer_factory):
+    def __init__(self, lr, epochs, optimizer_factory, feature_cache: FeatureCache=None):
         self.lr = lr
         self.epochs = epochs
         self.optimizer_factory = optimizer_factory
+        self.feature_cache = feature_cache
 
         self._optimizer_instance = None
         self._source = None
@@ -22,7 +24,11 @@ class GenericPhase(base.TrainPhase):
     def set_up_phase(self, training_info, model, source: Source):
         """ Prepare the phase for learning """
         self._optimizer_instance = self.optimizer_factory.instantiate(model)
-        self._source = source
+
+        if self.feature_cache is not None:
+            self._source = self.feature_cache.set_up(model, source)
+        else:
+            self._source = source
 
     def epoch_info(self, training_info: TrainingInfo, global_idx: int, local_idx: int) -> EpochInfo:
         """ Create Epoch info """
@@ -39,15 +45,31 @@ class GenericPhase(base.TrainPhase):
         for param_group in epoch_info.optimizer.param_groups:
             param_group['lr'] = self.lr
 
+        if self.feature_cache is not None:
+            learner = self.feature_cache.learner(learner)
+
         epoch_result = learner.run_epoch(epoch_info, self._source)
 
         return epoch_result
 
+    def tear_down_phase(self, training_info, model):
+        """ Clean up after phase is done """
+        if self.feature_cache is not None:
+            self.feature_cache.tear_down()
+
 
-def create(lr, epochs, optimizer):
+def create(lr, epochs, optimizer, cache_features=False, augmented_copies=1, model_config=None):
     """ Vel creation function """
+    if cache_features:
+        feature_cache = FeatureCache(
+            model_config.output_dir('features', model_config.run_name), augmented_copies=augmented_copies
+        )
+    else:
+        feature_cache = None
+
     return GenericPhase(
         lr=lr,
         epochs=epochs,
         optimizer_factory=optimizer,
+        feature_cache=feature_cache
     )
@@ -0,0 +1,185 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy.testing as nt
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from vel.api import Learner
+from vel.api.base import Source, SupervisedModel
+from vel.phase.feature_cache import FeatureCache
+
+
+class FrozenBackboneModel(SupervisedModel):
+    """ Model with a frozen backbone containing batch normalization """
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+
+        self.backbone = nn.Sequential(nn.Linear(4, 3), nn.BatchNorm1d(3))
+        self.head = nn.Linear(3, 2)
+
+        for p in self.backbone.parameters():
+            p.requires_grad = False
+
+        self.backbone_calls = 0
+        self.backbone.register_forward_hook(self._count_call)
+
+    def _count_call(self, module, inputs, output):
+        self.backbone_calls += 1
+
+    def forward(self, x):
+        return self.head(self.backbone(x))
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return F.cross_entropy(y_pred, y_true)
+
+    def feature_split(self):
+        return self.backbone, self.head
+
+
+class NoisyLoader:
+    """ Loader adding fresh random noise to the inputs every pass, recording all the batches it yields """
+    def __init__(self, x, y, batch_size, noise):
+        self.x = x
+        self.y = y
+        self.batch_size = batch_size
+        self.noise = noise
+        self.batches = []
+
+    def __iter__(self):
+        for start in range(0, len(self.x), self.batch_size):
+            batch = self.x[start:start + self.batch_size]
+            batch = batch + self.noise * torch.randn_like(batch)
+            self.batches.append(batch)
+            yield batch, self.y[start:start + self.batch_size]
+
+    def __len__(self):
+        return (len(self.x) + self.batch_size - 1) // self.batch_size
+
+
+class NoisySource(Source):
+    def __init__(self, count=10, batch_size=5):
+        super().__init__()
+        torch.manual_seed(1)
+
+        self.batch_size = batch_size
+        x = torch.randn(count, 4)
+        y = torch.arange(count)
+
+        self._train_loader = NoisyLoader(x, y, batch_size, noise=1.0)
+        self._val_loader = NoisyLoader(x, y, batch_size, noise=0.0)
+
+    def train_loader(self):
+        return self._train_loader
+
+    def val_loader(self):
+        return self._val_loader
+
+
+def test_features_cached_once():
+    model = FrozenBackboneModel()
+    source = NoisySource()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feature_cache = FeatureCache(os.path.join(temp_dir, 'features'), augmented_copies=2)
+        cached_source = feature_cache.set_up(model, source)
+
+        # Two copies of training set and one of validation set, two batches each
+        t.assert_equal(model.backbone_calls, 6)
+
+        for epoch_idx in range(4):
+            for loader in [cached_source.train_loader(), cached_source.val_loader()]:
+                batches = list(loader)
+                t.assert_equal(len(batches), 2)
+                t.assert_equal(tuple(batches[0][0].shape), (5, 3))
+
+        t.assert_equal(model.backbone_calls, 6)
+
+        feature_cache.tear_down()
+
+
+def test_features_match_backbone():
+    model = FrozenBackboneModel()
+    source = NoisySource()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feature_cache = FeatureCache(os.path.join(temp_dir, 'features'), augmented_copies=1)
+        cached_source = feature_cache.set_up(model, source)
+
+        with torch.no_grad():
+            model.backbone.eval()
+            val_features = model.backbone(source.val_loader().batches[0])
+
+            # Training features use batch statistics, as the backbone would within a training epoch
+            model.backbone.train()
+            train_features = model.backbone(source.train_loader().batches[0])
+
+        train_cached = cached_source.train_loader().features[0, :5]
+        val_cached = cached_source.val_loader().features[0, :5]
+
+        nt.assert_allclose(train_cached, train_features.numpy(), rtol=1e-5, atol=1e-6)
+        nt.assert_allclose(val_cached, val_features.numpy(), rtol=1e-5, atol=1e-6)
+
+        feature_cache.tear_down()
+
+
+def test_cycling_augmented_copies():
+    model = FrozenBackboneModel()
+    source = NoisySource()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feature_cache = FeatureCache(os.path.join(temp_dir, 'features'), augmented_copies=3)
+        cached_source = feature_cache.set_up(model, source)
+
+        copies = cached_source.train_loader().features
+
+        # Every copy is calculated from differently augmented data
+        t.assert_false(torch.allclose(torch.from_numpy(copies[0]), torch.from_numpy(copies[1])))
+
+        for epoch_idx in range(6):
+            for features, targets in cached_source.train_loader():
+                nt.assert_array_equal(features.numpy(), copies[epoch_idx % 3][targets.numpy()])
+
+        feature_cache.tear_down()
+
+
+def test_tear_down_removes_cache():
+    model = FrozenBackboneModel()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_dir = os.path.join(temp_dir, 'features')
+        feature_cache = FeatureCache(cache_dir)
+
+        feature_cache.set_up(model, NoisySource())
+
+        t.assert_true(os.path.exists(os.path.join(cache_dir, 'train_features.npy')))
+
+        feature_cache.tear_down()
+
+        t.assert_false(os.path.exists(cache_dir))
+        t.assert_is_none(feature_cache.source)
+        t.assert_is_none(feature_cache.model)
+
+
+def test_head_learner_reused():
+    model = FrozenBackboneModel()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feature_cache = FeatureCache(os.path.join(temp_dir, 'features'))
+        feature_cache.set_up(model, NoisySource())
+
+        learner = Learner(torch.device('cpu'), model, max_grad_norm=1.0)
+        head_learner = feature_cache.learner(learner)
+
+        t.assert_is(head_learner.model, feature_cache.model)
+        t.assert_equal(head_learner.max_grad_norm, 1.0)
+
+        # Same learner, and in distributed training the same DistributedDataParallel wrapper, for every epoch
+        t.assert_is(feature_cache.learner(learner), head_learner)
+
+        feature_cache.tear_down()
+
+        t.assert_is_none(feature_cache._learner)
@@ -1,3 +1,6 @@
+import concurrent.futures
+import typing
+
 import torch
 import torch.nn.functional as F
 import torch.nn.utils
@@ -5,13 +8,15 @@ import torch.nn.utils
 from vel.api.base import ModelFactory
 from vel.api.metrics.averaging_metric import AveragingNamedMetric
 from vel.rl.api.base import OptimizerAlgoBase
+from vel.util.polyak import PolyakAveraging
 
 
 class DeepQLearning(OptimizerAlgoBase):
     """ Deep Q-Learning algorithm """
 
     def __init__(self, model_factory: ModelFactory, double_dqn: bool,
-                 target_update_frequency: int, max_grad_norm: float):
+                 target_update_frequency: int, max_grad_norm: float, fused_evaluation: bool=False,
+                 target_update_tau: typing.Optional[float]=None):
         super().__init__(max_grad_norm)
 
         self.model_factory = model_factory
@@ -19,8 +24,19 @@ class DeepQLearning(OptimizerAlgoBase):
         self.double_dqn = double_dqn
         self.target_update_frequency = target_update_frequency
 
+        # If set, instead of copying the weights, target model is moved towards the model by this fraction
+        self.target_update_tau = target_update_tau
+
+        # Double DQN only - evaluate online model on both observation batches in a single forward pass
+        # and evaluate target model concurrently with it
+        self.fused_evaluation = fused_evaluation
+
         self.discount_factor = None
         self.target_model = None
+        self.target_averaging = None
+
+        self._target_stream = None
+        self._target_executor = None
 
     def initialize(self, settings, model, environment, device):
         """ Initialize policy gradient from reinforcer settings """
@@ -28,32 +44,107 @@ class DeepQLearning(OptimizerAlgoBase):
         self.target_model.load_state_dict(model.state_dict())
         self.target_model.eval()
 
+        if self.target_update_tau is not None:
+            self.target_averaging = PolyakAveraging(model, self.target_model)
+
         self.discount_factor = settings.discount_factor
 
+        # Initialization may run more than once, don't leave a worker thread behind
+        self.finalize()
+
+        if self.double_dqn and self.fused_evaluation:
+            if device.type == 'cuda':
+                self._target_stream = torch.cuda.Stream(device=device)
+            else:
+                self._target_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def finalize(self):
+        """ Shut down the target evaluation worker """
+        if self._target_executor is not None:
+            self._target_executor.shutdown(wait=True)
+            self._target_executor = None
+
+        self._target_stream = None
+
+    def _target_q_next(self, rollout):
+        """ Action values of the target model for the 'next' observations """
+        with torch.no_grad():
+            return self.target_model.evaluate(rollout).get('model:q_next')
+
+    def _start_target_evaluation(self, device, rollout):
+        """ Start evaluating target model concurrently, return a callable that waits for the result """
+        if self._target_stream is not None:
+            self._target_stream.wait_stream(torch.cuda.current_stream(device))
+
+            with torch.cuda.stream(self._target_stream):
+                target_q = self._target_q_next(rollout)
+
+            def wait():
+                torch.cuda.current_stream(device).wait_stream(self._target_stream)
+                target_q.record_stream(torch.cuda.current_stream(device))
+                return target_q
+
+            return wait
+        else:
+            future = self._target_executor.submit(self._target_q_next, rollout)
+            return future.result
+
+    def _fused_evaluation(self, device, model, rollout, evaluator):
+        """
+        Evaluate online model on observations and 'next' observations in a single forward pass,
+        while target model is evaluated concurrently on a separate CUDA stream or a worker thread.
+
+        Single forward pass saves kernel launches and python overhead, but the backward pass runs over the
+        concatenated batch, so it pays off most for small models and batches.
+        """
+        wait_for_target = self._start_target_evaluation(device, rollout)
+
+        observations = evaluator.get('rollout:observations')
+        observations_next = evaluator.get('rollout:observations_next')
+
+        q_values = model(torch.cat([observations, observations_next], dim=0))
+        model_q, model_q_next = q_values.split(observations.size(0), dim=0)
+
+        evaluator.provide('model:q', model_q)
+        evaluator.provide('model:q_next', model_q_next.detach())
+
+        return wait_for_target()
+
     def calculate_gradient(self, batch_info, device, model, rollout):
         """ Calculate loss of the supplied rollout """
         evaluator = model.evaluate(rollout)
 
+        if self.double_dqn and self.fused_evaluation:
+            target_q_next = self._fused_evaluation(device, model, rollout, evaluator)
+        else:
+            target_q_next = None
+
         dones_tensor = evaluator.get('rollout:dones')
         rewards_tensor = evaluator.get('rollout:rewards')
 
         assert dones_tensor.dtype == torch.float32
 
+        if rollout.has_tensor('discounts'):
+            # Multi-step returns - discount depends on how many steps were actually taken
+            discounts = evaluator.get('rollout:discounts')
+        else:
+            discounts = self.discount_factor
+
         with torch.no_grad():
-            target_evaluator = self.target_model.evaluate(rollout)
+            if target_q_next is None:
+                target_q_next = self.target_model.evaluate(rollout).get('model:q_next')
 
             if self.double_dqn:
                 # DOUBLE DQN
-                target_q = target_evaluator.get('model:q_next')
                 model_q = evaluator.get('model:q_next')
                 # Select largest 'target' value based on action that 'model' selects
-                values = target_q.gather(1, model_q.argmax(dim=1, keepdim=True)).squeeze(1)
+                values = target_q_next.gather(1, model_q.argmax(dim=1, keepdim=True)).squeeze(1)
             else:
                 # REGULAR DQN
                 # [0] is because in pytorch .max(...) returns tuple (max values, argmax)
-                values = target_evaluator.get('model:q_next').max(dim=1)[0]
+                values = target_q_next.max(dim=1)[0]
 
-            estimated_return = rewards_tensor + self.discount_factor * values * (1 - dones_tensor)
+            estimated_return = rewards_tensor + discounts * values * (1 - dones_tensor)
 
         q_selected = evaluator.get('model:action:q')
         weights = evaluator.get('rollout:weights')
@@ -61,7 +152,7 @@ class DeepQLearning(OptimizerAlgoBase):
         original_losses = F.smooth_l1_loss(q_selected, estimated_return, reduction='none')
 
         loss_value = torch.mean(weights * original_losses)
-        loss_value.backward()
+        self._backward(batch_info, loss_value)
 
         return {
             'loss': loss_value.item(),
@@ -74,8 +165,11 @@ class DeepQLearning(OptimizerAlgoBase):
     def post_optimization_step(self, batch_info, device, model, rollout):
         """ Steps to take after optimization has been done"""
         if batch_info.aggregate_batch_number % self.target_update_frequency == 0:
-            self.target_model.load_state_dict(model.state_dict())
-            self.target_model.eval()
+            if self.target_averaging is not None:
+                self.target_averaging.update(self.target_update_tau)
+            else:
+                self.target_model.load_state_dict(model.state_dict())
+                self.target_model.eval()
 
     def metrics(self) -> list:
         """ List of metrics to track for this learning process """
@@ -88,10 +182,13 @@ class DeepQLearning(OptimizerAlgoBase):
 
 
 def create(model: ModelFactory, target_update_frequency: int,
-           max_grad_norm: float, double_dqn: bool=False):
+           max_grad_norm: float, double_dqn: bool=False, fused_evaluation: bool=False,
+           target_update_tau: float=None):
     return DeepQLearning(
         model_factory=model,
         double_dqn=double_dqn,
         target_update_frequency=target_update_frequency,
-        max_grad_norm=max_grad_norm
+        max_grad_norm=max_grad_norm,
+        fused_evaluation=fused_evaluation,
+        target_update_tau=target_update_tau
     )
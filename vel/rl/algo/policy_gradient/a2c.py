@@ -36,7 +36,7 @@ class A2CPolicyGradient(OptimizerAlgoBase):
             policy_loss - self.entropy_coefficient * policy_entropy + self.value_coefficient * value_loss
         )
 
-        loss_value.backward()
+        self._backward(batch_info, loss_value)
 
         return {
             'policy_loss': policy_loss.item(),
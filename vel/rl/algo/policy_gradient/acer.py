@@ -4,6 +4,7 @@ import torch.nn.functional as F
 from vel.api.metrics.averaging_metric import AveragingNamedMetric
 from vel.rl.api import Trajectories
 from vel.rl.api.base import OptimizerAlgoBase
+from vel.util.polyak import PolyakAveraging
 
 
 def select_indices(tensor, indices):
@@ -32,6 +33,7 @@ class AcerPolicyGradient(OptimizerAlgoBase):
 
         # Trust region settings
         self.average_model = None
+        self.average_model_averaging = None
         self.average_model_initialized = False
         self.average_model_alpha = average_model_alpha
         self.trust_region_delta = trust_region_delta
@@ -42,6 +44,7 @@ class AcerPolicyGradient(OptimizerAlgoBase):
 
         if self.trust_region:
             self.average_model = self.model_factory.instantiate(action_space=environment.action_space).to(device)
+            self.average_model_averaging = PolyakAveraging(model, self.average_model)
 
     def update_average_model(self, model):
         """ Update weights of the average model with new model observation """
@@ -50,9 +53,8 @@ class AcerPolicyGradient(OptimizerAlgoBase):
             self.average_model.load_state_dict(model.state_dict())
             self.average_model_initialized = True
         else:
-            for model_param, average_param in zip(model.parameters(), self.average_model.parameters()):
-                # EWMA average model update
-                average_param.data.mul_(self.average_model_alpha).add_(model_param.data * (1 - self.average_model_alpha))
+            # EWMA average model update
+            self.average_model_averaging.update(1 - self.average_model_alpha)
 
     def calculate_gradient(self, batch_info, device, model, rollout):
         """ Calculate loss of the supplied rollout """
@@ -153,13 +155,13 @@ class AcerPolicyGradient(OptimizerAlgoBase):
             actor_gradient_updated = actor_gradient - adjustment_clipped.view(adjustment_clipped.size(0), 1)
 
             # Populate gradient from the newly updated fn
-            logprobs.backward(gradient=-actor_gradient_updated, retain_graph=True)
-            q_loss.backward(retain_graph=True)
+            self._backward(batch_info, logprobs, gradient=-actor_gradient_updated, retain_graph=True)
+            self._backward(batch_info, q_loss, retain_graph=True)
         else:
             # Just populate gradient from the loss
             loss = policy_loss + self.q_coefficient * q_function_loss - self.entropy_coefficient * policy_entropy
 
-            loss.backward()
+            self._backward(batch_info, loss)
 
         return {
             'policy_loss': policy_loss.item(),
@@ -5,6 +5,7 @@ import torch.nn.functional as F
 
 from vel.rl.api.base import OptimizerAlgoBase
 from vel.api.metrics.averaging_metric import AveragingNamedMetric
+from vel.util.polyak import PolyakAveraging
 
 
 class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
@@ -18,6 +19,7 @@ class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
 
         self.discount_factor = None
         self.target_model = None
+        self.target_averaging = None
 
     def initialize(self, settings, model, environment, device):
         """ Initialize algo from reinforcer settings """
@@ -25,6 +27,7 @@ class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
 
         self.target_model = self.model_factory.instantiate(action_space=environment.action_space).to(device)
         self.target_model.load_state_dict(model.state_dict())
+        self.target_averaging = PolyakAveraging(model, self.target_model)
 
     def calculate_gradient(self, batch_info, device, model, rollout):
         """ Calculate loss of the supplied rollout """
@@ -53,7 +56,7 @@ class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
         # From critic loss to critic network only and from actor loss to actor network only
 
         # Backpropagate value loss to critic only
-        value_loss.backward()
+        self._backward(batch_info, value_loss)
 
         model_action = model.action(observations)
         model_action_value = model.value(observations, model_action)
@@ -63,7 +66,7 @@ class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
         model_action_grad = torch.autograd.grad(policy_loss, model_action)[0]
 
         # Backpropagate actor loss to actor only
-        model_action.backward(gradient=model_action_grad)
+        self._backward(batch_info, model_action, gradient=model_action_grad)
 
         return {
             'policy_loss': policy_loss.item(),
@@ -72,10 +75,8 @@ class DeepDeterministicPolicyGradient(OptimizerAlgoBase):
 
     def post_optimization_step(self, batch_info, device, model, rollout):
         """ Steps to take after optimization has been done"""
-        # Update target model
-        for model_param, target_param in zip(model.parameters(), self.target_model.parameters()):
-            # EWMA average model update
-            target_param.data.mul_(1 - self.tau).add_(model_param.data * self.tau)
+        # Update target model - EWMA average model update
+        self.target_averaging.update(self.tau)
 
     def metrics(self) -> list:
         """ List of metrics to track for this learning process """
@@ -66,7 +66,7 @@ class PpoPolicyGradient(OptimizerAlgoBase):
             policy_loss - self.entropy_coefficient * policy_entropy + self.value_coefficient * value_loss
         )
 
-        loss_value.backward()
+        self._backward(batch_info, loss_value)
 
         with torch.no_grad():
             approx_kl_divergence = 0.5 * torch.mean((model_action_logprobs - rollout_action_logprobs).pow(2))
@@ -62,6 +62,7 @@ class TrpoPolicyGradient(AlgoBase):
 
     def optimizer_step(self, batch_info, device, model, rollout):
         """ Single optimization step for a model """
+        # Always runs in full precision, conjugate gradient and line search are not robust to reduced accuracy
         rollout = rollout.to_transitions()
 
         # This algorithm makes quote strong assumptions about how does the model look
@@ -8,6 +8,10 @@ class AlgoBase:
         """ Initialize algo from reinforcer settings """
         pass
 
+    def finalize(self):
+        """ Release resources acquired for training, once it's finished """
+        pass
+
     def optimizer_step(self, batch_info, device, model, rollout):
         """ Single optimization step for a model """
         raise NotImplementedError
@@ -16,6 +20,15 @@ class AlgoBase:
         """ List of metrics to track for this learning process """
         return []
 
+    def _backward(self, batch_info, tensor, gradient=None, retain_graph=None):
+        """ Backpropagate through the tensor, scaling it if training in mixed precision """
+        precision = batch_info.get('precision')
+
+        if precision is None:
+            tensor.backward(gradient=gradient, retain_graph=retain_graph)
+        else:
+            precision.backward(tensor, gradient=gradient, retain_graph=retain_graph)
+
     def _clip_gradients(self, batch_result, model, max_grad_norm):
         """ Clip gradients to a given maximum length """
         if max_grad_norm is not None:
@@ -45,13 +58,28 @@ class OptimizerAlgoBase(AlgoBase):
 
     def optimizer_step(self, batch_info, device, model, rollout):
         """ Single optimization step for a model """
+        # Mixed precision settings, if enabled by a callback
+        precision = batch_info.get('precision')
+
         batch_info.optimizer.zero_grad()
 
-        batch_result = self.calculate_gradient(batch_info=batch_info, device=device, model=model, rollout=rollout)
+        if precision is None:
+            batch_result = self.calculate_gradient(batch_info=batch_info, device=device, model=model, rollout=rollout)
+        else:
+            with precision.autocast():
+                batch_result = self.calculate_gradient(
+                    batch_info=batch_info, device=device, model=model, rollout=rollout
+                )
+
+            if self.max_grad_norm is not None:
+                precision.unscale_(batch_info.optimizer)
 
         self._clip_gradients(batch_result, model, self.max_grad_norm)
 
-        batch_info.optimizer.step(closure=None)
+        if precision is None:
+            batch_info.optimizer.step(closure=None)
+        else:
+            precision.step(batch_info.optimizer)
 
         self.post_optimization_step(batch_info, device, model, rollout)
 
@@ -14,6 +14,10 @@ class ReinforcerBase:
         """ Run the initialization procedure """
         pass
 
+    def finalize_training(self, training_info: TrainingInfo):
+        """ Release resources once training is finished """
+        pass
+
     def train_epoch(self, epoch_info: EpochInfo):
         """ Train model on an epoch of a fixed number of batch updates """
         raise NotImplementedError
@@ -42,6 +42,9 @@ class Evaluator(metaclass=EvaluatorMeta):
         - Whether given observation is last in a trajectory
     - rollout:dones
         - Raw rewards received from the environment in this learning process
+    - rollout:discounts
+        - Discount to apply to the bootstrapped value of a transition, if it varies between transitions
+        (for example for multi-step returns)
     - rollout:final_estimated_values
         - Value estimates for observation after final observation in the rollout
     - rollout:observations
@@ -0,0 +1,83 @@
+import collections
+import time
+
+from vel.api import BatchInfo
+from vel.api.base import Callback
+
+
+# Names of timers instrumented in the reinforcers and env rollers
+TIMER_NAMES = [
+    'time/env_step',
+    'time/policy',
+    'time/transfer',
+    'time/buffer_insert',
+    'time/buffer_sample',
+    'time/optimizer',
+]
+
+
+class _NullTimer:
+    """ Timer that does nothing, used when profiling is disabled """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _SectionTimer:
+    """ Measure wall-clock time of a single section of code and add it to the accumulator """
+
+    def __init__(self, accumulator, name):
+        self.accumulator = accumulator
+        self.name = name
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.accumulator[self.name] += time.perf_counter() - self.start_time
+        return False
+
+
+class BatchTimers:
+    """ Named timers accumulating time spent in various sections of a single batch """
+
+    def __init__(self):
+        self.accumulator = collections.defaultdict(float)
+
+    def section(self, name):
+        """ Context manager timing a section of code """
+        return _SectionTimer(self.accumulator, name)
+
+    def items(self):
+        return self.accumulator.items()
+
+
+def timed(batch_info: BatchInfo, name: str):
+    """ Time a section of code under given name, if profiling is enabled for this batch """
+    timers = batch_info.get('timers') if batch_info is not None else None
+
+    if timers is None:
+        return _NULL_TIMER
+    else:
+        return timers.section(name)
+
+
+class StepProfiler(Callback):
+    """ Enable named timers for each batch and put measured values into the batch info """
+
+    def on_batch_begin(self, batch_info: BatchInfo):
+        batch_info['timers'] = BatchTimers()
+
+    def on_batch_end(self, batch_info: BatchInfo):
+        timers = batch_info['timers']
+
+        for name, value in timers.items():
+            batch_info[name] = value
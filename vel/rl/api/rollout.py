@@ -23,6 +23,10 @@ class Rollout:
         """ A buffer of a given value in a 'flat' (minibatch-indexed) format """
         raise NotImplementedError
 
+    def has_tensor(self, name):
+        """ If rollout has buffer of a given name """
+        raise NotImplementedError
+
 
 class Transitions(Rollout):
     """
@@ -71,6 +75,10 @@ class Transitions(Rollout):
         """ A buffer of a given value in a 'flat' (minibatch-indexed) format """
         return self.transition_tensors[name]
 
+    def has_tensor(self, name):
+        """ If rollout has buffer of a given name """
+        return name in self.transition_tensors
+
 
 class Trajectories(Rollout):
     """
@@ -130,6 +138,10 @@ class Trajectories(Rollout):
         else:
             return self.rollout_tensors[name]
 
+    def has_tensor(self, name):
+        """ If rollout has buffer of a given name """
+        return name in self.transition_tensors or name in self.rollout_tensors
+
     def flatten_tensor(self, tensor):
         """ Merge first two dims of a tensor """
         return tensor_util.merge_first_two_dims(tensor)
@@ -154,22 +154,72 @@ class DequeBufferBackend:
 
         return data_dict
 
+    def get_batch_n_step(self, indexes, history_length=1, forward_steps=1, discount_factor=1.0):
+        """
+        Return batch with given indexes, where rewards are discounted sums over next `forward_steps` transitions.
+
+        Multi-step sums are truncated at the end of the episode. Together with the rewards, we return frames to bootstrap
+        the value from ('states+1') and the discount that should be applied to the bootstrapped value ('discounts').
+        """
+        # Indexes of all the transitions that contribute to the return, shape [batch, forward_steps]
+        forward_indexes = (indexes[:, None] + np.arange(forward_steps)[None, :]) % self.buffer_capacity
+        forward_dones = self.dones_buffer[forward_indexes]
+
+        # Transition contributes to the return only if no episode has ended before it
+        forward_mask = np.ones(forward_indexes.shape, dtype=np.float32)
+        forward_mask[:, 1:] = np.cumprod(1.0 - forward_dones[:, :-1], axis=1)
+
+        forward_discounts = discount_factor ** np.arange(forward_steps, dtype=np.float32)
+
+        rewards = (self.reward_buffer[forward_indexes] * forward_mask * forward_discounts[None, :]).sum(axis=1)
+        effective_steps = forward_mask.sum(axis=1).astype(int)
+
+        # Last transition taken into account, its 'future' frame is the one we bootstrap from
+        bootstrap_indexes = (indexes + effective_steps - 1) % self.buffer_capacity
+
+        frame_batch_shape = (
+                [indexes.shape[0]]
+                + list(self.state_buffer.shape[1:-1])
+                + [self.state_buffer.shape[-1] * history_length]
+        )
+
+        past_frame_buffer = np.zeros(frame_batch_shape, dtype=self.state_buffer.dtype)
+        future_frame_buffer = np.zeros(frame_batch_shape, dtype=self.state_buffer.dtype)
+
+        for buffer_idx, (frame_idx, bootstrap_idx) in enumerate(zip(indexes, bootstrap_indexes)):
+            past_frame_buffer[buffer_idx] = self.get_frame(frame_idx, history_length)
+            future_frame_buffer[buffer_idx] = self.get_frame_with_future(bootstrap_idx, history_length)[1]
+
+        data_dict = {
+            'states': past_frame_buffer,
+            'actions': self.action_buffer[indexes],
+            'rewards': rewards.astype(np.float32),
+            'states+1': future_frame_buffer,
+            'dones': self.dones_buffer[bootstrap_indexes],
+            'discounts': (discount_factor ** effective_steps).astype(np.float32),
+        }
+
+        for name in self.extra_data:
+            data_dict[name] = self.extra_data[name][indexes]
+
+        return data_dict
+
     def get_rollout(self, index, rollout_length, history_length):
         """ Return batch consisting of *consecutive* transitions """
         indexes = np.arange(index - rollout_length + 1, index + 1, dtype=int)
         return self.get_batch(indexes, history_length)
 
-    def sample_batch_uniform(self, batch_size, history_length):
+    def sample_batch_uniform(self, batch_size, history_length, forward_steps=1):
         """ Return indexes of next sample"""
         # Sample from up to total size
         if self.current_size < self.buffer_capacity:
-            # -1 because we cannot take the last one
-            return np.random.choice(self.current_size - 1, batch_size, replace=False)
+            # -forward_steps because we cannot take the last ones, as they don't have enough future
+            return np.random.choice(self.current_size - forward_steps, batch_size, replace=False)
         else:
             candidate = np.random.choice(self.buffer_capacity, batch_size, replace=False)
 
             forbidden_ones = (
-                    np.arange(self.current_idx, self.current_idx + history_length)
+                    np.arange(self.current_idx - forward_steps + 1, self.current_idx + history_length)
                     % self.buffer_capacity
             )
 
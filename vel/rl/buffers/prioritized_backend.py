@@ -2,6 +2,8 @@ import gym
 import numpy as np
 import random
 
+from vel.exceptions import VelException
+
 from .deque_backend import DequeBufferBackend
 
 
@@ -64,6 +66,11 @@ class SegmentTree:
 
 class PrioritizedReplayBackend:
     """ Backend behind the prioritized replay buffer """
+
+    # Number of attempts to sample a valid transition from within a segment, and then from the whole tree
+    SEGMENT_ATTEMPTS = 20
+    TREE_ATTEMPTS = 1000
+
     def __init__(self, buffer_capacity: int, observation_space: gym.Space, action_space: gym.Space, extra_data=None):
         self.deque = DequeBufferBackend(buffer_capacity, observation_space, action_space, extra_data=extra_data)
         self.segment_tree = SegmentTree(buffer_capacity)
@@ -87,40 +94,44 @@ class PrioritizedReplayBackend:
         """ Return batch of frames for given indexes """
         return self.deque.get_batch(indexes, history)
 
+    def get_batch_n_step(self, indexes, history, forward_steps=1, discount_factor=1.0):
+        """ Return batch of frames for given indexes with rewards summed over multiple steps """
+        return self.deque.get_batch_n_step(indexes, history, forward_steps, discount_factor)
+
     def update_priority(self, tree_idx, priority):
         """ Update priorities of the elements in the tree """
         self.segment_tree.update(tree_idx, priority)
 
-    def sample_batch_prioritized(self, batch_size, history):
+    def sample_batch_prioritized(self, batch_size, history, forward_steps=1):
         """ Return indexes of the next sample in from prioritized distribution """
         p_total = self.segment_tree.total()
         segment = p_total / batch_size
 
         # Get batch of valid samples
-        batch = [self._get_sample_from_segment(segment, i, history) for i in range(batch_size)]
+        batch = [self._get_sample_from_segment(segment, i, history, forward_steps) for i in range(batch_size)]
         probs, idxs, tree_idxs = zip(*batch)
         return probs, np.array(idxs), tree_idxs
 
-    def _get_sample_from_segment(self, segment, i, history):
-        valid = False
-
-        prob = None
-        idx = None
-        tree_idx = None
-
-        while not valid:
-            # Uniformly sample an element from within a segment
-            sample = random.uniform(i * segment, (i + 1) * segment)
+    def _get_sample_from_segment(self, segment, i, history, forward_steps):
+        # Whole segment may fall within the range excluded around the current index, after a few attempts
+        # sample from the whole tree instead
+        for attempt in range(self.SEGMENT_ATTEMPTS + self.TREE_ATTEMPTS):
+            if attempt < self.SEGMENT_ATTEMPTS:
+                # Uniformly sample an element from within a segment
+                sample = random.uniform(i * segment, (i + 1) * segment)
+            else:
+                sample = random.uniform(0, self.segment_tree.total())
 
             # Retrieve sample from tree with un-normalised probability
             prob, idx, tree_idx = self.segment_tree.find(sample)
 
             # Resample if transition straddled current index or probablity 0
-            if (self.segment_tree.index - idx) % self.segment_tree.size > 1 and \
+            # Note that conditions are valid but extra conservative around buffer index 0
+            if (self.segment_tree.index - idx) % self.segment_tree.size > forward_steps and \
                     (idx - self.segment_tree.index) % self.segment_tree.size >= history and prob != 0:
-                valid = True  # Note that conditions are valid but extra conservative around buffer index 0
+                return prob, idx, tree_idx
 
-        return prob, idx, tree_idx
+        raise VelException("Could not sample a valid transition from the buffer")
 
     @property
     def current_size(self):
@@ -369,6 +369,78 @@ def test_get_batch():
         buffer.get_batch(np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9]), history_length=4)
 
 
+def test_get_batch_n_step():
+    """ Check if get_batch_n_step properly sums rewards over multiple steps, respecting episode boundaries """
+    buffer = get_filled_buffer_with_dones()
+
+    batch = buffer.get_batch_n_step(
+        np.array([0, 1, 2, 3, 6]), history_length=4, forward_steps=3, discount_factor=0.5
+    )
+
+    obs = batch['states']
+    rew = batch['rewards']
+    obs_tp1 = batch['states+1']
+    dones = batch['dones']
+    discounts = batch['discounts']
+
+    nt.assert_array_equal(obs.max(1).max(1), np.array([
+        [0, 0, 20, 21],
+        [0, 20, 21, 22],
+        [20, 21, 22, 23],
+        [0, 0, 0, 24],
+        [24, 25, 26, 27],
+    ]))
+
+    nt.assert_array_almost_equal(rew, np.array([18.0, 16.0, 11.0, 20.625, 23.25]))
+    nt.assert_array_equal(dones, np.array([True, True, True, False, True]))
+    nt.assert_array_almost_equal(discounts, np.array([0.125, 0.25, 0.5, 0.125, 0.125]))
+
+    nt.assert_array_equal(obs_tp1.max(1).max(1), np.array([
+        [21, 22, 23, 0],
+        [21, 22, 23, 0],
+        [21, 22, 23, 0],
+        [24, 25, 26, 27],
+        [27, 28, 29, 0],
+    ]))
+
+
+def test_get_batch_n_step_single_step():
+    """ Check if get_batch_n_step with a single step is equivalent to get_batch """
+    buffer = get_filled_buffer_with_dones()
+
+    indexes = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8])
+
+    batch = buffer.get_batch(indexes, history_length=4)
+    batch_n_step = buffer.get_batch_n_step(indexes, history_length=4, forward_steps=1, discount_factor=0.99)
+
+    for key in ['states', 'actions', 'rewards', 'states+1', 'dones']:
+        nt.assert_array_equal(batch[key], batch_n_step[key])
+
+    nt.assert_array_almost_equal(batch_n_step['discounts'], np.ones(9) * 0.99)
+
+
+def test_sample_and_get_batch_n_step():
+    """ Check if sampling for multi-step returns never selects frames without enough future """
+    buffer = get_filled_buffer_with_dones()
+
+    for i in range(100):
+        indexes = buffer.sample_batch_uniform(batch_size=5, history_length=4, forward_steps=3)
+        batch = buffer.get_batch_n_step(indexes, history_length=4, forward_steps=3, discount_factor=0.99)
+
+        assert not any(x in indexes for x in [7, 8, 9, 10, 11, 12])
+
+        t.eq_(batch['states'].shape[0], 5)
+        t.eq_(batch['discounts'].shape[0], 5)
+
+    buffer = get_half_filled_buffer()
+
+    for i in range(100):
+        indexes = buffer.sample_batch_uniform(batch_size=5, history_length=4, forward_steps=3)
+        buffer.get_batch_n_step(indexes, history_length=4, forward_steps=3, discount_factor=0.99)
+
+        assert np.all(indexes < 7)
+
+
 def test_sample_and_get_batch():
     """ Check if batch sampling works properly """
     buffer = get_filled_buffer_with_dones()
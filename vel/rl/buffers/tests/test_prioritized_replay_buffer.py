@@ -98,6 +98,31 @@ def test_sampling_is_correct_small_buffer():
         buffer.get_batch(np.array([10]), history=4)
 
 
+def test_sampling_n_step_is_correct():
+    """ Check if sampling for multi-step returns never selects frames without enough future """
+    buffer = get_large_filled_buffer_with_dones()
+
+    for i in range(100):
+        probs, idxs, tree_idxs = buffer.sample_batch_prioritized(6, history=4, forward_steps=3)
+        batch = buffer.get_batch_n_step(idxs, history=4, forward_steps=3, discount_factor=0.99)
+
+        assert not any(x in idxs for x in range(997, 1004))
+        t.eq_(batch['rewards'].shape[0], 6)
+        t.eq_(batch['discounts'].shape[0], 6)
+
+
+def test_sampling_n_step_small_buffer():
+    """ Sampling must terminate even when a whole segment falls within the range excluded for multi-step returns """
+    buffer = get_filled_buffer_with_dones()
+
+    for i in range(100):
+        probs, idxs, tree_idxs = buffer.sample_batch_prioritized(6, history=4, forward_steps=3)
+        batch = buffer.get_batch_n_step(idxs, history=4, forward_steps=3, discount_factor=0.99)
+
+        assert not any(x in idxs for x in [7, 8, 9, 10, 11, 12])
+        t.eq_(batch['rewards'].shape[0], 6)
+
+
 def test_prioritized_sampling_probabilities():
     """ Check if sampling probabilities are more or less correct in the sampling results """
     buffer = get_large_filled_buffer_with_dones()
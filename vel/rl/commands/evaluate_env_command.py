@@ -1,17 +1,19 @@
 import numpy as np
-import pandas as pd
 import torch
 
 from vel.api import ModelConfig, TrainingInfo
 from vel.api.base import Storage, ModelFactory
 from vel.rl.api.base import EnvFactory
+from vel.rl.vecenv.dummy import DummyVecEnvWrapper
+from vel.rl.vecenv.subproc import SubprocVecEnvWrapper
 from vel.openai.baselines.common.atari_wrappers import FrameStack
 
 
 class EvaluateEnvCommand:
     """ Record environment playthrough as a game  """
     def __init__(self, model_config: ModelConfig, env_factory: EnvFactory, model_factory: ModelFactory,
-                 storage: Storage, takes: int, frame_history: int, sample_args: dict = None):
+                 storage: Storage, takes: int, frame_history: int, sample_args: dict = None,
+                 parallel_envs: int = 1, subprocess: bool = False):
         self.model_config = model_config
         self.model_factory = model_factory
         self.env_factory = env_factory
@@ -20,10 +22,26 @@ class EvaluateEnvCommand:
         self.frame_history = frame_history
         self.sample_args = sample_args if sample_args is not None else {}
 
+        self.parallel_envs = parallel_envs
+        self.subprocess = subprocess
+
     def run(self):
+        import pandas as pd
+
         device = torch.device(self.model_config.device)
 
-        env = FrameStack(self.env_factory.instantiate(preset='raw'), self.frame_history)
+        if self.parallel_envs > 1:
+            if self.subprocess:
+                vec_env_factory = SubprocVecEnvWrapper(self.env_factory, frame_history=self.frame_history)
+            else:
+                vec_env_factory = DummyVecEnvWrapper(self.env_factory, frame_history=self.frame_history)
+
+            env = vec_env_factory.instantiate(
+                parallel_envs=self.parallel_envs, seed=self.model_config.seed, preset='raw'
+            )
+        else:
+            env = FrameStack(self.env_factory.instantiate(preset='raw'), self.frame_history)
+
         model = self.model_factory.instantiate(action_space=env.action_space).to(device)
 
         training_info = TrainingInfo(start_epoch_idx=self.storage.last_epoch_idx(), run_name=self.model_config.run_name)
@@ -31,23 +49,59 @@ class EvaluateEnvCommand:
 
         model.eval()
 
-        rewards = []
-        lengths = []
+        if self.parallel_envs > 1:
+            episodes = self.evaluate_vectorized(model, env, device)
+            env.close()
+        else:
+            episodes = [self.record_take(model, env, device, takenumber=i+1) for i in range(self.takes)]
 
-        for i in range(self.takes):
-            result = self.record_take(model, env, device, takenumber=i+1)
-            rewards.append(result['r'])
-            lengths.append(result['l'])
+        rewards = [episode['r'] for episode in episodes]
+        lengths = [episode['l'] for episode in episodes]
 
         print(pd.DataFrame({'lengths': lengths, 'rewards': rewards}).describe())
 
     @torch.no_grad()
-    def record_take(self, model, env_instance, device, takenumber):
-        frames = []
+    def evaluate_vectorized(self, model, vec_env, device):
+        """
+        Play all the takes across environments of a vector environment, evaluating model in batches.
 
-        observation = env_instance.reset()
+        Each environment plays a fixed number of episodes, so that short episodes are not overrepresented
+        in the results. Model is evaluated only on environments that still have episodes to play. Vector environment
+        still steps the finished ones, with a copy of an action chosen for another environment.
+        """
+        num_envs = vec_env.num_envs
+        quotas = np.array([self.takes // num_envs + (1 if i < self.takes % num_envs else 0) for i in range(num_envs)])
+        finished = np.zeros(num_envs, dtype=int)
 
-        frames.append(env_instance.render('rgb_array'))
+        episodes = []
+
+        print("Evaluating environment...")
+
+        observation = vec_env.reset()
+
+        while (finished < quotas).any():
+            active = finished < quotas
+
+            observation_tensor = torch.from_numpy(observation[active]).to(device)
+            active_actions = model.step(observation_tensor, **self.sample_args)['actions'].cpu().numpy()
+
+            actions = np.repeat(active_actions[:1], num_envs, axis=0)
+            actions[active] = active_actions
+
+            observation, rewards, dones, infos = vec_env.step(actions)
+
+            for env_idx, info in enumerate(infos):
+                if 'episode' in info and finished[env_idx] < quotas[env_idx]:
+                    finished[env_idx] += 1
+                    episodes.append(info['episode'])
+
+                    print(f"Take {len(episodes)}/{self.takes}: reward {info['episode']['r']}")
+
+        return episodes
+
+    @torch.no_grad()
+    def record_take(self, model, env_instance, device, takenumber):
+        observation = env_instance.reset()
 
         print("Evaluating environment...")
 
@@ -58,14 +112,13 @@ class EvaluateEnvCommand:
 
             observation, reward, done, epinfo = env_instance.step(actions.item())
 
-            frames.append(env_instance.render('rgb_array'))
-
             if 'episode' in epinfo:
                 # End of an episode
                 return epinfo['episode']
 
 
-def create(model_config, model, env, storage, takes, frame_history, sample_args=None):
+def create(model_config, model, env, storage, takes, frame_history, sample_args=None, parallel_envs=1,
+           subprocess=False):
     return EvaluateEnvCommand(
         model_config=model_config,
         model_factory=model,
@@ -73,5 +126,7 @@ def create(model_config, model, env, storage, takes, frame_history, sample_args=
         storage=storage,
         frame_history=frame_history,
         takes=takes,
-        sample_args=sample_args
+        sample_args=sample_args,
+        parallel_envs=parallel_envs,
+        subprocess=subprocess
     )
@@ -4,6 +4,9 @@ import typing
 from vel.api import ModelConfig, EpochInfo, TrainingInfo, BatchInfo
 from vel.api.base import OptimizerFactory, Storage, Callback
 from vel.rl.api.base import ReinforcerFactory
+from vel.rl.api.profiling import StepProfiler, TIMER_NAMES
+from vel.rl.metrics import TimingMetric
+from vel.callbacks.mixed_precision import MixedPrecision
 from vel.callbacks.time_tracker import TimeTracker
 
 import vel.openai.baselines.logger as openai_logger
@@ -43,7 +46,7 @@ class RlTrainCommand:
                  optimizer_factory: OptimizerFactory,
                  storage: Storage, callbacks,
                  total_frames: int, batches_per_epoch: int,
-                 scheduler_factory=None, openai_logging=False):
+                 scheduler_factory=None, openai_logging=False, profile=False, precision='fp32'):
         self.model_config = model_config
         self.reinforcer = reinforcer
         self.optimizer_factory = optimizer_factory
@@ -54,6 +57,8 @@ class RlTrainCommand:
         self.callbacks = callbacks if callbacks is not None else []
 
         self.openai_logging = openai_logging
+        self.profile = profile
+        self.precision = precision
 
     def run(self):
         """ Run reinforcement learning algorithm """
@@ -67,6 +72,9 @@ class RlTrainCommand:
         # Metrics to track through this training
         metrics = reinforcer.metrics()
 
+        if self.profile:
+            metrics = metrics + [TimingMetric(name) for name in TIMER_NAMES]
+
         training_info = self.resume_training(reinforcer, callbacks, metrics)
 
         reinforcer.initialize_training(training_info)
@@ -77,6 +85,17 @@ class RlTrainCommand:
 
         global_epoch_idx = training_info.start_epoch_idx + 1
 
+        try:
+            self._train(reinforcer, optimizer, training_info, global_epoch_idx)
+        finally:
+            reinforcer.finalize_training(training_info)
+
+        training_info.on_train_end()
+
+        return training_info
+
+    def _train(self, reinforcer, optimizer, training_info, global_epoch_idx):
+        """ Run training epochs until the frame budget is used up """
         while training_info['frames'] < self.total_frames:
             epoch_info = EpochInfo(
                 training_info,
@@ -94,14 +113,16 @@ class RlTrainCommand:
 
             global_epoch_idx += 1
 
-        training_info.on_train_end()
-
-        return training_info
-
     def gather_callbacks(self, optimizer) -> list:
         """ Gather all the callbacks to be used in this training run """
         callbacks = [FrameTracker(self.total_frames), TimeTracker()]
 
+        if self.profile:
+            callbacks.append(StepProfiler())
+
+        if self.precision != 'fp32':
+            callbacks.append(MixedPrecision(self.precision, torch.device(self.model_config.device)))
+
         if self.scheduler_factory is not None:
             callbacks.append(self.scheduler_factory.instantiate(optimizer))
 
@@ -146,7 +167,8 @@ class RlTrainCommand:
 
 def create(model_config, reinforcer, optimizer, storage,
            # Settings:
-           total_frames, batches_per_epoch,  callbacks=None, scheduler=None, openai_logging=False):
+           total_frames, batches_per_epoch,  callbacks=None, scheduler=None, openai_logging=False, profile=False,
+           precision='fp32'):
     """ Create reinforcement learning pipeline """
     from vel.openai.baselines import logger
     logger.configure(dir=model_config.openai_dir())
@@ -160,5 +182,7 @@ def create(model_config, reinforcer, optimizer, storage,
         callbacks=callbacks,
         total_frames=int(float(total_frames)),
         batches_per_epoch=int(batches_per_epoch),
-        openai_logging=openai_logging
+        openai_logging=openai_logging,
+        profile=profile,
+        precision=precision
     )
@@ -3,8 +3,10 @@ import torch
 
 from vel.api.base import Schedule
 from vel.api.metrics import AveragingNamedMetric
+from vel.exceptions import VelException
 from vel.rl.api import Rollout, Transitions
 from vel.rl.api.base import ReplayEnvRollerBase, ReplayEnvRollerFactory
+from vel.rl.api.profiling import timed
 from vel.rl.buffers.deque_backend import DequeBufferBackend
 
 
@@ -18,12 +20,18 @@ class DequeReplayRollerEpsGreedy(ReplayEnvRollerBase):
     """
 
     def __init__(self, environment, device, epsilon_schedule: Schedule, batch_size: int,
-                 buffer_capacity: int, buffer_initial_size: int, frame_stack: int):
+                 buffer_capacity: int, buffer_initial_size: int, frame_stack: int,
+                 discount_factor: float=None, forward_steps: int=1):
         self.epsilon_schedule = epsilon_schedule
         self.batch_size = batch_size
         self.buffer_capacity = buffer_capacity
         self.buffer_initial_size = buffer_initial_size
         self.frame_stack = frame_stack
+        self.discount_factor = discount_factor
+        self.forward_steps = forward_steps
+
+        if self.forward_steps > 1 and self.discount_factor is None:
+            raise VelException("Multi-step returns require a discount factor")
 
         self.device = device
         self._environment = environment
@@ -61,14 +69,18 @@ class DequeReplayRollerEpsGreedy(ReplayEnvRollerBase):
             self.last_observation
         ], axis=-1)
 
-        observation_tensor = torch.from_numpy(last_observation[None]).to(self.device)
-        step = model.step(observation_tensor)
+        with timed(batch_info, 'time/transfer'):
+            observation_tensor = torch.from_numpy(last_observation[None]).to(self.device)
+        with timed(batch_info, 'time/policy'):
+            step = model.step(observation_tensor)
 
         epsgreedy_step = self.epsgreedy_action(step['actions'], epsilon_value)
         action = epsgreedy_step.item()
 
-        observation, reward, done, info = self.environment.step(action)
-        self.backend.store_transition(self.last_observation, action, reward, done)
+        with timed(batch_info, 'time/env_step'):
+            observation, reward, done, info = self.environment.step(action)
+        with timed(batch_info, 'time/buffer_insert'):
+            self.backend.store_transition(self.last_observation, action, reward, done)
 
         # Usual, reset on done
         if done:
@@ -96,8 +108,12 @@ class DequeReplayRollerEpsGreedy(ReplayEnvRollerBase):
 
     def sample(self, batch_info, model) -> Transitions:
         """ Sample experience from replay buffer and return a batch """
-        indexes = self.backend.sample_batch_uniform(self.batch_size, self.frame_stack)
-        batch = self.backend.get_batch(indexes, self.frame_stack)
+        indexes = self.backend.sample_batch_uniform(self.batch_size, self.frame_stack, self.forward_steps)
+        # Without a discount factor transitions are single-step, and the algorithm applies its own discount
+        batch = self.backend.get_batch_n_step(
+            indexes, self.frame_stack, self.forward_steps,
+            self.discount_factor if self.discount_factor is not None else 1.0
+        )
 
         observations = torch.from_numpy(batch['states']).to(self.device)
         observations_plus1 = torch.from_numpy(batch['states+1']).to(self.device)
@@ -105,40 +121,49 @@ class DequeReplayRollerEpsGreedy(ReplayEnvRollerBase):
         rewards = torch.from_numpy(batch['rewards'].astype(np.float32)).to(self.device)
         actions = torch.from_numpy(batch['actions']).to(self.device)
 
+        transition_tensors = {
+            'observations': observations,
+            'observations_next': observations_plus1,
+            'dones': dones,
+            'rewards': rewards,
+            'actions': actions,
+            'weights': torch.ones_like(rewards)
+        }
+
+        if self.discount_factor is not None:
+            transition_tensors['discounts'] = torch.from_numpy(batch['discounts']).to(self.device)
+
         return Transitions(
             size=self.batch_size,
             environment_information=None,
-            transition_tensors={
-                'observations': observations,
-                'observations_next': observations_plus1,
-                'dones': dones,
-                'rewards': rewards,
-                'actions': actions,
-                'weights': torch.ones_like(rewards)
-            }
+            transition_tensors=transition_tensors
         )
 
 
 class DequeReplayRollerEpsGreedyFactory(ReplayEnvRollerFactory):
     """ Factory class for DequeReplayQRoller """
     def __init__(self, epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size: int,
-                 frame_stack: int=1):
+                 frame_stack: int=1, forward_steps: int=1):
         self.buffer_capacity = buffer_capacity
         self.epsilon_schedule = epsilon_schedule
         self.buffer_initial_size = buffer_initial_size
         self.frame_stack = frame_stack
+        self.forward_steps = forward_steps
 
     def instantiate(self, environment, device, settings) -> ReplayEnvRollerBase:
         return DequeReplayRollerEpsGreedy(
             environment, device, self.epsilon_schedule, settings.batch_size,
-            self.buffer_capacity, self.buffer_initial_size, self.frame_stack
+            self.buffer_capacity, self.buffer_initial_size, self.frame_stack,
+            discount_factor=settings.discount_factor, forward_steps=self.forward_steps
         )
 
 
-def create(epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size: int, frame_stack: int=1):
+def create(epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size: int, frame_stack: int=1,
+           forward_steps: int=1):
     return DequeReplayRollerEpsGreedyFactory(
         epsilon_schedule=epsilon_schedule,
         buffer_capacity=buffer_capacity,
         buffer_initial_size=buffer_initial_size,
-        frame_stack=frame_stack
+        frame_stack=frame_stack,
+        forward_steps=forward_steps
     )
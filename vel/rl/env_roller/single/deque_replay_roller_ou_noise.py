@@ -5,6 +5,7 @@ from vel.math.processes import OrnsteinUhlenbeckNoiseProcess
 from vel.openai.baselines.common.running_mean_std import RunningMeanStd
 from vel.rl.api import Rollout, Transitions
 from vel.rl.api.base import ReplayEnvRollerBase, ReplayEnvRollerFactory
+from vel.rl.api.profiling import timed
 from vel.rl.buffers.deque_backend import DequeBufferBackend
 
 
@@ -62,17 +63,20 @@ class DequeReplayRollerOuNoise(ReplayEnvRollerBase):
     @torch.no_grad()
     def rollout(self, batch_info, model) -> Rollout:
         """ Roll-out the environment and return it """
-        observation_tensor = self._observation_to_tensor(self.last_observation[None])
+        with timed(batch_info, 'time/transfer'):
+            observation_tensor = self._observation_to_tensor(self.last_observation[None])
 
-        step = model.step(observation_tensor)
-        action = step['actions'].detach().cpu().numpy()[0]
+        with timed(batch_info, 'time/policy'):
+            step = model.step(observation_tensor)
+            action = step['actions'].detach().cpu().numpy()[0]
         noise = self.noise_process()
 
         action_perturbed = np.clip(
             action + noise, self.environment.action_space.low, self.environment.action_space.high
         )
 
-        observation, reward, done, info = self.environment.step(action_perturbed)
+        with timed(batch_info, 'time/env_step'):
+            observation, reward, done, info = self.environment.step(action_perturbed)
 
         if self.ob_rms is not None:
             self.ob_rms.update(observation[None])
@@ -82,7 +86,8 @@ class DequeReplayRollerOuNoise(ReplayEnvRollerBase):
 
             self.ret_rms.update(np.array([self.accumulated_return]))
 
-        self.backend.store_transition(self.last_observation, action_perturbed, reward, done)
+        with timed(batch_info, 'time/buffer_insert'):
+            self.backend.store_transition(self.last_observation, action_perturbed, reward, done)
 
         # Usual, reset on done
         if done:
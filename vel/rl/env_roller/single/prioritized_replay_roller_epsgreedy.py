@@ -3,8 +3,10 @@ import torch
 
 from vel.api.base import Schedule
 from vel.api.metrics import AveragingNamedMetric
+from vel.exceptions import VelException
 from vel.rl.api import Rollout, Transitions
 from vel.rl.api.base import ReplayEnvRollerBase, EnvRollerFactory
+from vel.rl.api.profiling import timed
 from vel.rl.buffers.prioritized_backend import PrioritizedReplayBackend
 
 
@@ -19,13 +21,19 @@ class PrioritizedReplayRollerEpsGreedy(ReplayEnvRollerBase):
 
     def __init__(self, environment, device, epsilon_schedule: Schedule, batch_size: int,
                  buffer_capacity: int, buffer_initial_size: int, frame_stack: int,
-                 priority_exponent: float, priority_weight: Schedule, priority_epsilon: float):
+                 priority_exponent: float, priority_weight: Schedule, priority_epsilon: float,
+                 discount_factor: float=None, forward_steps: int=1):
         self.epsilon_schedule = epsilon_schedule
 
         self.batch_size = batch_size
         self.buffer_capacity = buffer_capacity
         self.buffer_initial_size = buffer_initial_size
         self.frame_stack = frame_stack
+        self.discount_factor = discount_factor
+        self.forward_steps = forward_steps
+
+        if self.forward_steps > 1 and self.discount_factor is None:
+            raise VelException("Multi-step returns require a discount factor")
 
         self.priority_exponent = priority_exponent
         self.priority_weight_schedule = priority_weight
@@ -68,15 +76,19 @@ class PrioritizedReplayRollerEpsGreedy(ReplayEnvRollerBase):
             self.last_observation
         ], axis=-1)
 
-        observation_tensor = torch.from_numpy(last_observation[None]).to(self.device)
+        with timed(batch_info, 'time/transfer'):
+            observation_tensor = torch.from_numpy(last_observation[None]).to(self.device)
 
-        step = model.step(observation_tensor)
+        with timed(batch_info, 'time/policy'):
+            step = model.step(observation_tensor)
         epsgreedy_step = self.epsgreedy_action(step['actions'], epsilon_value)
         action = epsgreedy_step.item()
 
-        observation, reward, done, info = self.environment.step(action)
+        with timed(batch_info, 'time/env_step'):
+            observation, reward, done, info = self.environment.step(action)
 
-        self.backend.store_transition(self.last_observation, action, reward, done)
+        with timed(batch_info, 'time/buffer_insert'):
+            self.backend.store_transition(self.last_observation, action, reward, done)
 
         # Usual, reset on done
         if done:
@@ -104,8 +116,14 @@ class PrioritizedReplayRollerEpsGreedy(ReplayEnvRollerBase):
 
     def sample(self, batch_info, model) -> Transitions:
         """ Sample experience from replay buffer and return a batch """
-        probs, indexes, tree_idxs = self.backend.sample_batch_prioritized(self.batch_size, self.frame_stack)
-        batch = self.backend.get_batch(indexes, self.frame_stack)
+        probs, indexes, tree_idxs = self.backend.sample_batch_prioritized(
+            self.batch_size, self.frame_stack, self.forward_steps
+        )
+        # Without a discount factor transitions are single-step, and the algorithm applies its own discount
+        batch = self.backend.get_batch_n_step(
+            indexes, self.frame_stack, self.forward_steps,
+            self.discount_factor if self.discount_factor is not None else 1.0
+        )
 
         # Normalize weights properly
         priority_weight = self.priority_weight_schedule.value(batch_info['progress'])
@@ -122,17 +140,22 @@ class PrioritizedReplayRollerEpsGreedy(ReplayEnvRollerBase):
         actions = torch.from_numpy(batch['actions']).to(self.device)
         weights = torch.from_numpy(weights.astype(np.float32)).to(self.device)
 
+        transition_tensors = {
+            'observations': observations,
+            'observations_next': observations_plus1,
+            'dones': dones,
+            'rewards': rewards,
+            'actions': actions,
+            'weights': weights,
+        }
+
+        if self.discount_factor is not None:
+            transition_tensors['discounts'] = torch.from_numpy(batch['discounts']).to(self.device)
+
         return Transitions(
             size=self.batch_size,
             environment_information=None,
-            transition_tensors={
-                'observations': observations,
-                'observations_next': observations_plus1,
-                'dones': dones,
-                'rewards': rewards,
-                'actions': actions,
-                'weights': weights,
-            },
+            transition_tensors=transition_tensors,
             extra_data={
                 'tree_idxs': tree_idxs
             }
@@ -153,7 +176,8 @@ class PrioritizedReplayRollerEpsGreedyFactory(EnvRollerFactory):
     """ Factory class for PrioritizedReplayQRoller """
 
     def __init__(self, epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size: int,
-                 frame_stack: int, priority_exponent: float, priority_weight: Schedule, priority_epsilon: float):
+                 frame_stack: int, priority_exponent: float, priority_weight: Schedule, priority_epsilon: float,
+                 forward_steps: int=1):
         self.epsilon_schedule = epsilon_schedule
         self.buffer_capacity = buffer_capacity
         self.buffer_initial_size = buffer_initial_size
@@ -161,6 +185,7 @@ class PrioritizedReplayRollerEpsGreedyFactory(EnvRollerFactory):
         self.priority_exponent = priority_exponent
         self.priority_weight = priority_weight
         self.priority_epsilon = priority_epsilon
+        self.forward_steps = forward_steps
 
     def instantiate(self, environment, device, settings):
         return PrioritizedReplayRollerEpsGreedy(
@@ -173,12 +198,14 @@ class PrioritizedReplayRollerEpsGreedyFactory(EnvRollerFactory):
             frame_stack=self.frame_stack,
             priority_exponent=self.priority_exponent,
             priority_weight=self.priority_weight,
-            priority_epsilon=self.priority_epsilon
+            priority_epsilon=self.priority_epsilon,
+            discount_factor=settings.discount_factor,
+            forward_steps=self.forward_steps
         )
 
 
 def create(epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size: int, frame_stack: int,
-           priority_exponent: float, priority_weight: Schedule, priority_epsilon: float):
+           priority_exponent: float, priority_weight: Schedule, priority_epsilon: float, forward_steps: int=1):
     return PrioritizedReplayRollerEpsGreedyFactory(
         epsilon_schedule=epsilon_schedule,
         buffer_capacity=buffer_capacity,
@@ -186,5 +213,6 @@ def create(epsilon_schedule: Schedule, buffer_capacity: int, buffer_initial_size
         frame_stack=frame_stack,
         priority_exponent=priority_exponent,
         priority_weight=priority_weight,
-        priority_epsilon=priority_epsilon
+        priority_epsilon=priority_epsilon,
+        forward_steps=forward_steps
     )
@@ -3,6 +3,7 @@ import numpy as np
 
 from vel.openai.baselines.common.vec_env import VecEnv
 from vel.rl.api import Rollout, Trajectories
+from vel.rl.api.profiling import timed
 from vel.rl.api.base import ReplayEnvRollerBase, EnvRollerFactory
 from vel.rl.buffers.deque_multi_env_buffer_backend import DequeMultiEnvBufferBackend
 
@@ -61,7 +62,9 @@ class ReplayQEnvRoller(ReplayEnvRollerBase):
         episode_information = []  # Python objects
 
         for step_idx in range(self.number_of_steps):
-            step = model.step(self.last_observation)
+            with timed(batch_info, 'time/policy'):
+                step = model.step(self.last_observation)
+
             actions = step['actions']
 
             observation_accumulator.append(self.last_observation)
@@ -70,27 +73,34 @@ class ReplayQEnvRoller(ReplayEnvRollerBase):
             logprobs = step['logprobs']
             logprob_accumulator.append(logprobs)
 
-            actions_numpy = actions.detach().cpu().numpy()
-            new_obs, new_rewards, new_dones, new_infos = self.environment.step(actions_numpy)
+            with timed(batch_info, 'time/transfer'):
+                actions_numpy = actions.detach().cpu().numpy()
+                logprobs_numpy = logprobs.detach().cpu().numpy()
+
+            with timed(batch_info, 'time/env_step'):
+                new_obs, new_rewards, new_dones, new_infos = self.environment.step(actions_numpy)
 
             # Store rollout in the experience replay buffer
-            self.replay_buffer.store_transition(
-                frame=self.last_observation_cpu,
-                action=actions_numpy,
-                reward=new_rewards,
-                done=new_dones,
-                extra_info={
-                    'action_logits': logprobs.detach().cpu().numpy(),
-                }
-            )
+            with timed(batch_info, 'time/buffer_insert'):
+                self.replay_buffer.store_transition(
+                    frame=self.last_observation_cpu,
+                    action=actions_numpy,
+                    reward=new_rewards,
+                    done=new_dones,
+                    extra_info={
+                        'action_logits': logprobs_numpy,
+                    }
+                )
 
             # Done is flagged true when the episode has ended AND the frame we see is already a first frame from the
             # Next episode
             self.last_observation_cpu = new_obs[:]
-            self.last_observation = self._to_tensor(self.last_observation_cpu)
 
-            done_accumulator.append(self._to_tensor(new_dones.astype(np.float32)))
-            reward_accumulator.append(self._to_tensor(new_rewards.astype(np.float32)))
+            with timed(batch_info, 'time/transfer'):
+                self.last_observation = self._to_tensor(self.last_observation_cpu)
+
+                done_accumulator.append(self._to_tensor(new_dones.astype(np.float32)))
+                reward_accumulator.append(self._to_tensor(new_rewards.astype(np.float32)))
 
             episode_information.append(new_infos)
 
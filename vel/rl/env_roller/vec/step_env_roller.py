@@ -3,6 +3,7 @@ import numpy as np
 
 from vel.rl.api.base import EnvRollerBase, EnvRollerFactory
 from vel.rl.api import Trajectories
+from vel.rl.api.profiling import timed
 
 
 class StepEnvRoller(EnvRollerBase):
@@ -55,11 +56,12 @@ class StepEnvRoller(EnvRollerBase):
         initial_hidden_state = self.hidden_state
 
         for step_idx in range(self.number_of_steps):
-            if model.is_recurrent:
-                step = model.step(self.last_observation, state=self.hidden_state)
-                self.hidden_state = step['state']
-            else:
-                step = model.step(self.last_observation)
+            with timed(batch_info, 'time/policy'):
+                if model.is_recurrent:
+                    step = model.step(self.last_observation, state=self.hidden_state)
+                    self.hidden_state = step['state']
+                else:
+                    step = model.step(self.last_observation)
 
             actions, values, logprobs = step['actions'], step['values'], step['logprobs']
 
@@ -68,22 +70,27 @@ class StepEnvRoller(EnvRollerBase):
             value_accumulator.append(values)
             logprobs_accumulator.append(logprobs)
 
-            actions_numpy = actions.detach().cpu().numpy()
-            new_obs, new_rewards, new_dones, new_infos = self.environment.step(actions_numpy)
+            with timed(batch_info, 'time/transfer'):
+                actions_numpy = actions.detach().cpu().numpy()
+
+            with timed(batch_info, 'time/env_step'):
+                new_obs, new_rewards, new_dones, new_infos = self.environment.step(actions_numpy)
 
             # Done is flagged true when the episode has ended AND the frame we see is already a first frame from the
             # next episode
 
-            dones_tensor = self._to_tensor(new_dones.astype(np.float32))
-            dones_accumulator.append(dones_tensor)
+            with timed(batch_info, 'time/transfer'):
+                dones_tensor = self._to_tensor(new_dones.astype(np.float32))
+                self.last_observation = self._to_tensor(new_obs[:])
+                rewards_tensor = self._to_tensor(new_rewards.astype(np.float32))
 
-            self.last_observation = self._to_tensor(new_obs[:])
+            dones_accumulator.append(dones_tensor)
 
             if model.is_recurrent:
                 # Zero out state in environments that have finished
                 self.hidden_state = self.hidden_state * (1.0 - dones_tensor.unsqueeze(-1))
 
-            rewards_accumulator.append(self._to_tensor(new_rewards.astype(np.float32)))
+            rewards_accumulator.append(rewards_tensor)
 
             episode_information.append(new_infos)
 
@@ -1,5 +1,3 @@
-import collections
-
 import numpy as np
 import torch
 
@@ -30,73 +28,192 @@ class FPSMetric(ValueMetric):
         return fps
 
 
-class EpisodeRewardMetric(BaseMetric):
+class TimingMetric(BaseMetric):
+    """ Total time in seconds spent in a named section of the training loop during the epoch """
     def __init__(self, name):
         super().__init__(name)
-        self.buffer = collections.deque(maxlen=100)
+        self.buffer = 0.0
+
+    def calculate(self, batch_info):
+        """ Calculate value of a metric based on supplied data """
+        self.buffer += batch_info.get(self.name, 0.0)
+
+    def reset(self):
+        """ Reset value of a metric """
+        self.buffer = 0.0
+
+    def value(self):
+        """ Return current value for the metric """
+        return self.buffer
+
+
+class EpisodeStatistics:
+    """
+    Statistics of the most recently finished episodes - reward 'r', length 'l' and time 't' - kept in preallocated
+    numpy ring arrays shared by all the episode metrics.
+
+    Alongside each ring array a sorted copy of the window is maintained in place, so that quantiles are read off
+    directly in O(1). Adding an episode takes a binary search and shifting at most 'window' elements within the
+    preallocated sorted array, which is O(window) but allocates nothing. Means and quantiles are calculated at most
+    once per batch.
+    """
+    FIELDS = ('r', 'l', 't')
+
+    def __init__(self, window=100):
+        self.window = window
+        self.size = 0
+        self.position = 0
+
+        self.values = {field: np.zeros(window, dtype=np.float64) for field in self.FIELDS}
+        self.sorted_values = {field: np.zeros(window, dtype=np.float64) for field in self.FIELDS}
+
+        self.last_batch = None
+        self.cache = {}
+
+    def update(self, batch_info):
+        """ Add episodes finished in the batch, each batch is accounted for only once """
+        batch_key = (batch_info.epoch_info.global_epoch_idx, batch_info.batch_number)
+
+        if batch_key != self.last_batch:
+            self.last_batch = batch_key
+            self.extend(batch_info['episode_infos'])
+
+    def extend(self, episode_infos):
+        """ Add statistics of finished episodes """
+        if not episode_infos:
+            return
+
+        for episode_info in episode_infos:
+            for field in self.FIELDS:
+                value = float(episode_info.get(field, np.nan))
+                ring = self.values[field]
+                sorted_values = self.sorted_values[field]
+                size = self.size
+
+                if size == self.window:
+                    # Remove the value leaving the window, shifting the tail of the sorted values left
+                    idx = np.searchsorted(sorted_values[:size], ring[self.position])
+                    sorted_values[idx:size - 1] = sorted_values[idx + 1:size]
+                    size -= 1
+
+                # Insert the new value, shifting the tail of the sorted values right
+                idx = np.searchsorted(sorted_values[:size], value)
+                sorted_values[idx + 1:size + 1] = sorted_values[idx:size]
+                sorted_values[idx] = value
+
+                ring[self.position] = value
+
+            self.position = (self.position + 1) % self.window
+            self.size = min(self.size + 1, self.window)
+
+        self.cache.clear()
+
+    def mean(self, field):
+        """ Mean of the field over the window """
+        key = (field, None)
+
+        if key not in self.cache:
+            self.cache[key] = float(np.mean(self.values[field][:self.size]))
+
+        return self.cache[key]
+
+    def quantile(self, field, quantile):
+        """ Quantile of the field over the window, linearly interpolated like np.quantile """
+        key = (field, quantile)
+
+        if key not in self.cache:
+            sorted_values = self.sorted_values[field]
+
+            position = quantile * (self.size - 1)
+            lower = int(np.floor(position))
+            upper = min(lower + 1, self.size - 1)
+
+            self.cache[key] = float(
+                sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+            )
+
+        return self.cache[key]
+
+
+class EpisodeRewardMetric(BaseMetric):
+    def __init__(self, name, statistics: EpisodeStatistics=None):
+        super().__init__(name)
+        self.statistics = statistics if statistics is not None else EpisodeStatistics()
 
     def calculate(self, batch_info):
         """ Calculate value of a metric based on supplied data """
-        self.buffer.extend(batch_info['episode_infos'])
+        self.statistics.update(batch_info)
 
     def reset(self):
         """ Reset value of a metric """
-        # Because it's a queue no need for reset..
+        # Because it's a rolling window no need for reset..
         pass
 
     def value(self):
         """ Return current value for the metric """
-        if self.buffer:
-            return np.mean([ep['r'] for ep in self.buffer])
+        if self.statistics.size:
+            return self.statistics.mean('r')
         else:
             return 0.0
 
 
 class EpisodeRewardMetricQuantile(BaseMetric):
-    def __init__(self, name, quantile, buf_size=100):
+    def __init__(self, name, quantile, buf_size=100, statistics: EpisodeStatistics=None):
         super().__init__(name)
-        self.buffer = collections.deque(maxlen=buf_size)
+        self.statistics = statistics if statistics is not None else EpisodeStatistics(window=buf_size)
         self.quantile = quantile
 
     def calculate(self, batch_info):
         """ Calculate value of a metric based on supplied data """
-        self.buffer.extend(ep['r'] for ep in batch_info['episode_infos'])
+        self.statistics.update(batch_info)
 
     def reset(self):
         """ Reset value of a metric """
-        # Because it's a queue no need for reset..
+        # Because it's a rolling window no need for reset..
         pass
 
     def value(self):
         """ Return current value for the metric """
-        if self.buffer:
-            return np.quantile(self.buffer, self.quantile)
+        if self.statistics.size:
+            return self.statistics.quantile('r', self.quantile)
         else:
             return 0.0
 
 
 class EpisodeLengthMetric(BaseMetric):
-    def __init__(self, name):
+    def __init__(self, name, statistics: EpisodeStatistics=None):
         super().__init__(name)
-        self.buffer = collections.deque(maxlen=100)
+        self.statistics = statistics if statistics is not None else EpisodeStatistics()
 
     def calculate(self, batch_info):
         """ Calculate value of a metric based on supplied data """
-        self.buffer.extend(batch_info['episode_infos'])
+        self.statistics.update(batch_info)
 
     def reset(self):
         """ Reset value of a metric """
-        # Because it's a queue no need for reset..
+        # Because it's a rolling window no need for reset..
         pass
 
     def value(self):
         """ Return current value for the metric """
-        if self.buffer:
-            return np.mean([ep['l'] for ep in self.buffer])
+        if self.statistics.size:
+            return self.statistics.mean('l')
         else:
             return 0
 
 
+def episode_metrics(window=100) -> list:
+    """ Standard episode reward and length metrics of a reinforcer, all reading from a single accumulator """
+    statistics = EpisodeStatistics(window=window)
+
+    return [
+        EpisodeRewardMetric('PMM:episode_rewards', statistics=statistics),
+        EpisodeRewardMetricQuantile('P09:episode_rewards', quantile=0.9, statistics=statistics),
+        EpisodeRewardMetricQuantile('P01:episode_rewards', quantile=0.1, statistics=statistics),
+        EpisodeLengthMetric("episode_length", statistics=statistics),
+    ]
+
+
 class ExplainedVariance(AveragingMetric):
     """ How much value do rewards explain """
     def __init__(self):
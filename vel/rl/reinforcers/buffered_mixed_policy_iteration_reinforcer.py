@@ -9,10 +9,8 @@ from vel.api.base import Model, ModelFactory
 from vel.openai.baselines.common.vec_env import VecEnv
 from vel.rl.api.base import ReinforcerBase, ReinforcerFactory, VecEnvFactory, ReplayEnvRollerBase, AlgoBase
 from vel.rl.api.base.env_roller import ReplayEnvRollerFactory
-from vel.rl.metrics import (
-    FPSMetric, EpisodeLengthMetric, EpisodeRewardMetricQuantile,
-    EpisodeRewardMetric, FramesMetric
-)
+from vel.rl.api.profiling import timed
+from vel.rl.metrics import FPSMetric, FramesMetric, episode_metrics
 
 
 @attr.s(auto_attribs=True)
@@ -49,10 +47,7 @@ class BufferedMixedPolicyIterationReinforcer(ReinforcerBase):
         my_metrics = [
             FramesMetric("frames"),
             FPSMetric("fps"),
-            EpisodeRewardMetric('PMM:episode_rewards'),
-            EpisodeRewardMetricQuantile('P09:episode_rewards', quantile=0.9),
-            EpisodeRewardMetricQuantile('P01:episode_rewards', quantile=0.1),
-            EpisodeLengthMetric("episode_length")
+            *episode_metrics(),
         ]
 
         return my_metrics + self.algo.metrics() + self.env_roller.metrics()
@@ -67,6 +62,10 @@ class BufferedMixedPolicyIterationReinforcer(ReinforcerBase):
         self.model.reset_weights()
         self.algo.initialize(self.settings, model=self.model, environment=self.environment, device=self.device)
 
+    def finalize_training(self, training_info):
+        """ Release resources once training is finished """
+        self.algo.finalize()
+
     def train_epoch(self, epoch_info: EpochInfo, interactive=True):
         """ Train model on an epoch of a fixed number of batch updates """
         epoch_info.on_epoch_begin()
@@ -112,12 +111,13 @@ class BufferedMixedPolicyIterationReinforcer(ReinforcerBase):
 
         self.model.train()
 
-        batch_result = self.algo.optimizer_step(
-            batch_info=batch_info,
-            device=self.device,
-            model=self.model,
-            rollout=rollout
-        )
+        with timed(batch_info, 'time/optimizer'):
+            batch_result = self.algo.optimizer_step(
+                batch_info=batch_info,
+                device=self.device,
+                model=self.model,
+                rollout=rollout
+            )
 
         batch_info['sub_batch_data'].append(batch_result)
         batch_info['frames'] = rollout.frames()
@@ -127,16 +127,18 @@ class BufferedMixedPolicyIterationReinforcer(ReinforcerBase):
         """ Perform an 'off-policy' training step of sampling the replay buffer and gradient descent """
         self.model.eval()
 
-        rollout = self.env_roller.sample(batch_info, self.model)
+        with timed(batch_info, 'time/buffer_sample'):
+            rollout = self.env_roller.sample(batch_info, self.model)
 
         self.model.train()
 
-        batch_result = self.algo.optimizer_step(
-            batch_info=batch_info,
-            device=self.device,
-            model=self.model,
-            rollout=rollout
-        )
+        with timed(batch_info, 'time/optimizer'):
+            batch_result = self.algo.optimizer_step(
+                batch_info=batch_info,
+                device=self.device,
+                model=self.model,
+                rollout=rollout
+            )
 
         batch_info['sub_batch_data'].append(batch_result)
 
@@ -9,9 +9,8 @@ from vel.api import BatchInfo, EpochInfo
 from vel.api.base import Model, ModelFactory
 from vel.rl.api.base import ReinforcerBase, ReinforcerFactory, EnvFactory, ReplayEnvRollerBase, AlgoBase
 from vel.rl.api.base.env_roller import ReplayEnvRollerFactory
-from vel.rl.metrics import (
-    FPSMetric, EpisodeLengthMetric, EpisodeRewardMetricQuantile, EpisodeRewardMetric, FramesMetric,
-)
+from vel.rl.api.profiling import timed
+from vel.rl.metrics import FPSMetric, FramesMetric, episode_metrics
 
 
 @attr.s(auto_attribs=True)
@@ -45,10 +44,7 @@ class BufferedSingleOffPolicyIterationReinforcer(ReinforcerBase):
         my_metrics = [
             FramesMetric("frames"),
             FPSMetric("fps"),
-            EpisodeRewardMetric('PMM:episode_rewards'),
-            EpisodeRewardMetricQuantile('P09:episode_rewards', quantile=0.9),
-            EpisodeRewardMetricQuantile('P01:episode_rewards', quantile=0.1),
-            EpisodeLengthMetric("episode_length")
+            *episode_metrics(),
         ]
 
         return my_metrics + self.algo.metrics() + self.env_roller.metrics()
@@ -62,6 +58,10 @@ class BufferedSingleOffPolicyIterationReinforcer(ReinforcerBase):
         self.model.reset_weights()
         self.algo.initialize(self.settings, model=self.model, environment=self.environment, device=self.device)
 
+    def finalize_training(self, training_info):
+        """ Release resources once training is finished """
+        self.algo.finalize()
+
     def train_epoch(self, epoch_info: EpochInfo, interactive=True) -> None:
         """ Train model for a single epoch  """
         epoch_info.on_epoch_begin()
@@ -122,14 +122,16 @@ class BufferedSingleOffPolicyIterationReinforcer(ReinforcerBase):
         batch_info['sub_batch_data'] = []
 
         for i in range(self.settings.batch_training_rounds):
-            sampled_rollout = self.env_roller.sample(batch_info, self.model)
-
-            batch_result = self.algo.optimizer_step(
-                batch_info=batch_info,
-                device=self.device,
-                model=self.model,
-                rollout=sampled_rollout
-            )
+            with timed(batch_info, 'time/buffer_sample'):
+                sampled_rollout = self.env_roller.sample(batch_info, self.model)
+
+            with timed(batch_info, 'time/optimizer'):
+                batch_result = self.algo.optimizer_step(
+                    batch_info=batch_info,
+                    device=self.device,
+                    model=self.model,
+                    rollout=sampled_rollout
+                )
 
             self.env_roller.update(rollout=sampled_rollout, batch_info=batch_result)
 
@@ -7,10 +7,8 @@ import tqdm
 from vel.api.base import Model, ModelFactory
 from vel.api.info import EpochInfo, BatchInfo
 from vel.rl.api.base import ReinforcerBase, ReinforcerFactory, VecEnvFactory, EnvRollerFactory, EnvRollerBase, AlgoBase
-from vel.rl.metrics import (
-    FPSMetric, EpisodeLengthMetric, EpisodeRewardMetricQuantile,
-    EpisodeRewardMetric, FramesMetric
-)
+from vel.rl.api.profiling import timed
+from vel.rl.metrics import FPSMetric, FramesMetric, episode_metrics
 
 
 @attr.s(auto_attribs=True)
@@ -48,10 +46,7 @@ class OnPolicyIterationReinforcer(ReinforcerBase):
         my_metrics = [
             FramesMetric("frames"),
             FPSMetric("fps"),
-            EpisodeRewardMetric('PMM:episode_rewards'),
-            EpisodeRewardMetricQuantile('P09:episode_rewards', quantile=0.9),
-            EpisodeRewardMetricQuantile('P01:episode_rewards', quantile=0.1),
-            EpisodeLengthMetric("episode_length"),
+            *episode_metrics(),
         ]
 
         return my_metrics + self.algo.metrics() + self.env_roller.metrics()
@@ -68,6 +63,10 @@ class OnPolicyIterationReinforcer(ReinforcerBase):
             self.settings, model=self.model, environment=self.env_roller.environment, device=self.device
         )
 
+    def finalize_training(self, training_info):
+        """ Release resources once training is finished """
+        self.algo.finalize()
+
     def train_epoch(self, epoch_info: EpochInfo, interactive=True) -> None:
         """ Train model on an epoch of a fixed number of batch updates """
         epoch_info.on_epoch_begin()
@@ -120,24 +119,26 @@ class OnPolicyIterationReinforcer(ReinforcerBase):
         for i in range(experience_replay_count):
             # We may potentially need to split rollout into multiple batches
             if self.settings.batch_size >= rollout.frames():
-                batch_result = self.algo.optimizer_step(
-                    batch_info=batch_info,
-                    device=self.device,
-                    model=self.model,
-                    rollout=rollout
-                )
-
-                batch_info['sub_batch_data'].append(batch_result)
-            else:
-                # Rollout too big, need to split in batches
-                for batch_rollout in rollout.shuffled_batches(self.settings.batch_size):
+                with timed(batch_info, 'time/optimizer'):
                     batch_result = self.algo.optimizer_step(
                         batch_info=batch_info,
                         device=self.device,
                         model=self.model,
-                        rollout=batch_rollout
+                        rollout=rollout
                     )
 
+                batch_info['sub_batch_data'].append(batch_result)
+            else:
+                # Rollout too big, need to split in batches
+                for batch_rollout in rollout.shuffled_batches(self.settings.batch_size):
+                    with timed(batch_info, 'time/optimizer'):
+                        batch_result = self.algo.optimizer_step(
+                            batch_info=batch_info,
+                            device=self.device,
+                            model=self.model,
+                            rollout=batch_rollout
+                        )
+
                     batch_info['sub_batch_data'].append(batch_result)
 
         batch_info['frames'] = rollout.frames()
@@ -0,0 +1,98 @@
+import types
+
+import gym
+import nose.tools as t
+import numpy.testing as nt
+import torch
+
+from vel.rl.algo.dqn import DeepQLearning
+from vel.rl.api import Transitions
+from vel.rl.models.backbone.mlp import MLPFactory
+from vel.rl.models.q_model import QModelFactory
+
+
+def make_algo(model_factory, model, action_space, fused_evaluation, double_dqn=True):
+    algo = DeepQLearning(
+        model_factory=model_factory,
+        double_dqn=double_dqn,
+        target_update_frequency=100,
+        max_grad_norm=None,
+        fused_evaluation=fused_evaluation
+    )
+
+    algo.initialize(
+        types.SimpleNamespace(discount_factor=0.99), model=model,
+        environment=types.SimpleNamespace(action_space=action_space), device=torch.device('cpu')
+    )
+
+    return algo
+
+
+def test_fused_evaluation_matches_regular():
+    torch.manual_seed(0)
+
+    action_space = gym.spaces.Discrete(3)
+    model_factory = QModelFactory(backbone=MLPFactory(input_length=8, hidden_layers=[16]))
+
+    model = model_factory.instantiate(action_space=action_space)
+    model.reset_weights()
+    model.train()
+
+    batch_size = 16
+
+    rollout = Transitions(
+        size=batch_size,
+        environment_information=None,
+        transition_tensors={
+            'observations': torch.randn(batch_size, 8),
+            'observations_next': torch.randn(batch_size, 8),
+            'dones': (torch.rand(batch_size) < 0.2).float(),
+            'rewards': torch.randn(batch_size),
+            'actions': torch.randint(3, (batch_size,)),
+            'weights': torch.ones(batch_size)
+        }
+    )
+
+    results = []
+
+    for fused_evaluation in [False, True]:
+        algo = make_algo(model_factory, model, action_space, fused_evaluation)
+
+        # Make target differ from the online model, same way for both runs
+        with torch.no_grad():
+            for parameter in algo.target_model.parameters():
+                parameter.mul_(0.5)
+
+        model.zero_grad()
+        result = algo.calculate_gradient({}, torch.device('cpu'), model, rollout)
+        gradients = [p.grad.clone() for p in model.parameters()]
+
+        algo.finalize()
+
+        results.append((result, gradients))
+
+    (regular, regular_gradients), (fused, fused_gradients) = results
+
+    nt.assert_allclose(fused['loss'], regular['loss'], rtol=1e-5)
+    nt.assert_allclose(fused['errors'], regular['errors'], rtol=1e-5, atol=1e-7)
+
+    for regular_gradient, fused_gradient in zip(regular_gradients, fused_gradients):
+        nt.assert_allclose(fused_gradient.numpy(), regular_gradient.numpy(), rtol=1e-5, atol=1e-6)
+
+
+def test_executor_lifecycle():
+    action_space = gym.spaces.Discrete(3)
+    model_factory = QModelFactory(backbone=MLPFactory(input_length=8, hidden_layers=[16]))
+    model = model_factory.instantiate(action_space=action_space)
+
+    algo = make_algo(model_factory, model, action_space, fused_evaluation=True, double_dqn=False)
+    t.assert_is_none(algo._target_executor)
+
+    algo = make_algo(model_factory, model, action_space, fused_evaluation=True)
+    executor = algo._target_executor
+    t.assert_is_not_none(executor)
+
+    algo.finalize()
+
+    t.assert_is_none(algo._target_executor)
+    t.assert_true(executor._shutdown)
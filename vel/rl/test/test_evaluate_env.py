@@ -0,0 +1,93 @@
+import gym
+import nose.tools as t
+import torch
+
+from gym.envs.classic_control import CartPoleEnv
+
+from vel.openai.baselines.bench import Monitor
+from vel.rl.api.base import EnvFactory
+from vel.rl.commands.evaluate_env_command import EvaluateEnvCommand
+from vel.rl.models.backbone.mlp import MLPFactory
+from vel.rl.models.policy_gradient_model import PolicyGradientModelFactory
+from vel.rl.vecenv.dummy import DummyVecEnvWrapper
+
+
+class CartPole(gym.Env):
+    """ Classic control cart pole exposing the reset/step interface the rest of vel is written against """
+    def __init__(self, seed):
+        self.env = CartPoleEnv()
+        self.seed = seed
+        self.observation_space = self.env.observation_space
+        self.action_space = self.env.action_space
+
+    def reset(self, **kwargs):
+        observation, _ = self.env.reset(seed=self.seed)
+        self.seed = None
+        return observation
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+        return observation, reward, terminated or truncated, info
+
+
+class CartPoleFactory(EnvFactory):
+    def instantiate(self, seed=0, serial_id=1, preset='default', extra_args=None):
+        return Monitor(CartPole(seed + serial_id), None, allow_early_resets=True)
+
+
+def make_command(takes):
+    return EvaluateEnvCommand(
+        model_config=None, env_factory=CartPoleFactory(), model_factory=None, storage=None,
+        takes=takes, frame_history=1, parallel_envs=3
+    )
+
+
+def test_evaluate_vectorized():
+    torch.manual_seed(0)
+
+    vec_env = DummyVecEnvWrapper(CartPoleFactory(), frame_history=1).instantiate(parallel_envs=3, seed=0, preset='raw')
+
+    model_factory = PolicyGradientModelFactory(backbone=MLPFactory(input_length=4, hidden_layers=[16]))
+    model = model_factory.instantiate(action_space=vec_env.action_space)
+    model.reset_weights()
+    model.eval()
+
+    episodes = make_command(takes=7).evaluate_vectorized(model, vec_env, torch.device('cpu'))
+
+    vec_env.close()
+
+    t.eq_(len(episodes), 7)
+
+    for episode in episodes:
+        t.assert_greater(episode['l'], 0)
+        t.eq_(episode['r'], episode['l'])
+
+
+def test_evaluate_vectorized_skips_finished_envs():
+    torch.manual_seed(0)
+
+    vec_env = DummyVecEnvWrapper(CartPoleFactory(), frame_history=1).instantiate(parallel_envs=3, seed=0, preset='raw')
+
+    model_factory = PolicyGradientModelFactory(backbone=MLPFactory(input_length=4, hidden_layers=[16]))
+    model = model_factory.instantiate(action_space=vec_env.action_space)
+    model.reset_weights()
+    model.eval()
+
+    batch_sizes = []
+    step = model.step
+
+    def recording_step(observation, **kwargs):
+        batch_sizes.append(observation.size(0))
+        return step(observation, **kwargs)
+
+    model.step = recording_step
+
+    # First environment plays two episodes, the other ones a single one each
+    episodes = make_command(takes=4).evaluate_vectorized(model, vec_env, torch.device('cpu'))
+
+    vec_env.close()
+
+    t.eq_(len(episodes), 4)
+    t.eq_(batch_sizes[0], 3)
+    t.eq_(batch_sizes[-1], 1)
+    t.assert_true(all(a >= b for a, b in zip(batch_sizes, batch_sizes[1:])))
@@ -0,0 +1,75 @@
+import collections
+
+import nose.tools as t
+import numpy as np
+
+from vel.rl.metrics import EpisodeStatistics, episode_metrics
+
+
+class FakeEpochInfo:
+    global_epoch_idx = 1
+
+
+class FakeBatchInfo(dict):
+    def __init__(self, batch_number, episode_infos):
+        super().__init__(episode_infos=episode_infos)
+        self.epoch_info = FakeEpochInfo()
+        self.batch_number = batch_number
+
+
+def test_episode_metrics_match_deque_reference():
+    rng = np.random.RandomState(0)
+    metrics = episode_metrics(window=100)
+    reference = collections.deque(maxlen=100)
+
+    for batch_number in range(50):
+        episode_infos = [
+            {'r': float(rng.randn()), 'l': int(rng.randint(1, 1000)), 't': float(batch_number)}
+            for _ in range(rng.randint(0, 8))
+        ]
+
+        batch_info = FakeBatchInfo(batch_number, episode_infos)
+
+        for metric in metrics:
+            metric.calculate(batch_info)
+
+        reference.extend(episode_infos)
+
+        if not reference:
+            continue
+
+        rewards = [ep['r'] for ep in reference]
+        values = {metric.name: metric.value() for metric in metrics}
+
+        t.assert_almost_equal(values['PMM:episode_rewards'], np.mean(rewards))
+        t.assert_almost_equal(values['P09:episode_rewards'], np.quantile(rewards, 0.9))
+        t.assert_almost_equal(values['P01:episode_rewards'], np.quantile(rewards, 0.1))
+        t.assert_almost_equal(values['episode_length'], np.mean([ep['l'] for ep in reference]))
+
+
+def test_statistics_window():
+    statistics = EpisodeStatistics(window=3)
+
+    statistics.extend([{'r': 1.0, 'l': 1}, {'r': 5.0, 'l': 2}])
+    t.assert_equal(statistics.mean('r'), 3.0)
+    t.assert_equal(statistics.quantile('r', 0.5), 3.0)
+
+    statistics.extend([{'r': 2.0, 'l': 3}, {'r': 0.0, 'l': 4}])
+    t.assert_equal(statistics.size, 3)
+    t.assert_equal(statistics.mean('l'), 3.0)
+    t.assert_equal(statistics.quantile('r', 1.0), 5.0)
+    t.assert_equal(statistics.quantile('r', 0.0), 0.0)
+
+
+def test_sorted_window_updated_in_place():
+    rng = np.random.RandomState(1)
+    statistics = EpisodeStatistics(window=10)
+    sorted_rewards = statistics.sorted_values['r']
+
+    for _ in range(30):
+        statistics.extend([{'r': float(rng.randint(0, 5)), 'l': 1}])
+
+        t.assert_is(statistics.sorted_values['r'], sorted_rewards)
+        np.testing.assert_array_equal(
+            sorted_rewards[:statistics.size], np.sort(statistics.values['r'][:statistics.size])
+        )
@@ -19,6 +19,10 @@ class LinearBatchScaler(base.Callback):
         self.starting_lr = hidden_state_dict['linear_batch_scaler/starting_lr']
 
     def on_batch_begin(self, batch_info: BatchInfo):
+        # When gradients are accumulated, learning rate changes only once per optimizer step
+        if batch_info.batch_number % batch_info.epoch_info.accumulation_steps != 0:
+            return
+
         for starting_lr, param_group in zip(self.starting_lr, self.optimizer.param_groups):
             param_group['lr'] = starting_lr * (1.0 - batch_info['progress'])
 
@@ -1,21 +1,86 @@
-from torchvision import datasets
+import numpy as np
+
+import vel.util.distributed as distributed
 
 from vel.api.base import TrainingData
 
 from vel.augmentations.normalize import Normalize
 from vel.augmentations.to_tensor import ToTensor
 from vel.augmentations.to_array import ToArray
+from vel.sources.tensor_source import TensorSource, load_cached_arrays
+
+
+# Bump whenever load_arrays changes the format of arrays it returns
+CACHE_VERSION = 1
+
+
+def cache_key(train):
+    """ Description of arrays built by load_arrays, for invalidating the cache """
+    return {'version': CACHE_VERSION, 'dtype': 'uint8', 'layout': 'NCHW', 'train': train}
+
+
+def load_arrays(path, train):
+    """ Decode CIFAR10 dataset into a contiguous uint8 array of [N, C, H, W] shape """
+    from torchvision import datasets
+
+    dataset = datasets.CIFAR10(path, train=train, download=True)
+
+    images = dataset.data if hasattr(dataset, 'data') else (dataset.train_data if train else dataset.test_data)
+    labels = dataset.targets if hasattr(dataset, 'targets') else (dataset.train_labels if train else dataset.test_labels)
+
+    return {
+        'x': np.ascontiguousarray(np.transpose(images, (0, 3, 1, 2))),
+        'y': np.array(labels, dtype=np.int64)
+    }
+
+
+def create_in_memory(batch_size, path, normalize, augmentations):
+    """ Create a CIFAR10 source resident in memory, cached as .npy files in the data directory """
+    train_arrays = load_cached_arrays(
+        path, 'cifar10_train', lambda: load_arrays(path, train=True), key=cache_key(train=True)
+    )
+    test_arrays = load_cached_arrays(
+        path, 'cifar10_test', lambda: load_arrays(path, train=False), key=cache_key(train=False)
+    )
+
+    augmentations = list(augmentations) if augmentations is not None else []
 
+    if normalize:
+        train_data = train_arrays['x']
+        mean_value = (train_data / 255).mean(axis=(0, 2, 3))
+        std_value = (train_data / 255).std(axis=(0, 2, 3))
 
-def create(batch_size, model_config, normalize=True, num_workers=0, augmentations=None):
+        augmentations.append(Normalize(mean=mean_value, std=std_value, tags=['train', 'val']))
+
+    return TensorSource(
+        train_arrays['x'], train_arrays['y'],
+        test_arrays['x'], test_arrays['y'],
+        batch_size=batch_size,
+        augmentations=augmentations
+    )
+
+
+def create(batch_size, model_config, normalize=True, num_workers=0, augmentations=None, batch_augmentations=False,
+           in_memory=False, pin_memory=False, persistent_workers=False, prefetch_factor=None, drop_last=False,
+           collate_fn=None, augment_on_device=False):
     """
     Create a CIFAR10 dataset, normalized.
     Augmentations are the same as in the literature benchmarking CIFAR performance.
+    With batch_augmentations, random augmentations and normalization run on whole collated batches.
+    With augment_on_device as well, batches are augmented after being moved to the model device.
+    With in_memory, the whole dataset is kept as a single uint8 tensor and batches are sliced out of it directly.
     """
     path = model_config.data_dir('cifar10')
 
-    train_dataset = datasets.CIFAR10(path, train=True, download=True)
-    test_dataset = datasets.CIFAR10(path, train=False, download=True)
+    if in_memory:
+        return create_in_memory(batch_size, path, normalize, augmentations)
+
+    # Torchvision takes seconds to import, in-memory sources only need it to fill their cache
+    from torchvision import datasets
+
+    with distributed.main_process_first():
+        train_dataset = datasets.CIFAR10(path, train=True, download=True)
+        test_dataset = datasets.CIFAR10(path, train=False, download=True)
 
     augmentations = [ToArray()] + (augmentations if augmentations is not None else [])
     
@@ -33,5 +98,12 @@ def create(batch_size, model_config, normalize=True, num_workers=0, augmentation
         test_dataset,
         batch_size=batch_size,
         num_workers=num_workers,
-        augmentations=augmentations
+        augmentations=augmentations,
+        batch_augmentations=batch_augmentations,
+        pin_memory=pin_memory,
+        persistent_workers=persistent_workers,
+        prefetch_factor=prefetch_factor,
+        drop_last=drop_last,
+        collate_fn=collate_fn,
+        augmentation_device=model_config.device if augment_on_device else None
     )
@@ -1,15 +1,76 @@
-from torchvision import datasets, transforms
+import numpy as np
 
+import vel.util.distributed as distributed
 
 from vel.api.base import TrainingData
+from vel.augmentations.normalize import Normalize
+from vel.sources.tensor_source import TensorSource, load_cached_arrays
 
 
-def create(batch_size, model_config, normalize=True, num_workers=0):
+# Bump whenever load_arrays changes the format of arrays it returns
+CACHE_VERSION = 1
+
+
+def cache_key(train):
+    """ Description of arrays built by load_arrays, for invalidating the cache """
+    return {'version': CACHE_VERSION, 'dtype': 'uint8', 'layout': 'NCHW', 'train': train}
+
+
+def load_arrays(path, train):
+    """ Decode MNIST dataset into a contiguous uint8 array of [N, 1, H, W] shape """
+    from torchvision import datasets
+
+    dataset = datasets.MNIST(path, train=train, download=True)
+
+    images = dataset.data if hasattr(dataset, 'data') else (dataset.train_data if train else dataset.test_data)
+    labels = dataset.targets if hasattr(dataset, 'targets') else (dataset.train_labels if train else dataset.test_labels)
+
+    return {
+        'x': np.ascontiguousarray(np.asarray(images, dtype=np.uint8)[:, None]),
+        'y': np.asarray(labels, dtype=np.int64)
+    }
+
+
+def create_in_memory(batch_size, path, normalize):
+    """ Create a MNIST source resident in memory, cached as .npy files in the data directory """
+    train_arrays = load_cached_arrays(
+        path, 'mnist_train', lambda: load_arrays(path, train=True), key=cache_key(train=True)
+    )
+    test_arrays = load_cached_arrays(
+        path, 'mnist_test', lambda: load_arrays(path, train=False), key=cache_key(train=False)
+    )
+
+    augmentations = []
+
+    if normalize:
+        train_data = train_arrays['x']
+        mean_value = (train_data / 255).mean()
+        std_value = (train_data / 255).std()
+
+        augmentations.append(Normalize(mean=[mean_value], std=[std_value], tags=['train', 'val']))
+
+    return TensorSource(
+        train_arrays['x'], train_arrays['y'],
+        test_arrays['x'], test_arrays['y'],
+        batch_size=batch_size,
+        augmentations=augmentations
+    )
+
+
+def create(batch_size, model_config, normalize=True, num_workers=0, in_memory=False, pin_memory=False,
+           persistent_workers=False, prefetch_factor=None, drop_last=False, collate_fn=None):
     """ Create a MNIST dataset, normalized """
     path = model_config.data_dir('mnist')
 
-    train_dataset = datasets.MNIST(path, train=True, download=True)
-    test_dataset = datasets.MNIST(path, train=False, download=True)
+    if in_memory:
+        return create_in_memory(batch_size, path, normalize)
+
+    # Torchvision takes seconds to import, in-memory sources only need it to fill their cache
+    from torchvision import datasets, transforms
+
+    with distributed.main_process_first():
+        train_dataset = datasets.MNIST(path, train=True, download=True)
+        test_dataset = datasets.MNIST(path, train=False, download=True)
 
     if normalize:
         train_data = train_dataset.train_data
@@ -30,5 +91,10 @@ def create(batch_size, model_config, normalize=True, num_workers=0):
         train_dataset,
         test_dataset,
         num_workers=num_workers,
-        batch_size=batch_size
+        batch_size=batch_size,
+        pin_memory=pin_memory,
+        persistent_workers=persistent_workers,
+        prefetch_factor=prefetch_factor,
+        drop_last=drop_last,
+        collate_fn=collate_fn
     )
@@ -1,16 +1,167 @@
+import json
+import numpy as np
 import os.path
+import pathlib
 
+import torch.utils.data as data
 import torchvision.datasets as ds
 
+import vel.util.distributed as distributed
+
 from vel.api.base import TrainingData
+from vel.augmentations.scale_min_size import ScaleMinSize
+from vel.augmentations.to_array import ToArray
 
 
 class ImageDirSource(ds.ImageFolder):
     pass
 
 
-def create(model_config, path, num_workers, batch_size, augmentations=None, tta=None):
-    """ Create an ImageDirSource with supplied arguments """
+def cacheable_prefix(augmentations, tag):
+    """
+    Leading deterministic augmentations for given tag that can be applied to a decoded uint8 image once and cached.
+    ToArray is skipped over, as it is still applied to the cached image.
+    """
+    prefix = []
+
+    for t in augmentations:
+        if tag not in t.tags or isinstance(t, ToArray):
+            continue
+
+        if not t.cacheable or t.mode != 'x':
+            break
+
+        prefix.append(t)
+
+    return prefix
+
+
+def augmentation_key(augmentation):
+    """ Description of augmentation parameters, used to invalidate the cache """
+    return f"{augmentation.__class__.__name__}({sorted((k, repr(v)) for k, v in vars(augmentation).items())})"
+
+
+class CachedImageDirSource(data.Dataset):
+    """
+    Image directory with decoded images cached in a memory-mapped uint8 file.
+
+    Each image is decoded once and has the deterministic prefix of the augmentation chain applied before storing.
+    Cache is keyed on paths and modification times of the image files and rebuilt if any of these change.
+    In distributed training the cache is built by the main process only, others wait for it and load it.
+    """
+    def __init__(self, image_folder: ImageDirSource, cache_path, applied_transformations):
+        self.image_folder = image_folder
+        self.cache_path = cache_path
+        self.applied_transformations = applied_transformations
+
+        self.classes = image_folder.classes
+        self.class_to_idx = image_folder.class_to_idx
+
+        self.data_filename = cache_path + '.bin'
+        self.index_filename = cache_path + '.json'
+
+        with distributed.main_process_first():
+            self.index = self._load_index()
+
+            if self.index is None:
+                self.index = self._build_cache()
+
+        self.offsets = np.array([e['offset'] for e in self.index['entries']], dtype=np.int64)
+        self.shapes = [tuple(e['shape']) for e in self.index['entries']]
+        self.targets = [target for _, target in image_folder.samples]
+
+        # Memory map is opened lazily, separately in each data loader worker
+        self._data = None
+
+    def _expected_files(self):
+        return [[path, os.path.getmtime(path)] for path, _ in self.image_folder.samples]
+
+    def _expected_transformations(self):
+        return [augmentation_key(t) for t in self.applied_transformations]
+
+    def _load_index(self):
+        """ Return cache index if it matches current state of the image directory """
+        if not (os.path.exists(self.index_filename) and os.path.exists(self.data_filename)):
+            return None
+
+        with open(self.index_filename, 'rt') as fp:
+            index = json.load(fp)
+
+        if index['transformations'] != self._expected_transformations():
+            return None
+
+        if [[e['path'], e['mtime']] for e in index['entries']] != self._expected_files():
+            return None
+
+        return index
+
+    def _build_cache(self):
+        """ Decode all images, apply transformations and write them to the cache """
+        pathlib.Path(os.path.dirname(self.cache_path)).mkdir(parents=True, exist_ok=True)
+
+        entries = []
+        offset = 0
+
+        with open(self.data_filename + '.tmp', 'wb') as fp:
+            for path, mtime in self._expected_files():
+                image = np.asarray(self.image_folder.loader(path), dtype=np.uint8)
+
+                for t in self.applied_transformations:
+                    image = t(image)
+
+                image = np.ascontiguousarray(image, dtype=np.uint8)
+                fp.write(image.tobytes())
+
+                entries.append({'path': path, 'mtime': mtime, 'offset': offset, 'shape': list(image.shape)})
+                offset += image.nbytes
+
+        index = {'transformations': self._expected_transformations(), 'entries': entries}
+
+        with open(self.index_filename + '.tmp', 'wt') as fp:
+            json.dump(index, fp)
+
+        # Index is moved in place last, so that it is only ever valid together with the complete data file
+        os.replace(self.data_filename + '.tmp', self.data_filename)
+        os.replace(self.index_filename + '.tmp', self.index_filename)
+
+        return index
+
+    @property
+    def uncached_dataset(self):
+        """ Dataset of original images, for transformations that cannot start from the cached ones """
+        return self.image_folder
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_data'] = None
+        return state
+
+    def __getitem__(self, index):
+        if self._data is None:
+            self._data = np.memmap(self.data_filename, dtype=np.uint8, mode='r')
+
+        shape = self.shapes[index]
+        offset = self.offsets[index]
+        size = int(np.prod(shape))
+
+        image = np.array(self._data[offset:offset + size]).reshape(shape)
+
+        return image, self.targets[index]
+
+    def __len__(self):
+        return len(self.index['entries'])
+
+
+def create(model_config, path, num_workers, batch_size, augmentations=None, tta=None, pin_memory=False,
+           persistent_workers=False, prefetch_factor=None, drop_last=False, collate_fn=None, cache=False,
+           cache_min_size=None):
+    """
+    Create an ImageDirSource with supplied arguments.
+
+    With cache enabled, images are decoded once and stored together with deterministic leading augmentations
+    (such as ScaleMinSize) in a memory-mapped file in the 'cache' subdirectory. With cache_min_size, images are
+    additionally scaled down before being cached, so that their smaller side is of that size.
+    """
     if not os.path.isabs(path):
         path = model_config.project_top_dir(path)
 
@@ -20,11 +171,27 @@ def create(model_config, path, num_workers, batch_size, augmentations=None, tta=
     train_ds = ImageDirSource(train_path)
     val_ds = ImageDirSource(valid_path)
 
+    if cache:
+        augmentations = augmentations if augmentations is not None else []
+        cache_prefix = [ScaleMinSize(cache_min_size)] if cache_min_size is not None else []
+
+        train_ds = CachedImageDirSource(
+            train_ds, os.path.join(path, 'cache', 'train'), cache_prefix + cacheable_prefix(augmentations, 'train')
+        )
+        val_ds = CachedImageDirSource(
+            val_ds, os.path.join(path, 'cache', 'valid'), cache_prefix + cacheable_prefix(augmentations, 'val')
+        )
+
     return TrainingData(
         train_ds,
         val_ds,
         num_workers=num_workers,
         batch_size=batch_size,
         augmentations=augmentations,
+        pin_memory=pin_memory,
+        persistent_workers=persistent_workers,
+        prefetch_factor=prefetch_factor,
+        drop_last=drop_last,
+        collate_fn=collate_fn
         # test_time_augmentation=tta
     )
@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+
+from vel.sources.nlp.text_url import encode_text_file, load_encoded_text, shard_sequence, TextLoader
+
+
+TEXT = "Zażółć gęślą jaźń.\nThe quick brown fox jumps over the lazy dog.\n" * 10
+
+
+def encode(text, chunk_size):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        text_path = os.path.join(temp_dir, 'text.txt')
+
+        with open(text_path, 'wt') as fp:
+            fp.write(text)
+
+        encode_text_file(
+            text_path, os.path.join(temp_dir, 'encoded.bin'), os.path.join(temp_dir, 'alphabet.json'),
+            chunk_size=chunk_size
+        )
+
+        data_dict = load_encoded_text(os.path.join(temp_dir, 'encoded.bin'), os.path.join(temp_dir, 'alphabet.json'))
+        data_dict['content_encoded'] = np.array(data_dict['content_encoded'])
+
+        return data_dict
+
+
+def test_encode_text_file():
+    data_dict = encode(TEXT, chunk_size=7)
+
+    expected = np.array([data_dict['character_to_index'][c] for c in TEXT])
+
+    t.assert_equal(data_dict['alphabet'], sorted(set(TEXT)))
+    t.assert_equal(data_dict['content_encoded'].dtype, np.uint8)
+    nt.assert_equal(data_dict['content_encoded'], expected)
+
+
+def test_encode_large_alphabet():
+    text = ''.join(chr(0x4e00 + i) for i in range(300)) * 2
+    data_dict = encode(text, chunk_size=128)
+
+    t.assert_equal(data_dict['content_encoded'].dtype, np.uint16)
+    t.assert_equal(''.join(data_dict['index_to_character'][i] for i in data_dict['content_encoded']), text)
+
+
+def test_text_loader():
+    sequence = np.arange(1, 101, dtype=np.uint8)
+    loader = TextLoader(sequence, sequence_length=8, batch_size=4, alphabet_size=100)
+
+    batches = list(loader)
+
+    t.assert_equal(len(batches), len(loader))
+
+    for input_data, target_data in batches:
+        t.assert_equal(tuple(input_data.shape), (4, 8))
+
+        # Target is the input shifted by one, apart from padding after the end of the sequence
+        valid = target_data > 0
+        nt.assert_equal(target_data[valid].numpy(), input_data[valid].numpy() + 1)
+
+
+def test_stateful_text_loader():
+    sequence = np.arange(1, 102, dtype=np.uint8)
+    loader = TextLoader(sequence, sequence_length=8, batch_size=4, alphabet_size=101, stateful=True)
+
+    batches = list(loader)
+
+    t.assert_equal(len(batches), len(loader))
+
+    # Each row streams its own contiguous stripe of the text
+    rows = np.concatenate([input_data.numpy() for input_data, _ in batches], axis=1)
+    targets = np.concatenate([target_data.numpy() for _, target_data in batches], axis=1)
+
+    nt.assert_equal(rows, np.arange(1, 101).reshape(4, 25))
+    nt.assert_equal(targets, rows + 1)
+
+
+def test_shard_sequence():
+    sequence = np.arange(11)
+    shards = [shard_sequence(sequence, 3, rank) for rank in range(3)]
+
+    nt.assert_equal(np.concatenate(shards), np.arange(9))
+    t.assert_equal([len(shard) for shard in shards], [3, 3, 3])
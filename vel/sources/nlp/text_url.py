@@ -1,4 +1,5 @@
 import certifi
+import json
 import numpy as np
 import os
 import pathlib
@@ -6,25 +7,119 @@ import urllib3
 
 import torch
 
+import vel.util.distributed as distributed
+
 from vel.api.base import Source
 
 
+def read_chunks(path, chunk_size):
+    """ Read a text file in chunks of at most chunk_size characters """
+    with open(path, 'rt') as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+
+            if not chunk:
+                break
+
+            yield chunk
+
+
+def code_points(chunk):
+    """ Unicode code points of all characters of a string as a numpy array """
+    return np.frombuffer(chunk.encode('utf-32-le'), dtype='<u4')
+
+
+def encode_text_file(text_path, encoded_path, alphabet_path, chunk_size=2 ** 24):
+    """
+    Encode a text file into a flat binary file of character indexes, readable as a memory map.
+
+    File is streamed twice in chunks - first to gather the alphabet, then to encode it through a lookup table.
+    Index 0 is reserved for padding, so alphabets of up to 255 characters are stored as uint8, larger ones as uint16.
+    """
+    seen = np.zeros(0x110000, dtype=bool)
+
+    for chunk in read_chunks(text_path, chunk_size):
+        seen[code_points(chunk)] = True
+
+    alphabet = [chr(c) for c in np.flatnonzero(seen)]
+
+    if len(alphabet) >= 2 ** 16:
+        raise ValueError(f"Alphabet of {len(alphabet)} characters is too large to encode")
+
+    dtype = np.uint8 if len(alphabet) < 2 ** 8 else np.uint16
+
+    alphabet_code_points = code_points(''.join(alphabet))
+    lookup_table = np.zeros(alphabet_code_points.max() + 1, dtype=dtype)
+    lookup_table[alphabet_code_points] = np.arange(1, len(alphabet) + 1)
+
+    length = 0
+
+    # Write to temporary files first so that an interrupted run never leaves a truncated cache
+    with open(encoded_path + '.tmp', 'wb') as fp:
+        for chunk in read_chunks(text_path, chunk_size):
+            encoded = lookup_table[code_points(chunk)]
+            fp.write(encoded.tobytes())
+            length += encoded.shape[0]
+
+    with open(alphabet_path + '.tmp', 'wt') as fp:
+        json.dump({'alphabet': alphabet, 'dtype': np.dtype(dtype).name, 'length': length}, fp)
+
+    # Alphabet is moved in place last, so that it is only ever valid together with the complete encoded file
+    os.replace(encoded_path + '.tmp', encoded_path)
+    os.replace(alphabet_path + '.tmp', alphabet_path)
+
+
+def load_encoded_text(encoded_path, alphabet_path):
+    """ Load alphabet and a read-only memory map of the text encoded with encode_text_file """
+    with open(alphabet_path, 'rt') as fp:
+        metadata = json.load(fp)
+
+    alphabet = metadata['alphabet']
+
+    if metadata['length'] > 0:
+        content_encoded = np.memmap(encoded_path, dtype=metadata['dtype'], mode='r', shape=(metadata['length'],))
+    else:
+        content_encoded = np.zeros(0, dtype=metadata['dtype'])
+
+    return {
+        'alphabet': alphabet,
+        'index_to_character': {idx: c for idx, c in enumerate(alphabet, 1)},
+        'character_to_index': {c: idx for idx, c in enumerate(alphabet, 1)},
+        'content_encoded': content_encoded
+    }
+
+
+def shard_sequence(sequence, num_replicas, rank):
+    """ Contiguous part of the sequence for given replica, all the replicas getting parts of the same length """
+    shard_length = len(sequence) // num_replicas
+    return sequence[rank * shard_length:(rank + 1) * shard_length]
+
+
+def take_padded(sequence, positions):
+    """ Gather elements of the sequence at given positions, positions past its end are zero-padded """
+    valid = positions < len(sequence)
+    result = sequence[np.minimum(positions, len(sequence) - 1)].astype(np.int64)
+    result[~valid] = 0
+    return result
+
+
 class TextIterator:
-    """ Iterator over a text dataset """
-    def __init__(self, padded_sequence, sequence_length, batch_size, alphabet_size, num_batches):
+    """ Iterator over a text dataset, slicing sequences directly out of the encoded text """
+    def __init__(self, sequence, initial_offset, sequence_length, batch_size, alphabet_size, num_batches):
+        self.sequence = sequence
         self.sequence_length = sequence_length
         self.batch_size = batch_size
         self.num_batches = num_batches
         self.alphabet_size = alphabet_size
 
-        self.padded_sequence = padded_sequence[:-1].reshape(self.num_batches * self.batch_size, self.sequence_length)
-        self.padded_sequence_next = padded_sequence[1:].reshape(self.num_batches * self.batch_size, self.sequence_length)
+        sequence_starts = initial_offset + np.arange(self.num_batches * self.batch_size) * self.sequence_length
 
-        self.sequence_indices = np.arange(self.num_batches * self.batch_size)
+        np.random.shuffle(sequence_starts)
 
-        np.random.shuffle(self.sequence_indices)
+        self.sequence_starts = sequence_starts.reshape(self.num_batches, self.batch_size)
 
-        self.sequence_indices = self.sequence_indices.reshape(self.num_batches, self.batch_size)
+        # 1 is for the last element as the target needs to be shifted by 1
+        self.positions = np.arange(self.sequence_length + 1)
 
         self.batch_idx = 0
 
@@ -35,42 +130,90 @@ class TextIterator:
         if self.batch_idx == self.num_batches:
             raise StopIteration
         else:
-            input_data = torch.from_numpy(self.padded_sequence[self.sequence_indices[self.batch_idx]])
-            target_data = torch.from_numpy(self.padded_sequence_next[self.sequence_indices[self.batch_idx]])
+            positions = self.sequence_starts[self.batch_idx][:, None] + self.positions
+            batch = torch.from_numpy(take_padded(self.sequence, positions))
 
             self.batch_idx += 1
 
-            return input_data.to(torch.long), target_data.to(torch.long)
+            return batch[:, :-1].contiguous(), batch[:, 1:].contiguous()
 
 
-class TextLoader:
-    """ Loader of sequential text data """
-    def __init__(self, sequence, sequence_length, batch_size, alphabet_size):
+class TextStripeIterator:
+    """
+    Iterator over a text dataset split into batch_size contiguous stripes.
+    Each row of a batch continues the same row of the previous batch.
+    """
+    def __init__(self, sequence, sequence_length, batch_size, alphabet_size, stripe_length, num_batches):
         self.sequence = sequence
         self.sequence_length = sequence_length
         self.batch_size = batch_size
+        self.num_batches = num_batches
         self.alphabet_size = alphabet_size
+        self.stripe_length = stripe_length
 
-        # 1 is for the last element as the target needs to be shifted by 1
-        residual_length = (len(self.sequence) - self.sequence_length - 1)
-        full_size = self.sequence_length * self.batch_size
+        self.stripe_starts = np.arange(self.batch_size) * self.stripe_length
 
-        rest = residual_length % full_size
-        self.num_batches = residual_length // full_size
+        self.batch_idx = 0
 
-        if rest > 0:
-            self.sequence = np.pad(self.sequence, (0, full_size - rest), mode='constant')
-            self.num_batches += 1
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.batch_idx == self.num_batches:
+            raise StopIteration
+        else:
+            start = self.batch_idx * self.sequence_length
+            # Last batch of the stripes may be shorter
+            length = min(self.sequence_length, self.stripe_length - start)
+
+            # 1 is for the last element as the target needs to be shifted by 1
+            positions = self.stripe_starts[:, None] + start + np.arange(length + 1)
+            batch = torch.from_numpy(take_padded(self.sequence, positions))
+
+            self.batch_idx += 1
+
+            return batch[:, :-1].contiguous(), batch[:, 1:].contiguous()
+
+
+class TextLoader:
+    """
+    Loader of sequential text data.
+
+    By default sequences are sampled at random. Stateful loader instead streams the text in contiguous stripes,
+    so that model state can be carried from one batch to the next (truncated backpropagation through time).
+    """
+    def __init__(self, sequence, sequence_length, batch_size, alphabet_size, stateful=False):
+        self.sequence = sequence
+        self.sequence_length = sequence_length
+        self.batch_size = batch_size
+        self.alphabet_size = alphabet_size
+        self.stateful = stateful
+
+        if self.stateful:
+            # 1 is for the last element as the target needs to be shifted by 1
+            self.stripe_length = max(0, (len(self.sequence) - 1) // self.batch_size)
+            self.num_batches = (self.stripe_length + self.sequence_length - 1) // self.sequence_length
+        else:
+            # 1 is for the last element as the target needs to be shifted by 1
+            residual_length = (len(self.sequence) - self.sequence_length - 1)
+            full_size = self.sequence_length * self.batch_size
+
+            # Last batch is padded with zeros
+            self.num_batches = max(0, (residual_length + full_size - 1) // full_size)
 
     def __iter__(self):
+        if self.stateful:
+            return TextStripeIterator(
+                self.sequence, self.sequence_length, self.batch_size,
+                alphabet_size=self.alphabet_size,
+                stripe_length=self.stripe_length,
+                num_batches=self.num_batches
+            )
+
         initial_offset = np.random.randint(self.sequence_length)
-        relevant_subsequence = self.sequence[
-           # 1 is for the last element as the target needs to be shifted by 1
-           initial_offset:self.num_batches * self.sequence_length * self.batch_size + initial_offset + 1
-        ]
 
         return TextIterator(
-            relevant_subsequence, self.sequence_length, self.batch_size,
+            self.sequence, initial_offset, self.sequence_length, self.batch_size,
             alphabet_size=self.alphabet_size,
             num_batches=self.num_batches
         )
@@ -81,8 +224,13 @@ class TextLoader:
 
 
 class TextUrlSource(Source):
-    """ Download text from source and model it character by character """
-    def __init__(self, url, absolute_data_path, sequence_length, batch_size, train_val_split=0.8):
+    """
+    Download text from source and model it character by character.
+    Encoded text is stored in a binary file and memory-mapped, so that it doesn't need to fit in memory.
+
+    In distributed training each process models a separate contiguous shard of the text.
+    """
+    def __init__(self, url, absolute_data_path, sequence_length, batch_size, train_val_split=0.8, stateful=False):
         super().__init__()
 
         self.url = url
@@ -90,9 +238,11 @@ class TextUrlSource(Source):
         self.sequence_length = sequence_length
         self.batch_size = batch_size
         self.train_val_split = train_val_split
+        self.stateful = stateful
 
         self.text_path = os.path.join(self.data_path, 'text.txt')
-        self.processed_path = os.path.join(self.data_path, 'processed.data')
+        self.encoded_path = os.path.join(self.data_path, 'encoded.bin')
+        self.alphabet_path = os.path.join(self.data_path, 'alphabet.json')
 
         self.data_dict = self.download()
 
@@ -101,20 +251,30 @@ class TextUrlSource(Source):
 
         split_idx = int(len(content_encoded) * train_val_split)
 
+        train_sequence = shard_sequence(content_encoded[:split_idx], distributed.world_size(), distributed.rank())
+        val_sequence = shard_sequence(content_encoded[split_idx:], distributed.world_size(), distributed.rank())
+
         self._train_loader = TextLoader(
-            sequence=content_encoded[:split_idx],
+            sequence=train_sequence,
             sequence_length=sequence_length,
             batch_size=batch_size,
             alphabet_size=alphabet_size,
+            stateful=stateful
         )
 
         self._val_loader = TextLoader(
-            sequence=content_encoded[split_idx:],
+            sequence=val_sequence,
             sequence_length=sequence_length,
             batch_size=batch_size,
             alphabet_size=alphabet_size,
+            stateful=stateful
         )
 
+    @property
+    def is_stateful(self) -> bool:
+        """ If consecutive batches continue the same sequences, so that model state can be carried between them """
+        return self.stateful
+
     def encode_character(self, char):
         return self.data_dict['character_to_index'][char]
 
@@ -146,7 +306,13 @@ class TextUrlSource(Source):
         return len(self._val_loader)
 
     def download(self):
-        """ Make sure data file is downloaded and stored properly """
+        """ Make sure data file is downloaded and stored properly, by the main process in distributed training """
+        with distributed.main_process_first():
+            self._download()
+
+        return load_encoded_text(self.encoded_path, self.alphabet_path)
+
+    def _download(self):
         if not os.path.exists(self.data_path):
             # Create if it doesn't exist
             pathlib.Path(self.data_path).mkdir(parents=True, exist_ok=True)
@@ -159,35 +325,12 @@ class TextUrlSource(Source):
                 content = request.data.decode('utf8')
                 fp.write(content)
 
-        if not os.path.exists(self.processed_path):
-            with open(self.text_path, 'rt') as fp:
-                content = fp.read()
-
-            alphabet = sorted(set(content))
-
-            index_to_character = {idx: c for idx, c in enumerate(alphabet, 1)}
-            character_to_index = {c: idx for idx, c in enumerate(alphabet, 1)}
-
-            content_encoded = np.array([character_to_index[c] for c in content], dtype=np.uint8)
-
-            data_dict = {
-                'alphabet': alphabet,
-                'index_to_character': index_to_character,
-                'character_to_index': character_to_index,
-                'content_encoded': content_encoded
-            }
-
-            with open(self.processed_path, 'wb') as fp:
-                torch.save(data_dict, fp)
-        else:
-            with open(self.processed_path, 'rb') as fp:
-                data_dict = torch.load(fp)
-
-        return data_dict
+        if not os.path.exists(self.alphabet_path):
+            encode_text_file(self.text_path, self.encoded_path, self.alphabet_path)
 
 
-def create(model_config, url, local_dir, sequence_length=64, batch_size=64, train_val_split=0.8):
-    """ Vel creation function """
+def create(model_config, url, local_dir, sequence_length=64, batch_size=64, train_val_split=0.8, stateful=False):
+    """ Vel creation function, stateful source streams contiguous stripes of text for truncated BPTT """
     if not os.path.isabs(local_dir):
         local_dir = model_config.project_data_dir(local_dir)
 
@@ -197,4 +340,5 @@ def create(model_config, url, local_dir, sequence_length=64, batch_size=64, trai
         sequence_length=sequence_length,
         batch_size=batch_size,
         train_val_split=train_val_split,
+        stateful=stateful
     )
@@ -0,0 +1,214 @@
+import json
+import numpy as np
+import os
+import pathlib
+
+import torch
+import torch.utils.data as data
+
+import vel.util.distributed as distributed
+
+from vel.api.base import Source
+from vel.exceptions import VelException
+
+
+def load_cached_arrays(path, name, build_fn, key=None):
+    """
+    Load a dictionary of numpy arrays from .npy files in given directory.
+    On a cache miss, build them using supplied function and store them for the next time.
+
+    Key is a JSON-serializable description of how the arrays are built, cache is rebuilt whenever it changes.
+    In distributed training the cache is built by the main process only, others wait for it and load it.
+    """
+    with distributed.main_process_first():
+        return _load_cached_arrays(path, name, build_fn, key)
+
+
+def _load_cached_arrays(path, name, build_fn, key):
+    pathlib.Path(path).mkdir(parents=True, exist_ok=True)
+
+    keys = ['x', 'y']
+    filenames = {k: os.path.join(path, f'{name}_{k}.npy') for k in keys}
+    index_filename = os.path.join(path, f'{name}.json')
+
+    if all(os.path.exists(f) for f in filenames.values()) and os.path.exists(index_filename):
+        with open(index_filename, 'rt') as fp:
+            index = json.load(fp)
+
+        if index['key'] == key:
+            return {k: np.load(f) for k, f in filenames.items()}
+
+    arrays = build_fn()
+
+    for k in keys:
+        # Write to a temporary file first so that an interrupted run never leaves a truncated cache
+        temp_filename = filenames[k] + '.tmp'
+
+        with open(temp_filename, 'wb') as fp:
+            np.save(fp, arrays[k])
+
+        os.replace(temp_filename, filenames[k])
+
+    # Index is written last, so that it is only ever valid together with complete array files
+    with open(index_filename + '.tmp', 'wt') as fp:
+        json.dump({'key': key}, fp)
+
+    os.replace(index_filename + '.tmp', index_filename)
+
+    return arrays
+
+
+class TensorDataset(data.Dataset):
+    """ Dataset of images fully resident in memory as a single uint8 tensor of [N, C, H, W] shape """
+    def __init__(self, x, y, transformations, tag):
+        self.x = torch.from_numpy(np.ascontiguousarray(x))
+        self.y = torch.from_numpy(np.ascontiguousarray(y)).to(torch.long)
+
+        if transformations is None:
+            self.transformations = []
+        else:
+            self.transformations = [t for t in transformations if tag in t.tags]
+
+        for t in self.transformations:
+            if not t.supports_batch or t.mode != 'x':
+                raise VelException(f"Augmentation {t} cannot be applied to batches of tensors")
+
+        self.tag = tag
+
+    def get_raw(self, index):
+        return self.x[index].permute(1, 2, 0).squeeze(2).numpy(), self.y[index].item()
+
+    def get_batch(self, indexes):
+        """ Return a batch of samples with all transformations applied """
+        x_batch = self.x[indexes].to(torch.float32) / 255.0
+
+        for t in self.transformations:
+            x_batch = t.batch(x_batch)
+
+        return x_batch, self.y[indexes]
+
+    def __getitem__(self, index):
+        x_batch, y_batch = self.get_batch(torch.tensor([index]))
+        return x_batch[0], y_batch[0]
+
+    def get_augmented(self, index):
+        return self[index]
+
+    def denormalize(self, datum, mode='x'):
+        if mode == 'x':
+            # Augmentations denormalize images in the [H, W, C] layout
+            datum = np.transpose(datum.numpy(), (1, 2, 0))
+
+        for t in self.transformations[::-1]:
+            if t.mode == mode:
+                datum = t.denormalize(datum)
+
+        return datum
+
+    def __len__(self):
+        return self.x.size(0)
+
+
+class TensorLoader:
+    """
+    Loader of batches sliced directly out of a TensorDataset.
+
+    With more than one replica, each one loads a separate shard of the data, same as with a DistributedSampler.
+    Shards are padded to equal size with samples from the beginning of the dataset, so that all the processes
+    run the same number of batches.
+    """
+    def __init__(self, dataset: TensorDataset, batch_size, shuffle, num_replicas=1, rank=0):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.num_replicas = num_replicas
+        self.rank = rank
+
+        self.epoch = 0
+        self.shard_size = (len(self.dataset) + self.num_replicas - 1) // self.num_replicas
+
+    def set_epoch(self, epoch_idx):
+        """ Replicas shuffle the data in the same way for each epoch, so that their shards don't overlap """
+        self.epoch = epoch_idx
+
+    def indexes(self):
+        """ Indexes of samples to load in this epoch """
+        size = len(self.dataset)
+
+        if not self.shuffle:
+            indexes = torch.arange(size)
+        elif self.num_replicas > 1:
+            generator = torch.Generator()
+            generator.manual_seed(self.epoch)
+            indexes = torch.randperm(size, generator=generator)
+        else:
+            indexes = torch.randperm(size)
+
+        if self.num_replicas > 1:
+            indexes = torch.cat([indexes, indexes[:self.shard_size * self.num_replicas - size]])
+            indexes = indexes[self.rank::self.num_replicas]
+
+        return indexes
+
+    def __iter__(self):
+        indexes = self.indexes()
+
+        for start in range(0, len(indexes), self.batch_size):
+            yield self.dataset.get_batch(indexes[start:start + self.batch_size])
+
+    def __len__(self):
+        """ Number of batches in this loader """
+        return (self.shard_size + self.batch_size - 1) // self.batch_size
+
+
+class TensorSource(Source):
+    """
+    Source of in-memory image data, batched by index slicing and augmented one batch at a time.
+
+    In distributed training each process loads a separate shard of the data.
+    """
+    def __init__(self, train_x, train_y, val_x, val_y, batch_size, augmentations=None):
+        super().__init__()
+
+        self.batch_size = batch_size
+        self.augmentations = augmentations
+
+        self.train_ds = TensorDataset(train_x, train_y, augmentations, tag='train')
+        self.val_ds = TensorDataset(val_x, val_y, augmentations, tag='val')
+
+        self._train_loader = TensorLoader(
+            self.train_ds, batch_size=batch_size, shuffle=True,
+            num_replicas=distributed.world_size(), rank=distributed.rank()
+        )
+        self._val_loader = TensorLoader(
+            self.val_ds, batch_size=batch_size, shuffle=False,
+            num_replicas=distributed.world_size(), rank=distributed.rank()
+        )
+
+    def set_epoch(self, epoch_idx):
+        """ Notify the source that a new training epoch begins """
+        self._train_loader.set_epoch(epoch_idx)
+
+    def train_loader(self):
+        """ PyTorch loader of training data """
+        return self._train_loader
+
+    def val_loader(self):
+        """ PyTorch loader of validation data """
+        return self._val_loader
+
+    def train_dataset(self):
+        """ Return the training dataset """
+        return self.train_ds
+
+    def val_dataset(self):
+        """ Return the validation dataset """
+        return self.val_ds
+
+    def train_iterations_per_epoch(self):
+        """ Return number of iterations per epoch """
+        return len(self._train_loader)
+
+    def val_iterations_per_epoch(self):
+        """ Return number of iterations per epoch - validation """
+        return len(self._val_loader)
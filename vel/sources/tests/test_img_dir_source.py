@@ -0,0 +1,117 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+import PIL.Image as Image
+
+import vel.api.data as data
+
+from vel.augmentations.center_crop import CenterCrop
+from vel.augmentations.random_horizontal_flip import RandomHorizontalFlip
+from vel.augmentations.scale_min_size import ScaleMinSize
+from vel.augmentations.to_array import ToArray
+from vel.augmentations.to_tensor import ToTensor
+from vel.sources.img_dir_source import ImageDirSource, CachedImageDirSource, cacheable_prefix
+
+
+def write_image(path, seed, size=(12, 10)):
+    rng = np.random.RandomState(seed)
+    Image.fromarray(rng.randint(0, 256, size=size + (3,)).astype(np.uint8)).save(path)
+
+
+def write_image_dir(path):
+    """ Write a small image directory with two classes """
+    for class_idx, class_name in enumerate(['cats', 'dogs']):
+        os.makedirs(os.path.join(path, class_name))
+
+        for image_idx in range(3):
+            write_image(os.path.join(path, class_name, f'{image_idx}.png'), seed=class_idx * 10 + image_idx)
+
+
+def make_cached(path, transformations):
+    return CachedImageDirSource(ImageDirSource(path), os.path.join(path, '..', 'cache', 'train'), transformations)
+
+
+def test_cacheable_prefix():
+    to_array = ToArray()
+    scale = ScaleMinSize(8)
+    crop = CenterCrop(8)
+    flip = RandomHorizontalFlip(tags=['train'])
+
+    t.assert_equal(cacheable_prefix([to_array, scale, crop, flip], 'val'), [scale, crop])
+    t.assert_equal(cacheable_prefix([to_array, scale, flip, crop], 'train'), [scale])
+
+
+def test_cached_images_match_uncached_pipeline():
+    augmentations = [ToArray(), ScaleMinSize(8), CenterCrop(8), ToTensor()]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'train')
+        write_image_dir(image_path)
+
+        uncached = data.DataFlow(ImageDirSource(image_path), augmentations, tag='val')
+        cached_source = make_cached(image_path, cacheable_prefix(augmentations, 'val'))
+        cached = data.DataFlow(cached_source, augmentations, tag='val')
+
+        # Only transformations not baked into the cache remain to be applied
+        t.assert_equal(len(cached.transformations), 2)
+        t.assert_equal(len(cached), len(uncached))
+
+        for idx in range(len(uncached)):
+            cached_x, cached_y = cached[idx]
+            uncached_x, uncached_y = uncached[idx]
+
+            t.assert_equal(cached_y, uncached_y)
+            t.assert_equal(tuple(cached_x.shape), (3, 8, 8))
+
+            # Cache stores uint8 images, so resized pixels are rounded to the nearest level and interpolation
+            # overshoot is clipped to the valid range
+            nt.assert_allclose(cached_x.numpy(), uncached_x.numpy().clip(0.0, 1.0), atol=1.0 / 255 + 1e-6)
+
+
+def test_cache_invalidated_by_file_change():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'train')
+        write_image_dir(image_path)
+
+        cached = make_cached(image_path, [])
+        image_filename = cached.image_folder.samples[0][0]
+
+        nt.assert_array_equal(cached[0][0], np.asarray(Image.open(image_filename)))
+
+        write_image(image_filename, seed=100)
+        mtime = os.path.getmtime(image_filename) + 10
+        os.utime(image_filename, (mtime, mtime))
+
+        # Unchanged files would be served from the cache, including the stale image
+        rebuilt = make_cached(image_path, [])
+
+        nt.assert_array_equal(rebuilt[0][0], np.asarray(Image.open(image_filename)))
+        t.assert_equal(rebuilt.index['entries'][0]['mtime'], mtime)
+
+
+def test_cache_invalidated_by_transformation_change():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'train')
+        write_image_dir(image_path)
+
+        t.assert_equal(make_cached(image_path, [ScaleMinSize(8)])[0][0].shape, (9, 8, 3))
+        t.assert_equal(make_cached(image_path, [ScaleMinSize(6)])[0][0].shape, (7, 6, 3))
+        t.assert_equal(make_cached(image_path, [ScaleMinSize(6), CenterCrop(6)])[0][0].shape, (6, 6, 3))
+
+
+def test_cache_reused():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, 'train')
+        write_image_dir(image_path)
+
+        first = make_cached(image_path, [ScaleMinSize(8)])
+        data_stat = os.stat(first.data_filename)
+
+        second = make_cached(image_path, [ScaleMinSize(8)])
+
+        t.assert_equal(os.stat(second.data_filename).st_mtime_ns, data_stat.st_mtime_ns)
+        t.assert_equal(os.stat(second.data_filename).st_ino, data_stat.st_ino)
+        nt.assert_array_equal(second[5][0], first[5][0])
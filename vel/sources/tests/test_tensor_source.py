@@ -0,0 +1,142 @@
+import tempfile
+
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+import torch
+
+from vel.augmentations.normalize import Normalize
+from vel.augmentations.random_horizontal_flip import RandomHorizontalFlip
+from vel.augmentations.to_array import ToArray
+from vel.exceptions import VelException
+from vel.sources.tensor_source import load_cached_arrays, TensorDataset, TensorLoader, TensorSource
+
+
+def get_arrays(count=10, seed=0):
+    rng = np.random.RandomState(seed)
+
+    return {
+        'x': rng.randint(0, 256, size=(count, 3, 4, 4)).astype(np.uint8),
+        'y': np.arange(count, dtype=np.int64)
+    }
+
+
+class CountingBuilder:
+    """ Build function recording how many times it was called """
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.arrays
+
+
+def test_cached_arrays_round_trip():
+    arrays = get_arrays()
+    builder = CountingBuilder(arrays)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        first = load_cached_arrays(temp_dir, 'test', builder)
+        second = load_cached_arrays(temp_dir, 'test', builder)
+
+    t.assert_equal(builder.calls, 1)
+
+    for result in [first, second]:
+        nt.assert_array_equal(result['x'], arrays['x'])
+        nt.assert_array_equal(result['y'], arrays['y'])
+        t.assert_equal(result['x'].dtype, np.uint8)
+
+
+def test_cached_arrays_invalidation():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        load_cached_arrays(temp_dir, 'test', CountingBuilder(get_arrays(seed=0)), key={'version': 1})
+
+        builder = CountingBuilder(get_arrays(seed=1))
+        result = load_cached_arrays(temp_dir, 'test', builder, key={'version': 2})
+
+        t.assert_equal(builder.calls, 1)
+        nt.assert_array_equal(result['x'], get_arrays(seed=1)['x'])
+
+        # Rebuilt cache is valid for the new key
+        result = load_cached_arrays(temp_dir, 'test', builder, key={'version': 2})
+
+        t.assert_equal(builder.calls, 1)
+        nt.assert_array_equal(result['x'], get_arrays(seed=1)['x'])
+
+
+def test_tensor_loaders():
+    arrays = get_arrays(count=10)
+
+    source = TensorSource(
+        arrays['x'], arrays['y'], arrays['x'], arrays['y'], batch_size=4,
+        augmentations=[Normalize(mean=[0.5] * 3, std=[0.25] * 3, tags=['train', 'val'])]
+    )
+
+    t.assert_equal(source.train_iterations_per_epoch(), 3)
+    t.assert_equal(source.val_iterations_per_epoch(), 3)
+
+    val_batches = list(source.val_loader())
+
+    t.assert_equal([x.shape[0] for x, _ in val_batches], [4, 4, 2])
+
+    x_batch, y_batch = val_batches[0]
+
+    t.assert_equal(x_batch.dtype, torch.float32)
+    nt.assert_array_equal(y_batch.numpy(), arrays['y'][:4])
+    nt.assert_allclose(x_batch.numpy(), (arrays['x'][:4] / 255.0 - 0.5) / 0.25, rtol=1e-5, atol=1e-6)
+
+    # Training loader shuffles, but goes through every sample exactly once
+    train_labels = torch.cat([y for _, y in source.train_loader()]).numpy()
+    nt.assert_array_equal(np.sort(train_labels), arrays['y'])
+
+
+def test_tensor_dataset_tags():
+    arrays = get_arrays(count=2)
+    dataset = TensorDataset(arrays['x'], arrays['y'], [RandomHorizontalFlip(p=1.0, tags=['train'])], tag='val')
+
+    x, y = dataset[1]
+
+    nt.assert_allclose(x.numpy(), arrays['x'][1] / 255.0, rtol=1e-6)
+    t.assert_equal(y.item(), 1)
+
+
+@t.raises(VelException)
+def test_tensor_dataset_rejects_sample_augmentations():
+    arrays = get_arrays(count=2)
+    TensorDataset(arrays['x'], arrays['y'], [ToArray()], tag='train')
+
+
+def test_tensor_loader_shards():
+    arrays = get_arrays(count=10)
+    dataset = TensorDataset(arrays['x'], arrays['y'], [], tag='train')
+
+    loaders = [TensorLoader(dataset, batch_size=3, shuffle=True, num_replicas=3, rank=rank) for rank in range(3)]
+
+    for epoch_idx in range(2):
+        for loader in loaders:
+            loader.set_epoch(epoch_idx)
+
+        shards = [torch.cat([y for _, y in loader]).numpy() for loader in loaders]
+
+        # Shards are padded to equal size and together cover the whole dataset
+        t.assert_equal([len(shard) for shard in shards], [4, 4, 4])
+        t.assert_equal([len(loader) for loader in loaders], [2, 2, 2])
+        nt.assert_array_equal(np.unique(np.concatenate(shards)), arrays['y'])
+
+
+def test_classic_cache_keys():
+    import vel.sources.classic.cifar10 as cifar10
+    import vel.sources.classic.mnist as mnist
+
+    for module in [cifar10, mnist]:
+        builder = CountingBuilder(get_arrays())
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for train in [True, False, True]:
+                load_cached_arrays(temp_dir, 'test', builder, key=module.cache_key(train=train))
+
+            # Key survives storage in the index, changing only with the dataset part
+            load_cached_arrays(temp_dir, 'test', builder, key=module.cache_key(train=True))
+
+        t.assert_equal(builder.calls, 3)
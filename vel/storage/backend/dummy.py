@@ -1,6 +1,3 @@
-import pandas as pd
-
-
 class DummyBackend:
     """ Storage backend to store all experiment data in /dev/null """
 
@@ -13,6 +10,7 @@ class DummyBackend:
 
     def get_frame(self):
         """ Get a dataframe of metrics from this storage """
+        import pandas as pd
         return pd.DataFrame()
 
     def store(self, metrics):
@@ -1,17 +1,81 @@
-import pymongo
-import pandas as pd
+import atexit
+import threading
 
 
 class MongoDbBackend:
-    """ Storage backend to store all experiment results in a MongoDB database """
+    """
+    Storage backend to store all experiment results in a MongoDB database
+
+    In buffered mode metrics are queued in memory and inserted in batches by a background thread,
+    once flush_size rows accumulate or every flush_interval seconds.
+    """
+
+    def __init__(self, model_config, uri, database, buffered=False, flush_size=100, flush_interval=5.0,
+                 client=None):
+        import pymongo
 
-    def __init__(self, model_config, uri, database):
         self.model_config = model_config
-        self.client = pymongo.MongoClient(uri)
+        self.client = client if client is not None else pymongo.MongoClient(uri)
         self.db = self.client[database]
 
+        self.db.metrics.create_index([('run_name', pymongo.ASCENDING), ('epoch_idx', pymongo.ASCENDING)])
+        self.db.configs.create_index([('run_name', pymongo.ASCENDING)])
+
+        self.buffered = buffered
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self.buffer = []
+        self.lock = threading.Lock()
+        # Flushes are serialized, so that once flush() returns, all rows stored before are in the database
+        self.flush_lock = threading.Lock()
+        self.flush_requested = threading.Event()
+        self.flush_error = None
+
+        if self.buffered:
+            self.thread = threading.Thread(target=self._flush_loop, name='mongodb-flush', daemon=True)
+            self.thread.start()
+
+            atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            self.flush_requested.wait(self.flush_interval)
+            self.flush_requested.clear()
+
+            try:
+                self._flush_buffer()
+            except Exception as e:
+                self.flush_error = e
+
+    def _flush_buffer(self):
+        """ Insert all buffered rows into the database """
+        with self.flush_lock:
+            with self.lock:
+                rows, self.buffer = self.buffer, []
+
+            if not rows:
+                return
+
+            try:
+                self.db.metrics.insert_many(rows, ordered=True)
+            except Exception:
+                # Keep the rows for the next attempt
+                with self.lock:
+                    self.buffer = rows + self.buffer
+                raise
+
+    def flush(self):
+        """ Write all buffered metrics to the database """
+        if self.flush_error is not None:
+            error, self.flush_error = self.flush_error, None
+            raise error
+
+        self._flush_buffer()
+
     def clean(self, initial_epoch):
         """ Remove entries from database that would get overwritten """
+        self.flush()
         self.db.metrics.delete_many({'run_name': self.model_config.run_name, 'epoch_idx': {'$gt': initial_epoch}})
 
     def store_config(self, configuration):
@@ -25,13 +89,46 @@ class MongoDbBackend:
 
         self.db.configs.insert_one(configuration)
 
-    def get_frame(self):
-        """ Get a dataframe of metrics from this storage """
-        metric_items = list(self.db.metrics.find({'run_name': self.model_config.run_name}).sort('epoch_idx'))
+    def get_frame(self, columns=None, page_size=1000):
+        """
+        Get a dataframe of metrics from this storage.
+        Only given metric columns are fetched if specified, documents are read in pages sorted by epoch.
+        """
+        import pandas as pd
+        import pymongo
+
+        self.flush()
+
+        if columns is None:
+            projection = {'_id': False, 'model_name': False}
+        else:
+            projection = {'_id': False, 'run_name': True, 'epoch_idx': True, **{c: True for c in columns}}
+
+        metric_items = []
+        last_epoch_idx = None
+
+        while True:
+            query = {'run_name': self.model_config.run_name}
+
+            # Pagination by the indexed key, which unlike skipping stays fast for later pages
+            if last_epoch_idx is not None:
+                query['epoch_idx'] = {'$gt': last_epoch_idx}
+
+            page = list(
+                self.db.metrics.find(query, projection).sort('epoch_idx', pymongo.ASCENDING).limit(page_size)
+            )
+
+            metric_items.extend(page)
+
+            if len(page) < page_size:
+                break
+
+            last_epoch_idx = page[-1]['epoch_idx']
+
         if len(metric_items) == 0:
             return pd.DataFrame(columns=['run_name'])
         else:
-            return pd.DataFrame(metric_items).drop(['_id', 'model_name'], axis=1).set_index('epoch_idx')
+            return pd.DataFrame(metric_items).set_index('epoch_idx')
 
     def store(self, metrics):
         augmented_metrics = metrics.copy()
@@ -42,10 +139,19 @@ class MongoDbBackend:
         augmented_metrics['model_name'] = model_name
         augmented_metrics['run_name'] = run_name
 
-        self.db.metrics.insert_one(augmented_metrics)
+        if self.buffered:
+            with self.lock:
+                self.buffer.append(augmented_metrics)
+                buffer_size = len(self.buffer)
+
+            if buffer_size >= self.flush_size:
+                self.flush_requested.set()
+        else:
+            self.db.metrics.insert_one(augmented_metrics)
 
 
-def create(model_config, uri, database):
+def create(model_config, uri, database, buffered=False, flush_size=100, flush_interval=5.0):
     """ Create a mongodb storage object """
-    return MongoDbBackend(model_config, uri, database)
-
+    return MongoDbBackend(
+        model_config, uri, database, buffered=buffered, flush_size=flush_size, flush_interval=flush_interval
+    )
@@ -0,0 +1,97 @@
+import json
+import os.path
+import pathlib
+import sqlite3
+
+
+def to_scalar(value):
+    """ Convert numpy and torch scalars into python values that SQLite can store """
+    return value.item() if hasattr(value, 'item') else value
+
+
+class SqliteBackend:
+    """
+    Storage backend to store all experiment results in a local SQLite database file, no server required.
+
+    Metrics are stored one value per row, indexed by run name, epoch and metric name, so that selected metric
+    columns can be read without the others. Database runs in WAL mode, so that many runs can write to it
+    concurrently while it is being read.
+    """
+
+    def __init__(self, model_config, path):
+        self.model_config = model_config
+        self.path = path
+
+        pathlib.Path(os.path.dirname(os.path.abspath(path))).mkdir(parents=True, exist_ok=True)
+
+        # Wait for locks held by other processes instead of failing immediately
+        self.connection = sqlite3.connect(path, timeout=30.0)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS metrics ('
+                'run_name TEXT NOT NULL, model_name TEXT, epoch_idx INTEGER NOT NULL, metric TEXT NOT NULL, value, '
+                'PRIMARY KEY (run_name, epoch_idx, metric))'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS configs (run_name TEXT PRIMARY KEY, configuration TEXT NOT NULL)'
+            )
+
+    def clean(self, initial_epoch):
+        """ Remove entries from database that would get overwritten """
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM metrics WHERE run_name = ? AND epoch_idx > ?', (self.model_config.run_name, initial_epoch)
+            )
+
+    def store_config(self, configuration):
+        """ Store model parameters in the database """
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO configs (run_name, configuration) VALUES (?, ?)',
+                (self.model_config.run_name, json.dumps(configuration, default=str))
+            )
+
+    def get_frame(self, columns=None):
+        """ Get a dataframe of metrics from this storage, only given metric columns are read if specified """
+        import pandas as pd
+
+        query = 'SELECT epoch_idx, metric, value FROM metrics WHERE run_name = ?'
+        parameters = [self.model_config.run_name]
+
+        if columns is not None:
+            query += ' AND metric IN ({})'.format(', '.join('?' * len(columns)))
+            parameters.extend(columns)
+
+        rows = self.connection.execute(query + ' ORDER BY epoch_idx', parameters).fetchall()
+
+        if len(rows) == 0:
+            return pd.DataFrame(columns=['run_name'])
+
+        frame = pd.DataFrame(rows, columns=['epoch_idx', 'metric', 'value'])
+        frame = frame.pivot(index='epoch_idx', columns='metric', values='value')
+        frame.columns.name = None
+        frame['run_name'] = self.model_config.run_name
+
+        return frame
+
+    def store(self, metrics):
+        """ Store metrics in the database """
+        model_name = self.model_config.name
+        run_name = self.model_config.run_name
+        epoch_idx = metrics['epoch_idx']
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO metrics (run_name, model_name, epoch_idx, metric, value) VALUES (?, ?, ?, ?, ?)',
+                [(run_name, model_name, epoch_idx, k, to_scalar(v)) for k, v in metrics.items() if k != 'epoch_idx']
+            )
+
+
+def create(model_config, path='metrics.sqlite'):
+    """ Create a SQLite storage object, relative path is resolved in the project output directory """
+    if not os.path.isabs(path):
+        path = model_config.output_dir(path)
+
+    return SqliteBackend(model_config, path)
@@ -0,0 +1,85 @@
+import atexit
+import numpy as np
+import os
+import queue
+import threading
+
+import torch
+
+
+def to_cpu(data):
+    """ Copy of all tensors in a nested structure on the CPU, safe to write while training continues """
+    if isinstance(data, torch.Tensor):
+        return data.detach().to('cpu', copy=True)
+    elif isinstance(data, np.ndarray):
+        return data.copy()
+    elif isinstance(data, dict):
+        result = data.__class__((k, to_cpu(v)) for k, v in data.items())
+
+        # Module state dicts carry version information used when loading them
+        if hasattr(data, '_metadata'):
+            result._metadata = data._metadata
+
+        return result
+    elif isinstance(data, (list, tuple)):
+        return data.__class__(to_cpu(x) for x in data)
+    else:
+        return data
+
+
+def save_atomic(data, filename):
+    """ Save data with torch.save, file appears under its final name only once it is complete """
+    temp_filename = filename + '.tmp'
+    torch.save(data, temp_filename)
+    os.replace(temp_filename, filename)
+
+
+def remove_file(filename):
+    """ Remove a file, if it exists """
+    if os.path.exists(filename):
+        os.remove(filename)
+
+
+class CheckpointWriter:
+    """
+    Executes checkpoint file operations in order in a background thread.
+
+    At most max_pending operations can be waiting, submitting more blocks until older ones complete,
+    which bounds memory taken by the checkpoint snapshots.
+    """
+    def __init__(self, max_pending=2):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+
+        self.thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self.thread.start()
+
+        # Daemon thread would get killed at interpreter exit, make sure everything has been written by then
+        atexit.register(self.wait)
+
+    def _run(self):
+        while True:
+            operation = self.queue.get()
+
+            try:
+                if self.error is None:
+                    operation()
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def submit(self, operation):
+        """ Schedule operation to be executed after all previously submitted ones """
+        self._raise_error()
+        self.queue.put(operation)
+
+    def wait(self):
+        """ Block until all submitted operations are done """
+        self.queue.join()
+        self._raise_error()
@@ -0,0 +1,89 @@
+import collections
+import hashlib
+import json
+import numpy as np
+import os
+import pathlib
+
+import torch
+
+
+class ChunkedCheckpoint:
+    """
+    Checkpoint format storing every tensor of a state dict in a separate, content-addressed chunk file.
+
+    Checkpoint file itself is a small JSON manifest referring to the chunks. Tensors that did not change between
+    checkpoints, such as frozen layers, are stored on disk only once and shared. Loaded tensors are memory-mapped,
+    so only data that is actually used gets read.
+    """
+    def __init__(self, chunk_dir):
+        self.chunk_dir = chunk_dir
+
+    def chunk_filename(self, digest) -> str:
+        """ Filename of the chunk with given digest """
+        return os.path.join(self.chunk_dir, digest[:2], digest + '.bin')
+
+    def save(self, state_dict, filename):
+        """ Write the state dict, only chunks not already present are written """
+        entries = collections.OrderedDict()
+
+        for key, tensor in state_dict.items():
+            data = tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+            digest = hashlib.sha256(data).hexdigest()
+
+            chunk_filename = self.chunk_filename(digest)
+
+            if not os.path.exists(chunk_filename):
+                pathlib.Path(os.path.dirname(chunk_filename)).mkdir(parents=True, exist_ok=True)
+
+                with open(chunk_filename + '.tmp', 'wb') as fp:
+                    fp.write(data)
+
+                os.replace(chunk_filename + '.tmp', chunk_filename)
+
+            entries[key] = {
+                'chunk': digest,
+                'dtype': str(tensor.dtype).split('.')[-1],
+                'shape': list(tensor.shape)
+            }
+
+        with open(filename + '.tmp', 'wt') as fp:
+            json.dump({'entries': entries}, fp)
+
+        os.replace(filename + '.tmp', filename)
+
+    def load(self, filename):
+        """ Load the state dict with tensors memory-mapped from the chunk files """
+        with open(filename, 'rt') as fp:
+            manifest = json.load(fp, object_pairs_hook=collections.OrderedDict)
+
+        state_dict = collections.OrderedDict()
+
+        for key, entry in manifest['entries'].items():
+            dtype = getattr(torch, entry['dtype'])
+            chunk_filename = self.chunk_filename(entry['chunk'])
+
+            if os.path.getsize(chunk_filename) == 0:
+                state_dict[key] = torch.empty(entry['shape'], dtype=dtype)
+            else:
+                # Copy-on-write mapping, the file itself is never modified
+                data = torch.from_numpy(np.memmap(chunk_filename, dtype=np.uint8, mode='c'))
+                state_dict[key] = data.view(dtype).reshape(entry['shape'])
+
+        return state_dict
+
+    def collect_garbage(self, filenames):
+        """ Remove chunks not referenced by any of the given checkpoint files """
+        referenced = set()
+
+        for filename in filenames:
+            with open(filename, 'rt') as fp:
+                referenced.update(entry['chunk'] for entry in json.load(fp)['entries'].values())
+
+        if not os.path.exists(self.chunk_dir):
+            return
+
+        for directory, _, files in os.walk(self.chunk_dir):
+            for chunk_file in files:
+                if chunk_file[:-len('.bin')] not in referenced or not chunk_file.endswith('.bin'):
+                    os.remove(os.path.join(directory, chunk_file))
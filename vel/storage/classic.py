@@ -3,32 +3,64 @@ import pathlib
 import re
 import torch
 
+import vel.util.distributed as distributed
 
 from vel.api import ModelConfig, EpochInfo, TrainingInfo
 from vel.api.base import Model, Storage
+from .checkpoint_writer import CheckpointWriter, to_cpu, save_atomic, remove_file
+from .chunked_checkpoint import ChunkedCheckpoint
 from .strategy.checkpoint_strategy import CheckpointStrategy
 
 
 class ClassicStorage(Storage):
-    """ Model and metric persistence - classic implementation """
+    """
+    Model and metric persistence - classic implementation.
 
-    def __init__(self, model_config: ModelConfig, checkpoint_strategy: CheckpointStrategy, backend, streaming=None):
+    In distributed training only the main process writes checkpoints and metrics.
+
+    With asynchronous checkpoints, training state is copied to the CPU at the end of the epoch and written to disk
+    in a background thread, while training continues.
+
+    With 'chunked' checkpoint format, model weights are stored as content-addressed chunks shared between
+    checkpoints, so that unchanged tensors are written only once.
+    """
+
+    def __init__(self, model_config: ModelConfig, checkpoint_strategy: CheckpointStrategy, backend, streaming=None,
+                 asynchronous=False, max_pending_writes=2, checkpoint_format='torch'):
         self.model_config = model_config
         self.backend = backend
         self.streaming = streaming if streaming is not None else []
         self.checkpoint_strategy = checkpoint_strategy
 
+        self.writer = CheckpointWriter(max_pending_writes) if asynchronous else None
+
+        if checkpoint_format == 'chunked':
+            self.chunked = ChunkedCheckpoint(self.model_config.checkpoint_dir('chunks'))
+        elif checkpoint_format == 'torch':
+            self.chunked = None
+        else:
+            raise ValueError(f"Unknown checkpoint format '{checkpoint_format}'")
+
         self.cleaned = False
 
     def last_epoch_idx(self):
         """ Return last checkpointed epoch idx for given configuration. Returns 0 if no results have been stored """
+        self.wait()
         return self._persisted_last_epoch()
 
+    def wait(self):
+        """ Wait until all checkpoints are written to disk """
+        if self.writer is not None:
+            self.writer.wait()
+
     def reset(self, configuration: dict) -> None:
         """
         Whenever there was anything stored in the database or not, purge previous state and start
         new training process from scratch.
         """
+        if not distributed.is_main_process():
+            return
+
         self.clean(0)
         self.backend.store_config(configuration)
 
@@ -36,9 +68,11 @@ class ClassicStorage(Storage):
         """
         Resume learning process and return loaded hidden state dictionary
         """
+        self.wait()
+
         last_epoch = train_info.start_epoch_idx
 
-        model.load_state_dict(torch.load(self.checkpoint_filename(last_epoch)))
+        model.load_state_dict(self._load_model_state(self.checkpoint_filename(last_epoch)))
         hidden_state = torch.load(self.checkpoint_hidden_filename(last_epoch))
 
         self.checkpoint_strategy.restore(hidden_state)
@@ -52,12 +86,14 @@ class ClassicStorage(Storage):
 
     def clean(self, global_epoch_idx):
         """ Clean old checkpoints """
-        if self.cleaned:
+        if self.cleaned or not distributed.is_main_process():
             return
 
         self.cleaned = True
         self.backend.clean(global_epoch_idx)
 
+        self.wait()
+
         self._make_sure_dir_exists()
 
         for x in os.listdir(self.model_config.checkpoint_dir()):
@@ -85,41 +121,64 @@ class ClassicStorage(Storage):
                 if idx > global_epoch_idx:
                     os.remove(os.path.join(self.model_config.checkpoint_dir(), x))
 
+        if self.chunked is not None:
+            self._collect_garbage()
+
     def checkpoint(self, epoch_info: EpochInfo, model: Model):
         """ When epoch is done, we persist the training state """
+        if not distributed.is_main_process():
+            return
+
         self.clean(epoch_info.global_epoch_idx - 1)
 
         self._make_sure_dir_exists()
 
-        # Checkpoint latest
-        torch.save(model.state_dict(), self.checkpoint_filename(epoch_info.global_epoch_idx))
+        # Snapshot of the training state, the live one will keep changing while it's being written
+        model_state = self._snapshot(model.state_dict())
 
         hidden_state = epoch_info.state_dict()
         self.checkpoint_strategy.write_state_dict(hidden_state)
+        hidden_state = self._snapshot(hidden_state)
 
-        torch.save(hidden_state, self.checkpoint_hidden_filename(epoch_info.global_epoch_idx))
+        # File operations of this checkpoint, in order
+        operations = []
+
+        # Checkpoint latest
+        operations.append((self._save_model_state, model_state, self.checkpoint_filename(epoch_info.global_epoch_idx)))
+        operations.append((save_atomic, hidden_state, self.checkpoint_hidden_filename(epoch_info.global_epoch_idx)))
 
         if epoch_info.global_epoch_idx > 1 and self.checkpoint_strategy.should_delete_previous_checkpoint(
                                                    epoch_info.global_epoch_idx):
             prev_epoch_idx = epoch_info.global_epoch_idx - 1
 
-            os.remove(self.checkpoint_filename(prev_epoch_idx))
-            os.remove(self.checkpoint_hidden_filename(prev_epoch_idx))
+            operations.append((remove_file, self.checkpoint_filename(prev_epoch_idx)))
+            operations.append((remove_file, self.checkpoint_hidden_filename(prev_epoch_idx)))
 
         if self.checkpoint_strategy.should_store_best_checkpoint(epoch_info.global_epoch_idx, epoch_info.result):
             best_checkpoint_idx = self.checkpoint_strategy.current_best_checkpoint_idx
 
             if best_checkpoint_idx is not None:
-                os.remove(self.checkpoint_best_filename(best_checkpoint_idx))
+                operations.append((remove_file, self.checkpoint_best_filename(best_checkpoint_idx)))
 
-            torch.save(model.state_dict(), self.checkpoint_best_filename(epoch_info.global_epoch_idx))
+            operations.append(
+                (self._save_model_state, model_state, self.checkpoint_best_filename(epoch_info.global_epoch_idx))
+            )
 
             self.checkpoint_strategy.store_best_checkpoint_idx(epoch_info.global_epoch_idx)
 
+        if self.chunked is not None:
+            # Remove chunks only referenced by deleted checkpoints
+            operations.append((self._collect_garbage,))
+
+        self._write(operations)
+
         self.backend.store(epoch_info.result)
 
     def streaming_callbacks(self) -> list:
         """ Lift of callbacks for live streaming results """
+        if not distributed.is_main_process():
+            return []
+
         return self.streaming
 
     ####################################################################################################################
@@ -138,13 +197,52 @@ class ClassicStorage(Storage):
 
     ####################################################################################################################
     # Internal interface
+    def _snapshot(self, state):
+        """ State to be written, copied if it is going to be written in the background """
+        return to_cpu(state) if self.writer is not None else state
+
+    def _save_model_state(self, state_dict, filename):
+        """ Save model weights in the configured checkpoint format """
+        if self.chunked is not None:
+            self.chunked.save(state_dict, filename)
+        else:
+            save_atomic(state_dict, filename)
+
+    def _load_model_state(self, filename):
+        """ Load model weights in the configured checkpoint format """
+        if self.chunked is not None:
+            return self.chunked.load(filename)
+        else:
+            return torch.load(filename)
+
+    def _collect_garbage(self):
+        """ Remove weight chunks that no checkpoint refers to anymore """
+        checkpoint_dir = self.model_config.checkpoint_dir()
+
+        self.chunked.collect_garbage([
+            os.path.join(checkpoint_dir, x) for x in os.listdir(checkpoint_dir)
+            if re.match('checkpoint_(best_)?(\\d+)\\.data$', x)
+        ])
+
+    def _write(self, operations):
+        """ Perform a list of file operations, in the background if asynchronous """
+        def write():
+            for operation, *args in operations:
+                operation(*args)
+
+        if self.writer is not None:
+            self.writer.submit(write)
+        else:
+            write()
+
     def _persisted_last_epoch(self) -> int:
         """ Return number of last epoch already calculated """
         epoch_number = 0
         self._make_sure_dir_exists()
 
         for x in os.listdir(self.model_config.checkpoint_dir()):
-            match = re.match('checkpoint_(\\d+)\\.data', x)
+            # Skip incomplete files of an interrupted write
+            match = re.match('checkpoint_(\\d+)\\.data$', x)
             if match:
                 idx = int(match[1])
 
@@ -159,11 +257,15 @@ class ClassicStorage(Storage):
         pathlib.Path(filename).mkdir(parents=True, exist_ok=True)
 
 
-def create(model_config, backend, checkpoint_strategy, streaming=None):
-    """ Vel creation function """
+def create(model_config, backend, checkpoint_strategy, streaming=None, asynchronous=False, max_pending_writes=2,
+           checkpoint_format='torch'):
+    """ Vel creation function, checkpoint format is either 'torch' or 'chunked' """
     return ClassicStorage(
         model_config=model_config,
         backend=backend,
         checkpoint_strategy=checkpoint_strategy,
-        streaming=streaming
+        streaming=streaming,
+        asynchronous=asynchronous,
+        max_pending_writes=max_pending_writes,
+        checkpoint_format=checkpoint_format
     )
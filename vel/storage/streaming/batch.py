@@ -0,0 +1,274 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import warnings
+
+import numpy as np
+
+import vel.api.base as base
+
+from vel.api import BatchInfo, ModelConfig
+from vel.util.visdom import connect_visdom, visdom_append_metrics, VisdomSettings
+
+
+class MetricRingBuffer:
+    """
+    Preallocated buffer of per-batch scalar metrics.
+
+    Once capacity is reached, the oldest samples get overwritten, so that a slow consumer can never make
+    the producer wait or grow memory without bounds.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.steps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, 0), np.nan)
+        self.columns = {}
+
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+
+    def _column(self, name) -> int:
+        """ Index of the metric column, allocating a new one for a metric seen for the first time """
+        if name not in self.columns:
+            self.columns[name] = len(self.columns)
+            self.values = np.concatenate([self.values, np.full((self.capacity, 1), np.nan)], axis=1)
+
+        return self.columns[name]
+
+    def append(self, step, metrics):
+        """ Add a sample of metrics recorded at given step """
+        idx = (self.start + self.size) % self.capacity
+
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.dropped += 1
+        else:
+            self.size += 1
+
+        self.steps[idx] = step
+        self.values[idx] = np.nan
+
+        for name, value in metrics.items():
+            column = self._column(name)
+            self.values[idx, column] = value
+
+    def take(self, count):
+        """ Remove count oldest samples from the buffer, return their steps, values and metric names """
+        indexes = (self.start + np.arange(count)) % self.capacity
+
+        steps = self.steps[indexes]
+        values = self.values[indexes]
+
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+
+        return steps, values, list(self.columns)
+
+
+def downsample(steps, values, window):
+    """
+    Reduce samples to a single one for each consecutive window, the last one possibly partial.
+    Returns the step at the end of each window and the min, max and mean of values within it.
+    """
+    count = len(steps)
+    window_count = -(-count // window)
+    padding = window_count * window - count
+
+    padded = np.concatenate([values, np.full((padding, values.shape[1]), np.nan)]).reshape(window_count, window, -1)
+    window_steps = steps[np.minimum(np.arange(1, window_count + 1) * window, count) - 1]
+
+    with warnings.catch_warnings():
+        # Metrics not recorded in a whole window are NaN, which is exactly what we want
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+
+        return window_steps, np.nanmin(padded, axis=1), np.nanmax(padded, axis=1), np.nanmean(padded, axis=1)
+
+
+class MetricStreamer:
+    """
+    Records per-batch metrics and writes them downsampled to the sinks from a background thread.
+
+    Recording only stores the values in a ring buffer. Every flush_interval seconds complete windows of samples
+    are reduced to their min, max and mean and written to all sinks in a single call, so the training loop never
+    waits for any I/O.
+    """
+    def __init__(self, sinks, window=10, capacity=10_000, flush_interval=1.0):
+        self.sinks = sinks
+        self.window = window
+        self.flush_interval = flush_interval
+
+        self.buffer = MetricRingBuffer(capacity)
+        self.lock = threading.Lock()
+        # Flushes are serialized, so that windows are written in order
+        self.flush_lock = threading.Lock()
+        self.operations = queue.Queue()
+        self.error = None
+
+        self.thread = threading.Thread(target=self._run, name='metric-streamer', daemon=True)
+        self.thread.start()
+
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            try:
+                operation = self.operations.get(timeout=self.flush_interval)
+            except queue.Empty:
+                operation = None
+
+            try:
+                if operation is None:
+                    self._flush_buffer(complete_only=True)
+                else:
+                    operation()
+            except Exception as e:
+                self.error = e
+            finally:
+                if operation is not None:
+                    self.operations.task_done()
+
+    def record(self, step, metrics):
+        """ Record metric values at given step """
+        with self.lock:
+            self.buffer.append(step, metrics)
+
+    def submit(self, operation):
+        """ Execute an arbitrary sink operation in the background thread, in order with other submitted ones """
+        self.operations.put(operation)
+
+    def _flush_buffer(self, complete_only):
+        with self.flush_lock:
+            with self.lock:
+                count = self.buffer.size
+
+                if complete_only:
+                    count = count // self.window * self.window
+
+                if count == 0:
+                    return
+
+                steps, values, names = self.buffer.take(count)
+
+            window_steps, minimum, maximum, mean = downsample(steps, values, self.window)
+
+            rows = []
+
+            for idx, step in enumerate(window_steps):
+                row = {'iteration': float(step)}
+
+                for column, name in enumerate(names):
+                    if not np.isnan(mean[idx, column]):
+                        row[name] = float(mean[idx, column])
+
+                        if self.window > 1:
+                            row[name + '_min'] = float(minimum[idx, column])
+                            row[name + '_max'] = float(maximum[idx, column])
+
+                rows.append(row)
+
+            for sink in self.sinks:
+                sink.write(rows)
+
+    def flush(self):
+        """ Block until all recorded metrics and submitted operations have been written """
+        self.operations.join()
+        self._flush_buffer(complete_only=False)
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+class StdoutSink:
+    """ Print downsampled metrics, a line per window """
+    def __init__(self, file=None):
+        self.file = file if file is not None else sys.stdout
+
+    def write(self, rows):
+        for row in rows:
+            metrics = " ".join(
+                "{} {:.06f}".format(k, v) for k, v in sorted(row.items()) if k != 'iteration'
+            )
+            print("Batch {:.4f}: {}".format(row['iteration'], metrics), file=self.file)
+
+
+class OutputFormatSink:
+    """ Write downsampled metrics using one of the openai logger output formats, e.g. CSV or TensorBoard """
+    def __init__(self, output_format):
+        self.output_format = output_format
+
+    def write(self, rows):
+        for row in rows:
+            self.output_format.writekvs(row)
+
+
+class VisdomSink:
+    """ Append downsampled metrics to visdom plots, indexed by fractional epoch """
+    def __init__(self, vis):
+        self.vis = vis
+        self.first = True
+
+    def write(self, rows):
+        import pandas as pd
+
+        metrics_df = pd.DataFrame(rows).set_index('iteration')
+
+        visdom_append_metrics(self.vis, metrics_df, first_epoch=self.first)
+        self.first = False
+
+
+class BatchStreaming(base.Callback):
+    """ Stream selected metrics of every training batch, downsampled, to the sinks of a metric streamer """
+    def __init__(self, streamer: MetricStreamer, metrics=('loss',), stream_lr=True):
+        self.streamer = streamer
+        self.metrics = metrics
+        self.stream_lr = stream_lr
+
+    def on_batch_end(self, batch_info: BatchInfo):
+        iteration_idx = (
+            float(batch_info.epoch_number) +
+            float(batch_info.batch_number) / batch_info.batches_per_epoch
+        )
+
+        values = {name: float(batch_info[name]) for name in self.metrics if name in batch_info}
+
+        if self.stream_lr and batch_info.optimizer is not None:
+            values['lr'] = batch_info.optimizer.param_groups[-1]['lr']
+
+        self.streamer.record(iteration_idx, values)
+
+    def on_train_end(self, training_info):
+        self.streamer.flush()
+
+
+def create_sink(model_config: ModelConfig, name: str, visdom_settings=None):
+    """ Create a sink by name - one of stdout, csv, tensorboard or visdom """
+    from vel.openai.baselines import logger
+
+    streaming_dir = model_config.output_dir('streaming', model_config.run_name)
+
+    if name == 'stdout':
+        return StdoutSink()
+    elif name == 'csv':
+        os.makedirs(streaming_dir, exist_ok=True)
+        return OutputFormatSink(logger.CSVOutputFormat(os.path.join(streaming_dir, 'batches.csv')))
+    elif name == 'tensorboard':
+        return OutputFormatSink(logger.TensorBoardOutputFormat(os.path.join(streaming_dir, 'tb')))
+    elif name == 'visdom':
+        return VisdomSink(connect_visdom(model_config, VisdomSettings(**(visdom_settings or {}))))
+    else:
+        raise ValueError(f"Unknown streaming sink: {name}")
+
+
+def create(model_config, sinks=('stdout',), metrics=('loss',), stream_lr=True, window=10, capacity=10_000,
+           flush_interval=1.0, visdom_settings=None):
+    """ Vel create function """
+    streamer = MetricStreamer(
+        [create_sink(model_config, name, visdom_settings) for name in sinks],
+        window=window, capacity=capacity, flush_interval=flush_interval
+    )
+
+    return BatchStreaming(streamer, metrics=metrics, stream_lr=stream_lr)
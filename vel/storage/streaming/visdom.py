@@ -1,34 +1,31 @@
-import visdom
-import pandas as pd
-
-
 import vel.api.base as base
 
 from vel.api import ModelConfig
-from vel.util.visdom import visdom_append_metrics, VisdomSettings
+from vel.storage.streaming.batch import MetricStreamer, VisdomSink
+from vel.util.visdom import connect_visdom, visdom_append_metrics, VisdomSettings
 
 
 class VisdomStreaming(base.Callback):
-    """ Stream live results to visdom from training """
+    """
+    Stream live results to visdom from training.
+
+    All communication with the server happens in a background thread. Learning rate, if streamed, is recorded
+    every batch and sent downsampled in windows of stream_window batches.
+    """
     def __init__(self, model_config: ModelConfig, visdom_settings: VisdomSettings):
         self.model_config = model_config
         self.settings = visdom_settings
-        self.vis = visdom.Visdom(
-            server=visdom_settings.server,
-            endpoint=visdom_settings.endpoint,
-            port=visdom_settings.port,
-            env=self.model_config.run_name.replace('/', '_')
-        )
+        self.vis = connect_visdom(model_config, visdom_settings)
+        self.streamer = MetricStreamer([VisdomSink(self.vis)], window=visdom_settings.stream_window)
 
     def on_epoch_end(self, epoch_info):
         """ Update data in visdom on push """
+        import pandas as pd
+
         metrics_df = pd.DataFrame([epoch_info.result]).set_index('epoch_idx')
+        first_epoch = epoch_info.global_epoch_idx == 1
 
-        visdom_append_metrics(
-            self.vis,
-            metrics_df,
-            first_epoch=epoch_info.global_epoch_idx == 1
-        )
+        self.streamer.submit(lambda: visdom_append_metrics(self.vis, metrics_df, first_epoch=first_epoch))
 
     def on_batch_end(self, batch_info):
         """ Stream LR to visdom """
@@ -37,16 +34,11 @@ class VisdomStreaming(base.Callback):
                     float(batch_info.epoch_number) +
                     float(batch_info.batch_number) / batch_info.batches_per_epoch
             )
-            
-            lr = batch_info.optimizer.param_groups[-1]['lr']
 
-            metrics_df = pd.DataFrame([lr], index=[iteration_idx], columns=['lr'])
+            self.streamer.record(iteration_idx, {'lr': batch_info.optimizer.param_groups[-1]['lr']})
 
-            visdom_append_metrics(
-                self.vis,
-                metrics_df,
-                first_epoch=(batch_info.epoch_number == 1) and (batch_info.batch_number == 0)
-            )
+    def on_train_end(self, training_info):
+        self.streamer.flush()
 
 
 def create(model_config, visdom_settings):
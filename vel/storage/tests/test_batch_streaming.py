@@ -0,0 +1,112 @@
+import io
+import os
+import tempfile
+import time
+
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+
+from vel.openai.baselines.logger import CSVOutputFormat
+from vel.storage.streaming.batch import (
+    downsample, MetricRingBuffer, MetricStreamer, OutputFormatSink, StdoutSink
+)
+
+
+class ListSink:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.rows = []
+
+    def write(self, rows):
+        time.sleep(self.delay)
+        self.rows.extend(rows)
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = MetricRingBuffer(4)
+
+    for i in range(6):
+        buffer.append(i, {'loss': float(i)})
+
+    buffer.append(6, {'lr': 0.1})
+
+    t.assert_equal(buffer.dropped, 3)
+
+    steps, values, names = buffer.take(4)
+
+    nt.assert_array_equal(steps, [3, 4, 5, 6])
+    t.assert_equal(names, ['loss', 'lr'])
+    nt.assert_array_equal(values[:, 0], [3.0, 4.0, 5.0, np.nan])
+    nt.assert_array_equal(values[:, 1], [np.nan, np.nan, np.nan, 0.1])
+    t.assert_equal(buffer.size, 0)
+
+
+def test_downsample():
+    steps = np.arange(7, dtype=np.float64)
+    values = np.array([[1.0], [5.0], [3.0], [2.0], [2.0], [8.0], [4.0]])
+
+    window_steps, minimum, maximum, mean = downsample(steps, values, 3)
+
+    nt.assert_array_equal(window_steps, [2.0, 5.0, 6.0])
+    nt.assert_array_equal(minimum[:, 0], [1.0, 2.0, 4.0])
+    nt.assert_array_equal(maximum[:, 0], [5.0, 8.0, 4.0])
+    nt.assert_array_equal(mean[:, 0], [3.0, 4.0, 4.0])
+
+
+def test_streamer_does_not_block_on_sinks():
+    sink = ListSink(delay=0.5)
+    streamer = MetricStreamer([sink], window=10, flush_interval=0.01)
+
+    start = time.perf_counter()
+
+    for i in range(1000):
+        streamer.record(i, {'loss': float(i)})
+        # Give the flush thread a chance to pick up the slow sink in the middle
+        if i == 500:
+            time.sleep(0.05)
+
+    t.assert_less(time.perf_counter() - start, 0.4)
+
+    streamer.flush()
+
+    t.assert_equal(len(sink.rows), 100)
+    t.assert_equal(sink.rows[0], {'iteration': 9.0, 'loss': 4.5, 'loss_min': 0.0, 'loss_max': 9.0})
+    t.assert_equal(sink.rows[-1]['iteration'], 999.0)
+
+
+def test_streamer_partial_window_and_submitted_operations():
+    sink = ListSink()
+    streamer = MetricStreamer([sink], window=4, flush_interval=60.0)
+    calls = []
+
+    for i in range(6):
+        streamer.record(i, {'loss': 1.0})
+
+    streamer.submit(lambda: calls.append('epoch'))
+    streamer.flush()
+
+    t.assert_equal(calls, ['epoch'])
+    t.assert_equal([row['iteration'] for row in sink.rows], [3.0, 5.0])
+
+
+def test_output_sinks():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'batches.csv')
+        output = io.StringIO()
+
+        streamer = MetricStreamer(
+            [OutputFormatSink(CSVOutputFormat(filename)), StdoutSink(output)], window=2, flush_interval=60.0
+        )
+
+        for i in range(4):
+            streamer.record(i, {'loss': float(i)})
+
+        streamer.flush()
+
+        with open(filename, 'rt') as fp:
+            lines = fp.read().splitlines()
+
+        t.assert_equal(len(lines), 3)
+        t.assert_equal(sorted(lines[0].split(',')), ['iteration', 'loss', 'loss_max', 'loss_min'])
+        t.assert_equal(len(output.getvalue().splitlines()), 2)
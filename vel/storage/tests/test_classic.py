@@ -0,0 +1,94 @@
+import os
+import tempfile
+
+import nose.tools as t
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from vel.api import ModelConfig, TrainingInfo, EpochInfo
+from vel.storage.backend.dummy import DummyBackend
+from vel.storage.classic import ClassicStorage
+from vel.storage.strategy.classic_checkpoint_strategy import ClassicCheckpointStrategy
+
+
+def checkpoint_epochs(storage, model, losses):
+    """ Checkpoint an epoch for each of the losses, modifying the model right after each checkpoint """
+    optimizer = optim.Adam(model.parameters())
+    training_info = TrainingInfo(metrics=[], callbacks=[])
+
+    weights = []
+
+    for epoch_idx, loss in enumerate(losses, 1):
+        model.weight.data.fill_(float(epoch_idx))
+        weights.append(model.weight.detach().clone())
+
+        epoch_info = EpochInfo(training_info, global_epoch_idx=epoch_idx, batches_per_epoch=1, optimizer=optimizer)
+        epoch_info.result_accumulator.frozen_results['val:loss'] = loss
+        epoch_info.freeze_epoch_result()
+
+        storage.checkpoint(epoch_info, model)
+
+        # Training continues while the checkpoint may still be written
+        model.weight.data.fill_(-1.0)
+
+    return weights
+
+
+def test_asynchronous_checkpoints():
+    with tempfile.TemporaryDirectory() as project_dir:
+        model_config = ModelConfig.from_memory('test', {}, run_number=1, project_dir=project_dir, device='cpu')
+
+        storage = ClassicStorage(
+            model_config, ClassicCheckpointStrategy(store_best=True), DummyBackend(), asynchronous=True
+        )
+
+        model = nn.Linear(3, 2)
+        weights = checkpoint_epochs(storage, model, losses=[3.0, 1.0, 2.0])
+
+        # Waits for the writes in flight
+        t.assert_equal(storage.last_epoch_idx(), 3)
+
+        resumed_model = nn.Linear(3, 2)
+        storage.resume(TrainingInfo(start_epoch_idx=3, metrics=[], callbacks=[]), resumed_model)
+        t.assert_true(torch.equal(resumed_model.weight, weights[2]))
+
+        # Previous checkpoint is deleted, best one is kept
+        t.assert_equal(
+            sorted(os.listdir(model_config.checkpoint_dir())),
+            ['checkpoint_00000003.data', 'checkpoint_best_00000002.data', 'checkpoint_hidden_00000003.data']
+        )
+
+        best_state = torch.load(storage.checkpoint_best_filename(2))
+        t.assert_true(torch.equal(best_state['weight'], weights[1]))
+
+
+def chunk_files(chunk_dir):
+    return sorted(f for _, _, files in os.walk(chunk_dir) for f in files)
+
+
+def test_chunked_checkpoints():
+    with tempfile.TemporaryDirectory() as project_dir:
+        model_config = ModelConfig.from_memory('test', {}, run_number=1, project_dir=project_dir, device='cpu')
+
+        storage = ClassicStorage(
+            model_config, ClassicCheckpointStrategy(store_best=True), DummyBackend(), checkpoint_format='chunked'
+        )
+
+        model = nn.Linear(3, 2)
+        weights = checkpoint_epochs(storage, model, losses=[3.0, 1.0, 2.0])
+
+        # Bias never changes and is stored once, weights of the latest and the best checkpoint are kept
+        t.assert_equal(len(chunk_files(model_config.checkpoint_dir('chunks'))), 3)
+
+        resumed_model = nn.Linear(3, 2)
+        storage.resume(TrainingInfo(start_epoch_idx=3, metrics=[], callbacks=[]), resumed_model)
+
+        t.assert_true(torch.equal(resumed_model.weight, weights[2]))
+        t.assert_true(torch.equal(resumed_model.bias, model.bias))
+
+        # Starting from scratch removes all the chunks
+        storage.cleaned = False
+        storage.reset({})
+
+        t.assert_equal(chunk_files(model_config.checkpoint_dir('chunks')), [])
@@ -0,0 +1,58 @@
+import time
+
+import mongomock
+import nose.tools as t
+
+from vel.api import ModelConfig
+from vel.storage.backend.mongodb import MongoDbBackend
+
+
+def get_backend(**kwargs):
+    model_config = ModelConfig.from_memory('test', {}, run_number=1, project_dir='.', device='cpu')
+    return MongoDbBackend(model_config, uri=None, database='vel', client=mongomock.MongoClient(), **kwargs)
+
+
+def test_buffered_store():
+    backend = get_backend(buffered=True, flush_size=3, flush_interval=60.0)
+
+    backend.store({'epoch_idx': 1, 'val:loss': 3.0})
+    backend.store({'epoch_idx': 2, 'val:loss': 2.0})
+
+    # Rows are kept in memory until there are enough of them
+    t.assert_equal(backend.db.metrics.count_documents({}), 0)
+
+    backend.store({'epoch_idx': 3, 'val:loss': 1.0})
+
+    for _ in range(100):
+        if backend.db.metrics.count_documents({}) == 3:
+            break
+        time.sleep(0.01)
+
+    t.assert_equal(backend.db.metrics.count_documents({}), 3)
+
+    # Reading the metrics flushes the buffer
+    backend.store({'epoch_idx': 4, 'val:loss': 0.5})
+    frame = backend.get_frame()
+
+    t.assert_equal(list(frame.index), [1, 2, 3, 4])
+    t.assert_equal(list(frame['val:loss']), [3.0, 2.0, 1.0, 0.5])
+
+    backend.store({'epoch_idx': 5, 'val:loss': 0.1})
+    backend.clean(2)
+
+    t.assert_equal(list(backend.get_frame().index), [1, 2])
+
+
+def test_get_frame_pages():
+    backend = get_backend()
+
+    for epoch_idx in range(1, 8):
+        backend.store({'epoch_idx': epoch_idx, 'val:loss': 1.0 / epoch_idx, 'val:accuracy': 0.1 * epoch_idx})
+
+    frame = backend.get_frame(columns=['val:loss'], page_size=3)
+
+    t.assert_equal(list(frame.index), list(range(1, 8)))
+    t.assert_equal(sorted(frame.columns), ['run_name', 'val:loss'])
+
+    index_keys = [index['key'] for index in backend.db.metrics.index_information().values()]
+    t.assert_in([('run_name', 1), ('epoch_idx', 1)], index_keys)
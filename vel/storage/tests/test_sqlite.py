@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy as np
+
+from vel.api import ModelConfig
+from vel.storage.backend.sqlite import SqliteBackend
+
+
+def test_sqlite_backend():
+    with tempfile.TemporaryDirectory() as project_dir:
+        path = os.path.join(project_dir, 'metrics.sqlite')
+
+        model_config = ModelConfig.from_memory('test', {}, run_number=1, project_dir=project_dir, device='cpu')
+        other_config = ModelConfig.from_memory('test', {}, run_number=2, project_dir=project_dir, device='cpu')
+
+        backend = SqliteBackend(model_config, path)
+        other_backend = SqliteBackend(other_config, path)
+
+        backend.store_config({'model': {'name': 'test'}})
+
+        for epoch_idx in range(1, 4):
+            backend.store({'epoch_idx': epoch_idx, 'val:loss': np.float32(1.0 / epoch_idx), 'val:accuracy': 0.5})
+            other_backend.store({'epoch_idx': epoch_idx, 'val:loss': 10.0})
+
+        frame = backend.get_frame()
+
+        t.assert_equal(list(frame.index), [1, 2, 3])
+        t.assert_equal(sorted(frame.columns), ['run_name', 'val:accuracy', 'val:loss'])
+        t.assert_almost_equal(frame['val:loss'][2], 0.5)
+
+        t.assert_equal(list(backend.get_frame(columns=['val:loss']).columns), ['val:loss', 'run_name'])
+
+        backend.clean(1)
+
+        t.assert_equal(list(backend.get_frame().index), [1])
+        t.assert_equal(list(other_backend.get_frame().index), [1, 2, 3])
@@ -0,0 +1,92 @@
+import contextlib
+import os
+import socket
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+
+def is_distributed() -> bool:
+    """ Check if current process is a part of a distributed training group """
+    return dist.is_available() and dist.is_initialized()
+
+
+def rank() -> int:
+    """ Rank of current process in the training group, 0 for single-process training """
+    return dist.get_rank() if is_distributed() else 0
+
+
+def world_size() -> int:
+    """ Number of processes in the training group, 1 for single-process training """
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def is_main_process() -> bool:
+    """ Check if current process is responsible for output, checkpoints and metric storage """
+    return rank() == 0
+
+
+@contextlib.contextmanager
+def main_process_first():
+    """
+    Run the block in the main process first, while other processes wait at a barrier and only enter it afterwards.
+    Used around downloads and building data caches, so that they are done once and others reuse the files on disk.
+    """
+    if is_distributed() and not is_main_process():
+        dist.barrier()
+
+    yield
+
+    if is_distributed() and is_main_process():
+        dist.barrier()
+
+
+def all_reduce_mean(values: dict) -> dict:
+    """ Average a dictionary of scalars across all processes of the training group """
+    if not is_distributed() or not values:
+        return values
+
+    keys = sorted(values.keys())
+    tensor = torch.tensor([float(values[k]) for k in keys], dtype=torch.float64)
+
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    tensor /= world_size()
+
+    return {k: v for k, v in zip(keys, tensor.tolist())}
+
+
+def process_device(device: str) -> str:
+    """ Accelerator devices are assigned one per process, CPU is shared """
+    device = torch.device(device)
+
+    if device.type == 'cpu' or not is_distributed():
+        return str(device)
+
+    return f'{device.type}:{rank()}'
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _worker(process_rank, nproc, backend, port, fn, args):
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(port)
+
+    dist.init_process_group(backend, rank=process_rank, world_size=nproc)
+
+    try:
+        fn(*args)
+    finally:
+        dist.destroy_process_group()
+
+
+def spawn(nproc: int, fn, args=(), backend: str='gloo'):
+    """
+    Run function in nproc processes on this machine, joined in a single process group.
+    Gloo backend works on CPU-only hosts, NCCL is an option for GPUs.
+    """
+    mp.spawn(_worker, args=(nproc, backend, _free_port(), fn, args), nprocs=nproc, join=True)
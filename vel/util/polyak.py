@@ -0,0 +1,28 @@
+import torch
+import torch.nn as nn
+
+
+class PolyakAveraging:
+    """
+    Keep parameters of one model as an exponential moving average of parameters of another one.
+
+    All parameters are updated in-place in a single fused call where available, without allocating temporaries.
+    """
+
+    def __init__(self, model: nn.Module, average_model: nn.Module):
+        self.model_parameters = list(model.parameters())
+        self.average_parameters = list(average_model.parameters())
+
+        assert len(self.model_parameters) == len(self.average_parameters), "Models must have the same parameters"
+
+    @torch.no_grad()
+    def update(self, weight: float):
+        """ Move averaged parameters towards the model: average = (1 - weight) * average + weight * model """
+        average_data = [p.data for p in self.average_parameters]
+        model_data = [p.data for p in self.model_parameters]
+
+        if hasattr(torch, '_foreach_lerp_'):
+            torch._foreach_lerp_(average_data, model_data, weight)
+        else:
+            for average_param, model_param in zip(average_data, model_data):
+                average_param.lerp_(model_param, weight)
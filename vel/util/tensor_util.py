@@ -12,3 +12,11 @@ def merge_first_two_dims(tensor):
     batch_size = shape[0] * shape[1]
     new_shape = tuple([batch_size] + list(shape[2:]))
     return tensor.view(new_shape)
+
+
+def detach_state(state):
+    """ Detach model state from the graph, state being a tensor or a nested tuple or list of tensors """
+    if isinstance(state, (tuple, list)):
+        return type(state)(detach_state(s) for s in state)
+
+    return state.detach()
@@ -0,0 +1,152 @@
+import os
+import tempfile
+
+import nose.tools as t
+import numpy as np
+import numpy.testing as nt
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+import torch.utils.data as data
+
+import vel.util.distributed as distributed
+
+from vel.api import Learner, TrainingInfo, EpochInfo, BatchInfo
+from vel.api.base import SupervisedModel, TrainingData
+from vel.metrics.loss_metric import Loss
+from vel.sources.tensor_source import load_cached_arrays
+
+
+class LinearModel(SupervisedModel):
+    """ Simple linear regression model """
+    def __init__(self):
+        super().__init__()
+        self.model = nn.Linear(4, 1)
+
+    def forward(self, x):
+        return self.model(x)
+
+    def loss_value(self, x_data, y_true, y_pred):
+        return F.mse_loss(y_pred, y_true)
+
+    def metrics(self):
+        return [Loss()]
+
+
+def train_process(output_dir):
+    """ Train for a single epoch in a process of the distributed group, store the results """
+    # Different initialization in every process, weights are broadcast from the first one
+    torch.manual_seed(distributed.rank())
+
+    x = torch.randn(64, 4)
+    y = x @ torch.tensor([[1.0], [-2.0], [0.5], [3.0]])
+
+    dataset = data.TensorDataset(x, y)
+    source = TrainingData(dataset, dataset, num_workers=0, batch_size=8)
+
+    learner = Learner(torch.device('cpu'), LinearModel())
+    optimizer = optim.SGD(learner.model.parameters(), lr=0.1)
+
+    training_info = TrainingInfo(metrics=learner.metrics(), callbacks=[])
+    epoch_info = EpochInfo(
+        training_info, global_epoch_idx=1, batches_per_epoch=source.train_iterations_per_epoch(), optimizer=optimizer
+    )
+
+    learner.run_epoch(epoch_info, source)
+
+    torch.save(
+        {
+            'weight': learner.model.model.weight.detach(),
+            'result': epoch_info.result,
+            'batches': source.train_iterations_per_epoch()
+        },
+        os.path.join(output_dir, f'rank_{distributed.rank()}.data')
+    )
+
+
+def accumulation_process(output_dir):
+    """ Train a single accumulation window of two batches, store gradients after each of them """
+    torch.manual_seed(distributed.rank())
+
+    x = torch.randn(16, 4)
+    y = x @ torch.tensor([[1.0], [-2.0], [0.5], [3.0]])
+
+    learner = Learner(torch.device('cpu'), LinearModel(), accumulation_steps=2)
+    optimizer = optim.SGD(learner.model.parameters(), lr=0.1)
+
+    training_info = TrainingInfo(metrics=learner.metrics(), callbacks=[])
+    epoch_info = EpochInfo(training_info, global_epoch_idx=1, batches_per_epoch=2, optimizer=optimizer)
+
+    # Model is wrapped in DistributedDataParallel, which synchronizes initial weights, before the first batch
+    learner.model_loss()
+
+    gradients = []
+
+    for batch_idx in range(2):
+        batch_slice = slice(batch_idx * 8, (batch_idx + 1) * 8)
+        learner.train_batch(BatchInfo(epoch_info, batch_idx), x[batch_slice], y[batch_slice])
+        gradients.append(learner.model.model.weight.grad.clone())
+
+    torch.save(
+        {'gradients': gradients, 'weight': learner.model.model.weight.detach()},
+        os.path.join(output_dir, f'rank_{distributed.rank()}.data')
+    )
+
+
+def build_arrays(output_dir):
+    """ Build arrays for the cache, recording each build in a log file """
+    with open(os.path.join(output_dir, 'builds.log'), 'at') as fp:
+        fp.write(f'{distributed.rank()}\n')
+
+    return {'x': np.arange(6, dtype=np.uint8).reshape(2, 3), 'y': np.arange(2)}
+
+
+def cache_process(output_dir):
+    """ Load cached arrays in a process of the distributed group """
+    arrays = load_cached_arrays(os.path.join(output_dir, 'cache'), 'test', lambda: build_arrays(output_dir))
+    torch.save(arrays, os.path.join(output_dir, f'rank_{distributed.rank()}.data'))
+
+
+def test_data_parallel_training():
+    with tempfile.TemporaryDirectory() as output_dir:
+        distributed.spawn(2, train_process, args=(output_dir,))
+
+        first = torch.load(os.path.join(output_dir, 'rank_0.data'))
+        second = torch.load(os.path.join(output_dir, 'rank_1.data'))
+
+    # Each process sees half of the data
+    t.assert_equal(first['batches'], 4)
+
+    # Replicas stay in sync and agree on the metrics
+    t.assert_true(torch.equal(first['weight'], second['weight']))
+    t.assert_equal(first['result'], second['result'])
+
+
+def test_data_parallel_accumulation():
+    with tempfile.TemporaryDirectory() as output_dir:
+        distributed.spawn(2, accumulation_process, args=(output_dir,))
+
+        first = torch.load(os.path.join(output_dir, 'rank_0.data'))
+        second = torch.load(os.path.join(output_dir, 'rank_1.data'))
+
+    # Gradients of the first batch of the window stay local to each process
+    t.assert_false(torch.allclose(first['gradients'][0], second['gradients'][0]))
+
+    # Synchronized at the end of the window
+    t.assert_true(torch.allclose(first['gradients'][1], second['gradients'][1]))
+    t.assert_true(torch.equal(first['weight'], second['weight']))
+
+
+def test_data_parallel_cache():
+    with tempfile.TemporaryDirectory() as output_dir:
+        distributed.spawn(2, cache_process, args=(output_dir,))
+
+        with open(os.path.join(output_dir, 'builds.log'), 'rt') as fp:
+            builds = fp.read().split()
+
+        second = torch.load(os.path.join(output_dir, 'rank_1.data'), weights_only=False)
+
+    # Cache is built once, by the main process
+    t.assert_equal(builds, ['0'])
+    nt.assert_array_equal(second['x'], np.arange(6, dtype=np.uint8).reshape(2, 3))
@@ -0,0 +1,44 @@
+import copy
+
+import nose.tools as t
+import numpy.testing as nt
+import torch
+import torch.nn as nn
+
+from vel.util.polyak import PolyakAveraging
+
+
+def test_soft_update():
+    torch.manual_seed(0)
+
+    source = nn.Sequential(nn.Linear(4, 8), nn.ReLU(), nn.Linear(8, 2))
+    target = copy.deepcopy(source)
+
+    for parameter in target.parameters():
+        nn.init.normal_(parameter)
+
+    averaging = PolyakAveraging(source, target)
+
+    tau = 0.05
+
+    for step in range(3):
+        expected = [
+            (1 - tau) * tp.detach().clone() + tau * sp.detach()
+            for tp, sp in zip(target.parameters(), source.parameters())
+        ]
+
+        averaging.update(tau)
+
+        for expected_param, target_param in zip(expected, target.parameters()):
+            nt.assert_allclose(target_param.detach().numpy(), expected_param.numpy(), rtol=1e-6, atol=1e-7)
+
+        # Source keeps changing between updates, as it would when being trained
+        with torch.no_grad():
+            for parameter in source.parameters():
+                parameter.add_(torch.randn_like(parameter))
+
+    # Weight of one is a hard copy, as used for periodic target updates
+    averaging.update(1.0)
+
+    for source_param, target_param in zip(source.parameters(), target.parameters()):
+        t.assert_true(torch.equal(source_param, target_param))
@@ -9,6 +9,19 @@ class VisdomSettings:
     server: str = 'http://localhost'
     endpoint: str = 'events'
     port: int = 8097
+    stream_window: int = 10
+
+
+def connect_visdom(model_config, settings: VisdomSettings):
+    """ Connect to the visdom server, into the environment of the current run """
+    import visdom
+
+    return visdom.Visdom(
+        server=settings.server,
+        endpoint=settings.endpoint,
+        port=settings.port,
+        env=model_config.run_name.replace('/', '_')
+    )
 
 
 def _column_original_name(name):